@@ -9,6 +9,8 @@
 # xgboost           : 비선형 패턴을 잘 잡는 트리 기반 부스팅 모델
 # joblib            : 학습된 모델/스케일러를 파일로 저장하고 불러오기 위한 라이브러리
 import os
+import time
+import argparse
 import numpy as np
 import pandas as pd
 import xgboost as xgb
@@ -19,20 +21,28 @@ import joblib
 # GridSearchCV      : 하이퍼파라미터 최적 조합 탐색
 # mean_squared_error: RMSE 계산용
 # r2_score          : 결정계수(R²) 계산용
-# Ridge             : 선형회귀 + L2 규제 모델
 # VotingRegressor   : 여러 회귀 모델의 예측을 가중 평균하여 앙상블
 # StandardScaler    : 각 feature를 평균 0, 표준편차 1 기준으로 스케일링
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import mean_squared_error, r2_score
-from sklearn.linear_model import Ridge
 from sklearn.ensemble import VotingRegressor
 from sklearn.preprocessing import StandardScaler
+from sklearn.utils import Bunch
+
+# parallel_search       : 학습 행렬을 공유 메모리에 올려 여러 프로세스로 나눠 탐색 (--jobs)
+from parallel_search import parallel_grid_search, benchmark_workers
+# synthetic_data        : 벡터화된 학습 데이터 생성기 (대용량은 청크 단위 Parquet 출력)
+from synthetic_data import generate_frame
+# online_ridge          : 충분 통계량 기반 Ridge (alpha 교차검증을 재학습 없이 계산)
+from online_ridge import OnlineRidge
+# train_phases          : 단계별 소요 시간 기록 (train_benchmark.py 실행 시에만 파일로 남김)
+from train_phases import PhaseRecorder
 
 
 # ============================================================
 # 1) 학습 데이터 생성 및 파생 변수(Feature Engineering) 추가
 # ============================================================
-def generate_realistic_data(n_samples: int = 5000) -> pd.DataFrame:
+def generate_realistic_data(n_samples: int = 5000, seed: int = 42) -> pd.DataFrame:
     """
     광고 채널별 특성을 반영한 가상의 학습 데이터를 생성하는 함수
 
@@ -40,6 +50,8 @@ def generate_realistic_data(n_samples: int = 5000) -> pd.DataFrame:
     ----------
     n_samples : int
         생성할 데이터 샘플 수
+    seed : int
+        난수 시드
 
     Returns
     -------
@@ -61,163 +73,261 @@ def generate_realistic_data(n_samples: int = 5000) -> pd.DataFrame:
 
     print("⚡ [ensemble_model] 데이터 생성 및 파생 변수(Feature Engineering) 주입 중...")
 
+    # 채널별 성향 / 적정 예산 패널티 / 트렌드 영향 / noise 계산은 synthetic_data.generate_frame 참고
+    # (행 단위 for 루프 대신 전체 행을 배열 연산으로 한 번에 생성 → 수백만 행도 수 초)
+    #
     # 난수 고정:
     # 실행할 때마다 같은 랜덤 데이터가 생성되도록 하여
     # 실험 재현성을 확보한다.
-    np.random.seed(42)
+    return generate_frame(n_samples, np.random.default_rng(seed))
 
-    # 생성된 각 샘플(row)을 저장할 리스트
-    data = []
 
-    # ------------------------------------------------------------
-    # 채널별 기본 성향 설정
-    # ------------------------------------------------------------
-    # roas : 기본 수익률 성향
-    # cpc  : 평균 클릭당 비용 성향
-    # ctr  : 평균 클릭률 성향
-    #
-    # 이 값들은 "채널별 특성이 다르다"는 점을 시뮬레이션하기 위한 기준값이다.
-    base_metrics = {
-        "naver": {"roas": 3.5, "cpc": 800, "ctr": 2.5},
-        "meta": {"roas": 2.2, "cpc": 400, "ctr": 1.2},
-        "google": {"roas": 2.8, "cpc": 600, "ctr": 1.8},
-        "karrot": {"roas": 3.0, "cpc": 300, "ctr": 3.0}
+# ============================================================
+# 2) 앙상블 가중치 탐색 유틸리티
+# ============================================================
+# VotingRegressor의 예측 = 각 모델 예측값의 가중 평균(np.average)이므로
+# 개별 모델 예측을 한 번만 계산해 두면 어떤 가중치든 재학습 없이 numpy 연산으로 평가할 수 있다.
+def blend_predictions(base_preds: np.ndarray, weights) -> np.ndarray:
+    """
+    개별 모델 예측을 가중 평균 (VotingRegressor.predict와 동일한 계산)
+
+    Parameters
+    ----------
+    base_preds : np.ndarray
+        (샘플 수, 모델 수) 개별 모델 예측값
+    weights : array-like
+        (모델 수,) 또는 (후보 수, 모델 수) 가중치 - 합이 1이 아니어도 정규화해서 사용
+
+    Returns
+    -------
+    np.ndarray
+        (샘플 수,) 또는 (샘플 수, 후보 수) 앙상블 예측값
+    """
+    weights = np.asarray(weights, dtype=float)
+    weights = weights / weights.sum(axis=-1, keepdims=True)
+    return base_preds @ weights.T
+
+
+def optimal_blend_weight(pred_a: np.ndarray, pred_b: np.ndarray, y: np.ndarray) -> float:
+    """
+    두 모델 가중 평균 w*a + (1-w)*b 의 MSE를 최소로 만드는 w (닫힌 해, 0~1로 제한)
+
+    MSE(w) = ||(y - b) - w(a - b)||² 는 w에 대한 2차식이므로
+    w* = <a - b, y - b> / <a - b, a - b>
+    """
+    diff = pred_a - pred_b
+    denom = float(diff @ diff)
+    if denom == 0.0:
+        return 0.5
+    return float(np.clip(diff @ (y - pred_b) / denom, 0.0, 1.0))
+
+
+def assemble_voting_regressor(named_estimators, weights) -> VotingRegressor:
+    """
+    이미 학습된 모델로 VotingRegressor를 재학습 없이 구성
+
+    .fit()은 각 모델을 clone 후 다시 학습하므로, GridSearchCV가 train 전체로
+    다시 학습해 둔 best_estimator_를 그대로 넣어 같은 결과를 학습 비용 없이 얻는다.
+    """
+    ensemble = VotingRegressor(estimators=list(named_estimators), weights=list(weights))
+    ensemble.estimators_ = [est for _, est in named_estimators]
+    ensemble.named_estimators_ = Bunch(**dict(named_estimators))
+    return ensemble
+
+
+def weight_label(weights) -> str:
+    """[0.8, 0.2] → 'Ridge 80% : XGB 20%'"""
+    ridge_w, xgb_w = weights
+    return f"Ridge {ridge_w * 100:.0f}% : XGB {xgb_w * 100:.0f}%"
+
+
+# ============================================================
+# 3) XGBoost 하이퍼파라미터 탐색
+# ============================================================
+# 기존 그리드 (3-fold CV, 18개 조합 x 3 = 54회 학습, 모든 후보가 트리를 끝까지 학습)
+XGB_GRID_PARAMS = {
+    'max_depth': [3, 5, 7],
+    'learning_rate': [0.05, 0.1, 0.2],
+    'n_estimators': [100, 200]
+}
+
+# successive halving 탐색 공간 (n_estimators는 early stopping으로 결정)
+XGB_HALVING_SPACE = {
+    'max_depth': [3, 4, 5, 6, 7, 8],
+    'learning_rate': [0.02, 0.03, 0.05, 0.08, 0.1, 0.15, 0.2, 0.3],
+    'min_child_weight': [1, 3, 5, 10],
+    'subsample': [0.7, 0.85, 1.0],
+    'colsample_bytree': [0.7, 0.85, 1.0],
+}
+HALVING_SPACE_SIZE = int(np.prod([len(values) for values in XGB_HALVING_SPACE.values()]))  # 1,728개 조합
+HALVING_MAX_TREES = 2000        # early stopping 상한 (실제로는 수백 개에서 멈춤)
+HALVING_EARLY_STOPPING = 30     # 내부 holdout RMSE가 30라운드 연속 개선되지 않으면 중단
+HALVING_INNER_HOLDOUT = 0.2     # early stopping / 후보 순위용 내부 holdout 비율 (train에서 분리)
+
+
+def search_xgb_grid(X_train, y_train, jobs=1):
+    """
+    기존 방식: GridSearchCV (3-fold CV, 18개 조합)
+    jobs > 1 이면 같은 탐색을 parallel_search로 jobs개 프로세스에 나눠 실행
+    (fold 분할/채점이 같아 최적 파라미터도 같음)
+
+    Returns
+    -------
+    (XGBRegressor, dict)
+        train 전체로 다시 학습된 최적 모델, 탐색 정보 (소요 시간, 학습 횟수)
+    """
+    if jobs > 1:
+        return parallel_grid_search(
+            xgb.XGBRegressor(random_state=42), XGB_GRID_PARAMS, X_train, y_train,
+            cv=3, n_workers=jobs
+        )
+
+    started = time.perf_counter()
+    grid_xgb = GridSearchCV(
+        xgb.XGBRegressor(random_state=42),
+        XGB_GRID_PARAMS,
+        cv=3,
+        scoring='neg_root_mean_squared_error'
+    )
+    grid_xgb.fit(X_train, y_train)
+    n_fits = len(grid_xgb.cv_results_['params']) * 3 + 1
+    return grid_xgb.best_estimator_, {
+        'method': 'grid',
+        'seconds': time.perf_counter() - started,
+        'fits': n_fits,
     }
 
-    # n_samples 개수만큼 샘플 생성
-    for _ in range(n_samples):
-        # --------------------------------------------------------
-        # 1. 채널 무작위 선택
-        # --------------------------------------------------------
-        channel = np.random.choice(list(base_metrics.keys()))
-
-        # 광고비(cost): 1만원 ~ 200만원 사이 랜덤
-        cost = np.random.randint(10_000, 2_000_000)
-
-        # 트렌드 점수: 30 ~ 100 사이 랜덤
-        # 실제로는 검색량, 시즌성, 이슈성 등을 반영한 점수라고 가정
-        trend_score = np.random.randint(30, 100)
-
-        # --------------------------------------------------------
-        # 2. 채널별 "적정 예산" 가정
-        # --------------------------------------------------------
-        # 각 채널은 너무 적게 써도 비효율, 너무 많이 써도 효율이 떨어질 수 있다고 가정
-        # 이 적정 예산으로부터 멀어질수록 penalty를 주기 위한 기준값
-        optimal_budget_map = {
-            "naver": 500_000,
-            "meta": 300_000,
-            "google": 400_000,
-            "karrot": 100_000
-        }
-        optimal_budget = optimal_budget_map[channel]
-
-        # 현재 예산이 적정 예산에서 얼마나 떨어져 있는지 비율로 계산
-        # 예: optimal_budget = 500,000, cost = 750,000 이면 diff_ratio = 0.5
-        diff_ratio = abs(cost - optimal_budget) / optimal_budget
-
-        # penalty_factor:
-        # 적정 예산에서 벗어날수록 ROAS에 불이익을 주기 위한 패널티 값
-        # 제곱을 사용해 차이가 클수록 패널티가 더 빠르게 커지도록 설계
-        # 최대 2.0까지만 반영하여 과도한 영향 방지
-        penalty_factor = min((diff_ratio ** 2) * 1.5, 2.0)
-
-        # --------------------------------------------------------
-        # 3. trend_score가 성과에 미치는 영향
-        # --------------------------------------------------------
-        # trend_score가 50보다 높으면 +영향, 낮으면 -영향이 가도록 설정
-        # 예: trend_score=70 -> +1.0, trend_score=40 -> -0.5
-        trend_impact = (trend_score - 50) * 0.05
-
-        # 현재 채널의 기본 CPC / CTR 값 가져오기
-        base_cpc = base_metrics[channel]["cpc"]
-        base_ctr = base_metrics[channel]["ctr"]
-
-        # --------------------------------------------------------
-        # 4. CPC / CTR 생성
-        # --------------------------------------------------------
-        # CPC:
-        # 적정 예산에서 너무 멀어지면 경쟁이 비효율적으로 발생한다고 가정하여
-        # CPC가 조금 올라가게 설계
-        # 여기에 0.9 ~ 1.1 랜덤 계수를 곱해 현실적인 흔들림 추가
-        cpc = base_cpc * (1.0 + (penalty_factor * 0.2)) * np.random.uniform(0.9, 1.1)
-
-        # CTR:
-        # trend가 좋으면 상승, penalty가 크면 하락하도록 설계
-        # 역시 랜덤 계수로 자연스러운 변동 반영
-        ctr = base_ctr * (1.0 + (trend_impact * 0.1) - (penalty_factor * 0.1)) * np.random.uniform(0.9, 1.1)
-
-        # 비정상적으로 작은 값 방지용 하한 처리
-        cpc = max(100, cpc)
-        ctr = max(0.1, ctr)
-
-        # --------------------------------------------------------
-        # 5. target ROAS 생성
-        # --------------------------------------------------------
-        # 채널별 기본 ROAS에서
-        # - 적정 예산 이탈 패널티는 빼고
-        # + 트렌드 영향은 더한다
-        base_roas = base_metrics[channel]["roas"]
-        true_value = base_roas - penalty_factor + trend_impact
-
-        # 미래 성과는 항상 불확실성이 있기 때문에 noise 추가
-        # 평균 0, 표준편차 0.5인 정규분포 잡음
-        future_noise = np.random.normal(0, 0.5)
-
-        # 최종 타겟 ROAS를 0.5 ~ 8.0 범위로 제한
-        # 너무 극단적인 값은 학습을 불안정하게 만들 수 있어 clip 처리
-        target_roas = np.clip(true_value + future_noise, 0.5, 8.0)
-
-        # --------------------------------------------------------
-        # 6. 학습용 feature 구성
-        # --------------------------------------------------------
-        # 영문 변수명 유지 이유:
-        # predict_budget.py 또는 배포 단계에서 feature 이름 일관성이 중요하기 때문
-        #
-        # one-hot encoding:
-        # channel 정보를 숫자 입력으로 넣기 위해 사용
-        #
-        # 파생 변수 3개:
-        # 1) expected_clicks    : 비용 / CPC -> 이 예산으로 기대되는 클릭 수
-        # 2) trend_efficiency   : trend_score / log1p(cost)
-        #                         -> 예산 대비 트렌드 효율을 간단히 표현
-        # 3) click_value        : (cost / cpc) * ctr
-        #                         -> 클릭 수와 CTR을 함께 반영한 지표
-        row = {
-            "cost": cost,
-            "cpc": cpc,
-            "ctr": ctr,
-            "trend_score": trend_score,
-
-            # 채널 원-핫 인코딩
-            "channel_naver": 1 if channel == "naver" else 0,
-            "channel_meta": 1 if channel == "meta" else 0,
-            "channel_google": 1 if channel == "google" else 0,
-            "channel_karrot": 1 if channel == "karrot" else 0,
-
-            # 파생 변수
-            "expected_clicks": cost / cpc,
-            "trend_efficiency": trend_score / np.log1p(cost),
-            "click_value": (cost / cpc) * ctr,
-
-            # target은 % 단위처럼 보기 좋게 100배 스케일
-            # 예: ROAS 2.31 -> 231.0
-            "target_roas": target_roas * 100
-        }
 
-        data.append(row)
+def search_xgb_halving(X_train, y_train, time_budget=None,
+                       n_candidates=27, eta=3, seed=42, inner_holdout=HALVING_INNER_HOLDOUT):
+    """
+    Successive halving + early stopping 탐색
+
+    0. train에서 inner_holdout 비율을 내부 holdout으로 분리
+       (validation 셋은 탐색에 쓰지 않음 → --search compare 비교와 앙상블 가중치 탐색이 편향되지 않도록)
+    1. 탐색 공간에서 n_candidates개 조합을 무작위 추출
+    2. 라운드마다 나머지 train 일부(1/eta^k)로 학습 → 내부 holdout RMSE 상위 1/eta만 다음 라운드로
+       (마지막 라운드는 나머지 train 전체)
+    3. 각 학습은 내부 holdout RMSE 기준 early stopping → 트리 개수(n_estimators)를 학습으로 결정
+    4. 최적 조합을 best_iteration + 1개 트리로 train 전체(내부 holdout 포함)에 다시 학습
 
-    # 리스트를 데이터프레임으로 변환하여 반환
-    return pd.DataFrame(data)
+    time_budget(초)을 넘기면 다음 라운드로 넘어가지 않고 지금까지 가장 좋은 조합을 사용한다.
+
+    Returns
+    -------
+    (XGBRegressor, dict)
+        최적 모델, 탐색 정보 (소요 시간, 학습 횟수, 라운드별 후보 수, 최적 파라미터)
+    """
+    # 중복 없이 뽑으므로 탐색 공간 크기를 넘으면 끝나지 않고, 0 이하면 라운드 수 계산 불가
+    if not 1 <= n_candidates <= HALVING_SPACE_SIZE:
+        raise ValueError(f"n_candidates는 1 ~ {HALVING_SPACE_SIZE} 사이여야 합니다: {n_candidates}")
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+
+    # 중복 없는 무작위 조합
+    candidates, seen = [], set()
+    while len(candidates) < n_candidates:
+        params = {key: values[rng.integers(len(values))] for key, values in XGB_HALVING_SPACE.items()}
+        key = tuple(sorted(params.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+
+    n_rounds = int(np.floor(np.log(n_candidates) / np.log(eta))) + 1
+    # 라운드별 학습 행 순서를 고정 (앞에서부터 잘라 쓰면 라운드가 올라갈수록 상위 집합)
+    # 뒤쪽 inner_holdout 비율은 early stopping / 순위 전용
+    order = rng.permutation(len(X_train))
+    X_train, y_train = np.asarray(X_train)[order], np.asarray(y_train)[order]
+    n_inner = max(1, int(round(len(X_train) * inner_holdout)))
+    X_fit, y_fit = X_train[:-n_inner], y_train[:-n_inner]
+    X_inner, y_inner = X_train[-n_inner:], y_train[-n_inner:]
+
+    def fit_candidate(params, n_rows):
+        model = xgb.XGBRegressor(
+            n_estimators=HALVING_MAX_TREES,
+            early_stopping_rounds=HALVING_EARLY_STOPPING,
+            eval_metric='rmse',
+            random_state=42,
+            **params
+        )
+        model.fit(X_fit[:n_rows], y_fit[:n_rows], eval_set=[(X_inner, y_inner)], verbose=False)
+        return model.best_score, model.best_iteration + 1
+
+    scored = []          # 마지막으로 끝난 라운드의 (RMSE, 트리 개수, 파라미터)
+    rounds = []
+    n_fits = 0
+    survivors = candidates
+    for round_idx in range(n_rounds):
+        n_rows = int(len(X_fit) / eta ** (n_rounds - 1 - round_idx))
+        round_scores = []
+        for params in survivors:
+            if time_budget and time.perf_counter() - started > time_budget and (scored or round_scores):
+                break
+            rmse, n_trees = fit_candidate(params, n_rows)
+            round_scores.append((rmse, n_trees, params))
+            n_fits += 1
+        if not round_scores:
+            break
+        # 라운드를 끝까지 못 돌았으면 더 적은 데이터로 본 이전 라운드보다 이번 결과를 우선 (같은 기준 비교)
+        scored = sorted(round_scores, key=lambda r: r[0])
+        rounds.append({'rows': n_rows, 'candidates': len(round_scores)})
+        if len(round_scores) < len(survivors) or len(scored) == 1:
+            break
+        survivors = [params for _, _, params in scored[:max(1, len(scored) // eta)]]
+
+    best_rmse, best_trees, best_params = scored[0]
+    best_model = xgb.XGBRegressor(n_estimators=best_trees, random_state=42, **best_params)
+    best_model.fit(X_train, y_train)
+    n_fits += 1
+
+    return best_model, {
+        'method': 'halving',
+        'seconds': time.perf_counter() - started,
+        'fits': n_fits,
+        'rounds': rounds,
+        'budget_exhausted': bool(time_budget) and time.perf_counter() - started > time_budget,
+        'params': {**best_params, 'n_estimators': best_trees},
+        'inner_rmse': float(best_rmse),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Ridge + XGBoost ROAS 앙상블 모델 학습')
+    # XGBoost 하이퍼파라미터 탐색 방식
+    #   grid    : 기존 GridSearchCV (기본)
+    #   halving : successive halving + early stopping
+    #   compare : 두 방식을 모두 실행해 시간/RMSE 비교 후 validation RMSE가 낮은 모델 사용
+    parser.add_argument('--search', choices=['grid', 'halving', 'compare'], default='grid')
+    parser.add_argument('--time_budget', type=float, default=None,
+                        help='halving 탐색 시간 제한 (초, 기본: 제한 없음)')
+    parser.add_argument('--n_candidates', type=int, default=27,
+                        help=f'halving 첫 라운드 후보 수 (기본 27 = 27 → 9 → 3 → 1, 1 ~ {HALVING_SPACE_SIZE})')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='grid 탐색 프로세스 수 (기본 1 = GridSearchCV, 워커당 스레드 = 코어 수 // jobs)')
+    parser.add_argument('--benchmark_jobs', default=None,
+                        help='워커 수별 grid 탐색 시간/속도 향상 측정 (예: 1,2,4,8)')
+    parser.add_argument('--n_samples', type=int, default=5000, help='생성할 학습 데이터 행 수')
+    parser.add_argument('--out_dir', default=None,
+                        help='모델/스케일러 저장 폴더 (기본: 이 파일이 있는 폴더)')
+    args = parser.parse_args(argv)
+    if not 1 <= args.n_candidates <= HALVING_SPACE_SIZE:
+        parser.error(f"--n_candidates는 1 ~ {HALVING_SPACE_SIZE} 사이여야 합니다: {args.n_candidates}")
+    return args
 
 
 # ============================================================
-# 2) 메인 실행부
+# 4) 메인 실행부
 # ============================================================
 if __name__ == "__main__":
+    args = parse_args()
+    phases = PhaseRecorder()
+
     # --------------------------------------------------------
     # Step 1. 데이터 생성
     # --------------------------------------------------------
-    df = generate_realistic_data(n_samples=5000)
+    phases.start('data')
+    df = generate_realistic_data(n_samples=args.n_samples)
 
     # feature(X)와 target(y) 분리
     # target_roas만 정답값(y)이고, 나머지는 입력값(X)
@@ -233,6 +343,7 @@ if __name__ == "__main__":
     # 1차 분할:
     #   - train+val: 80%
     #   - test     : 20%
+    phases.start('split')
     X_temp, X_test, y_temp, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
@@ -254,6 +365,7 @@ if __name__ == "__main__":
     # [중요] 데이터 누수 방지:
     # scaler는 반드시 train 데이터로만 fit 해야 한다.
     # val/test에는 train에서 학습한 기준(mean, std)만 적용(transform)
+    phases.start('scaling')
     scaler = StandardScaler()
 
     # fit_transform: train 데이터 기준으로 평균/표준편차를 계산하고 바로 변환
@@ -272,7 +384,8 @@ if __name__ == "__main__":
         columns=X.columns
     )
 
-    print("\n🔍 ★ [단계 1] 개별 모델 하이퍼파라미터 자동 튜닝 (GridSearchCV) ★")
+    print(f"\n🔍 ★ [단계 1] 개별 모델 하이퍼파라미터 자동 튜닝 (--search {args.search}) ★")
+    phases.start('search')
 
     # --------------------------------------------------------
     # Step 4. Ridge 하이퍼파라미터 튜닝
@@ -283,20 +396,22 @@ if __name__ == "__main__":
         'alpha': [0.1, 1.0, 10.0, 50.0]
     }
 
-    # scoring='neg_root_mean_squared_error'
-    # sklearn은 score가 "클수록 좋다" 체계이므로 RMSE 앞에 음수를 붙여 사용
-    grid_ridge = GridSearchCV(
-        Ridge(random_state=42),
-        ridge_params,
-        cv=3,
-        scoring='neg_root_mean_squared_error'
+    # GridSearchCV(cv=3, scoring='neg_root_mean_squared_error')와 같은 fold / 점수를
+    # fold별 충분 통계량(XᵀX, Xᵀy)으로 계산 → alpha 후보마다 재학습 없이 d x d 방정식만 풀이
+    # (X_train_scaled는 이미 표준화되어 있으므로 standardize=False)
+    ridge_online = OnlineRidge(
+        n_features=X_train_scaled.shape[1],
+        alphas=ridge_params['alpha'],
+        n_folds=3,
+        standardize=False,
+        scoring='rmse',
     )
 
     # .values를 사용해 numpy array 형태로 전달
-    grid_ridge.fit(X_train_scaled.values, y_train.values)
+    ridge_online.partial_fit_kfold(X_train_scaled.values, y_train.values).refit()
 
-    # 최적 하이퍼파라미터를 찾은 Ridge 모델
-    best_ridge = grid_ridge.best_estimator_
+    # 최적 하이퍼파라미터를 찾은 Ridge 모델 (sklearn Ridge로 변환 → VotingRegressor에 그대로 사용)
+    best_ridge = ridge_online.to_ridge()
 
     print(f"  👉 Ridge 최적 파라미터 발견: alpha = {best_ridge.alpha}")
 
@@ -311,39 +426,81 @@ if __name__ == "__main__":
     # - depth가 깊을수록 복잡한 패턴을 잡지만 과적합 위험 증가
     # - learning_rate가 작을수록 천천히 학습
     # - n_estimators가 많을수록 더 많은 트리를 사용
-    xgb_params = {
-        'max_depth': [3, 5, 7],
-        'learning_rate': [0.05, 0.1, 0.2],
-        'n_estimators': [100, 200]
-    }
-
-    grid_xgb = GridSearchCV(
-        xgb.XGBRegressor(random_state=42),
-        xgb_params,
-        cv=3,
-        scoring='neg_root_mean_squared_error'
-    )
-
-    grid_xgb.fit(X_train_scaled.values, y_train.values)
+    #
+    # --search halving 이면 n_estimators는 train 내부 holdout early stopping으로 결정된다.
+    searches = {}
+    if args.search in ('grid', 'compare'):
+        searches['grid'] = search_xgb_grid(X_train_scaled.values, y_train.values, jobs=args.jobs)
+    if args.search in ('halving', 'compare'):
+        # early stopping은 train 내부 holdout으로 → validation 셋은 아래 비교 / 앙상블 가중치 전용
+        searches['halving'] = search_xgb_halving(
+            X_train_scaled.values, y_train.values,
+            time_budget=args.time_budget, n_candidates=args.n_candidates
+        )
 
-    # 최적 하이퍼파라미터를 찾은 XGBoost 모델
-    best_xgb = grid_xgb.best_estimator_
+    # 방식별 validation / test RMSE
+    for model, info in searches.values():
+        info['val_rmse'] = np.sqrt(mean_squared_error(y_val, model.predict(X_val_scaled.values)))
+        info['test_rmse'] = np.sqrt(mean_squared_error(y_test, model.predict(X_test_scaled.values)))
+        print(
+            f"  - 탐색 [{info['method']}] 학습 {info['fits']}회, {info['seconds']:.2f}초 "
+            f"-> Val RMSE: {info['val_rmse']:.2f}%p | Test RMSE: {info['test_rmse']:.2f}%p"
+        )
+        if info['method'] == 'halving':
+            rounds = ' → '.join(f"{r['candidates']}개({r['rows']}행)" for r in info['rounds'])
+            budget_note = " (시간 제한 도달)" if info['budget_exhausted'] else ""
+            print(f"    라운드: {rounds}{budget_note}")
+        elif info['method'] == 'parallel_grid':
+            print(
+                f"    워커 {info['workers']}개 x 스레드 {info['threads_per_worker']}개 "
+                f"| 공유 메모리 {info['shared_mb']:.2f}MB (test fold·양 끝 fold train은 view, 가운데 fold train만 복사)"
+            )
+
+    # 최적 하이퍼파라미터를 찾은 XGBoost 모델 (compare면 validation RMSE가 낮은 쪽)
+    best_xgb, best_search = min(searches.values(), key=lambda s: s[1]['val_rmse'])
+
+    if args.search == 'compare':
+        grid_info, halving_info = searches['grid'][1], searches['halving'][1]
+        print(
+            f"  ⏱️ halving / grid 시간 비율: {halving_info['seconds'] / grid_info['seconds']:.2f} "
+            f"| Val RMSE 차이: {halving_info['val_rmse'] - grid_info['val_rmse']:+.2f}%p "
+            f"| Test RMSE 차이: {halving_info['test_rmse'] - grid_info['test_rmse']:+.2f}%p"
+        )
 
     print(
-        f"  👉 XGBoost 최적 파라미터 발견: "
+        f"  👉 XGBoost 최적 파라미터 발견 [{best_search['method']}]: "
         f"max_depth={best_xgb.max_depth}, "
         f"learning_rate={best_xgb.learning_rate}, "
         f"n_estimators={best_xgb.n_estimators}"
     )
 
+    # 워커 수별 grid 탐색 시간 (1 워커 대비 속도 향상, 코어 수보다 많은 워커는 스레드 1개씩)
+    if args.benchmark_jobs:
+        worker_counts = [int(n) for n in args.benchmark_jobs.split(',') if n.strip()]
+        print(f"\n  ⏱️ 병렬 탐색 벤치마크 (CPU 코어 {os.cpu_count()}개)")
+        for row in benchmark_workers(xgb.XGBRegressor(random_state=42), XGB_GRID_PARAMS,
+                                     X_train_scaled.values, y_train.values, worker_counts):
+            print(
+                f"    - 워커 {row['workers']}개 x 스레드 {row['threads_per_worker']}개: "
+                f"{row['seconds']:.2f}초 (x{row['speedup']:.2f}) | 최적 {row['best_params']}"
+            )
+
     # ============================================================
     # Step 6. Validation 셋을 이용한 최적 앙상블 비율 탐색
     # ============================================================
     print("\n⚖️ ★ [단계 2] Validation 셋을 이용한 최적의 앙상블 비율 탐색 ★")
+    phases.start('blend')
 
-    # Ridge와 XGBoost의 가중치를 다르게 주면서
-    # 어떤 조합이 validation 성능이 가장 좋은지 비교
-    #
+    step2_started = time.perf_counter()
+
+    # 개별 모델은 탐색 단계에서 이미 train 전체로 학습해 두었으므로
+    # validation / test 예측을 한 번씩만 계산해 캐시하고, 가중치 평가는 numpy 가중 평균으로 한다.
+    # (열 순서: Ridge, XGBoost)
+    base_models = [('ridge', best_ridge), ('xgb', best_xgb)]
+    val_base_preds = np.column_stack([m.predict(X_val_scaled.values) for _, m in base_models])
+    test_base_preds = np.column_stack([m.predict(X_test_scaled.values) for _, m in base_models])
+
+    # 보고서용 기존 후보 비율
     # 예: [0.8, 0.2] -> Ridge 예측 80%, XGB 예측 20% 반영
     weight_candidates = [
         ([0.8, 0.2], "Ridge 80% : XGB 20%"),
@@ -353,67 +510,65 @@ if __name__ == "__main__":
         ([0.2, 0.8], "Ridge 20% : XGB 80%")
     ]
 
-    # 각 비율별 validation 결과 저장용
-    val_results = []
-
-    # 보고서 비교용으로 5:5 모델도 따로 보관
-    ens_55_model = None
-
-    for weights, label in weight_candidates:
-        # VotingRegressor:
-        # 여러 회귀 모델의 예측값을 평균내는 앙상블 모델
-        ensemble = VotingRegressor(
-            estimators=[
-                ('ridge', best_ridge),
-                ('xgb', best_xgb)
-            ],
-            weights=weights
-        )
-
-        # 학습은 train 데이터로만 수행
-        ensemble.fit(X_train_scaled.values, y_train.values)
+    # 탐색 후보: 1% 간격 격자 (101개, 기존 후보 포함) + MSE 최소 닫힌 해
+    ridge_grid = np.round(np.linspace(0.0, 1.0, 101), 2)
+    closed_form_w = optimal_blend_weight(val_base_preds[:, 0], val_base_preds[:, 1], y_val.values)
+    ridge_weights = np.append(ridge_grid, round(closed_form_w, 4))
+    grid_weights = np.column_stack([ridge_weights, 1.0 - ridge_weights])
 
-        # validation 데이터로 성능 평가
-        val_pred = ensemble.predict(X_val_scaled.values)
+    # 후보 전체를 한 번의 행렬곱으로 평가 → (샘플 수, 후보 수)
+    grid_val_preds = blend_predictions(val_base_preds, grid_weights)
+    grid_rmse = np.sqrt(((grid_val_preds - y_val.values[:, None]) ** 2).mean(axis=0))
 
-        # RMSE: 낮을수록 좋음
-        val_rmse = np.sqrt(mean_squared_error(y_val, val_pred))
+    def evaluate(weights, label):
+        val_pred = blend_predictions(val_base_preds, weights)
+        return {
+            'label': label,
+            'weights': [float(w) for w in weights],
+            # RMSE: 낮을수록 좋음 / R²: 1에 가까울수록 좋음
+            'val_rmse': np.sqrt(mean_squared_error(y_val, val_pred)),
+            'val_r2': r2_score(y_val, val_pred),
+        }
 
-        # R²: 1에 가까울수록 좋음
-        val_r2 = r2_score(y_val, val_pred)
+    # 각 비율별 validation 결과 저장용
+    val_results = [evaluate(weights, label) for weights, label in weight_candidates]
 
-        # 결과 저장
-        val_results.append({
-            'label': label,
-            'weights': weights,
-            'val_rmse': val_rmse,
-            'val_r2': val_r2,
-            'model': ensemble
-        })
-
-        # 보고서용 5:5 앙상블 따로 저장
-        if weights == [0.5, 0.5]:
-            ens_55_model = ensemble
-
-    # validation RMSE가 가장 낮은 조합을 최종 선택
-    best_result = min(val_results, key=lambda x: x['val_rmse'])
-    best_ensemble_model = best_result['model']
+    # validation RMSE가 가장 낮은 조합을 최종 선택 (격자 + 닫힌 해 중)
+    best_idx = int(np.argmin(grid_rmse))
+    best_weights = [round(float(w), 4) for w in grid_weights[best_idx]]
+    best_result = evaluate(best_weights, weight_label(best_weights))
     best_weight_label = best_result['label']
 
+    # 최종 모델은 재학습 없이 조립 (보고서 비교용 5:5 모델도 동일)
+    best_ensemble_model = assemble_voting_regressor(base_models, best_weights)
+    ens_55_model = assemble_voting_regressor(base_models, [0.5, 0.5])
+
+    step2_sec = time.perf_counter() - step2_started
+
     # 각 비율별 성능 출력
     for res in val_results:
-        marker = "  [👑 최적의 앙상블]" if res == best_result else ""
         print(
             f"  - 비율 테스트 [{res['label']}] "
             f"-> RMSE: {res['val_rmse']:.2f}%p | "
-            f"R2: {res['val_r2']:.4f}{marker}"
+            f"R2: {res['val_r2']:.4f}"
         )
+    print(
+        f"  - 닫힌 해 Ridge 비율 = {closed_form_w:.4f} / "
+        f"격자 {len(ridge_grid)}개 + 닫힌 해 1개 평가"
+    )
+    print(
+        f"  - 비율 테스트 [{best_result['label']}] "
+        f"-> RMSE: {best_result['val_rmse']:.2f}%p | "
+        f"R2: {best_result['val_r2']:.4f}  [👑 최적의 앙상블]"
+    )
+    print(f"  ⏱️ 가중치 탐색 소요 시간: {step2_sec:.3f}초 (개별 모델 재학습 없음)")
 
     # ============================================================
     # Step 7. Test 셋 기준 최종 성능 비교
     # ============================================================
     # test 셋은 지금 이 단계에서만 사용해야 한다.
     # 여기서 나온 값이 실제 "최종 성능"에 가장 가까운 지표이다.
+    phases.start('evaluate')
     print("\n" + "=" * 65)
     print("📊 [보고서용] Test 셋 기준 단독 모델 vs 앙상블 성능 비교표")
     print("=" * 65)
@@ -429,21 +584,34 @@ if __name__ == "__main__":
     }
 
     # test 셋으로 각 모델 성능 계산
+    # (개별 모델 예측은 위에서 캐시한 값 사용, 앙상블은 같은 예측의 가중 평균)
+    cached_test_preds = {
+        id(best_ridge): test_base_preds[:, 0],
+        id(best_xgb): test_base_preds[:, 1],
+    }
     for name, model in models_to_evaluate.items():
-        pred = model.predict(X_test_scaled.values)
+        if isinstance(model, VotingRegressor):
+            pred = blend_predictions(test_base_preds, model.weights)
+        else:
+            pred = cached_test_preds[id(model)]
         rmse = np.sqrt(mean_squared_error(y_test, pred))
         r2 = r2_score(y_test, pred)
 
         print(f"{name:<25} | {rmse:>14.2f}    | {r2:>12.4f}")
 
     print("=" * 65 + "\n")
+    # 마지막 행 = 최적 앙상블
+    phases.metrics(val_rmse=best_result['val_rmse'], test_rmse=rmse, test_r2=r2)
 
     # ============================================================
     # Step 8. 모델 및 스케일러 저장
     # ============================================================
     # __file__ 기준 현재 파일이 있는 폴더 경로를 구한다.
     # 이렇게 해야 실행 위치와 상관없이 항상 같은 폴더에 저장 가능
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    # (--out_dir: train_all.py가 모델 레지스트리 폴더로 지정)
+    phases.start('save')
+    current_dir = args.out_dir or os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(current_dir, exist_ok=True)
 
     # 저장 파일 경로 생성
     ensemble_path = os.path.join(current_dir, "ensemble_roas_model.pkl")
@@ -456,4 +624,5 @@ if __name__ == "__main__":
     joblib.dump(scaler, scaler_path)
 
     print(f"✅ 최적화된 앙상블 모델 저장 완료: {ensemble_path}")
-    print(f"✅ 데이터 스케일러 저장 완료: {scaler_path}")
\ No newline at end of file
+    print(f"✅ 데이터 스케일러 저장 완료: {scaler_path}")
+    phases.stop()
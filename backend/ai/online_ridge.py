@@ -0,0 +1,316 @@
+# online_ridge.py
+
+# ============================================================
+# [충분 통계량 기반 온라인 Ridge]
+# ============================================================
+# Ridge(fit_intercept=True)의 해와 교차검증 점수는 원본 행이 아니라
+#   n, Σx, Σy, XᵀX, Xᵀy, yᵀy
+# 만 있으면 계산할 수 있다. (d = Feature 수, 이 프로젝트는 9 ~ 11개)
+#
+# - 새 행 추가 (partial_fit)  : O(d²) / 행 - 기존 행을 다시 읽지 않음
+# - alpha 1개 풀이 (solve)    : O(d³) - d x d 선형 방정식 1번
+# - alpha 격자 교차검증 (cv)   : fold별 통계량을 따로 보관 → (전체 - fold k)로 학습, fold k로 채점
+#
+# 같은 행 / 같은 fold 분할이면 StandardScaler + Ridge(RidgeCV / GridSearchCV) 전체 재학습과
+# 같은 alpha, 같은 계수(부동소수점 오차 수준)가 나온다.
+#
+# 사용 방법 (상태 파일에 새 행 추가 → alpha 재선택 → 파이프라인 저장):
+#   python online_ridge.py --state=baseline_ridge_state.joblib --rows=new_rows.parquet \
+#     [--out=baseline_ridge_model.joblib]
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import joblib
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+
+# ============================================================
+# 1) 충분 통계량
+# ============================================================
+class SufficientStats:
+    """행 집합의 n, Σx, Σy, XᵀX, Xᵀy, yᵀy (더하기/빼기 가능)"""
+
+    def __init__(self, n_features):
+        self.n = 0
+        self.x_sum = np.zeros(n_features)
+        self.y_sum = 0.0
+        self.xtx = np.zeros((n_features, n_features))
+        self.xty = np.zeros(n_features)
+        self.yty = 0.0
+
+    def update(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.n += len(y)
+        self.x_sum += X.sum(axis=0)
+        self.y_sum += float(y.sum())
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+        self.yty += float(y @ y)
+
+    def _combine(self, other, sign):
+        out = SufficientStats(len(self.x_sum))
+        out.n = self.n + sign * other.n
+        out.x_sum = self.x_sum + sign * other.x_sum
+        out.y_sum = self.y_sum + sign * other.y_sum
+        out.xtx = self.xtx + sign * other.xtx
+        out.xty = self.xty + sign * other.xty
+        out.yty = self.yty + sign * other.yty
+        return out
+
+    def __add__(self, other):
+        return self._combine(other, 1)
+
+    def __sub__(self, other):
+        return self._combine(other, -1)
+
+    def mean_scale(self):
+        """StandardScaler와 같은 평균 / 모집단 표준편차 (분산 0 컬럼은 1)"""
+        mean = self.x_sum / self.n
+        var = np.maximum(np.diag(self.xtx) / self.n - mean ** 2, 0.0)
+        scale = np.sqrt(var)
+        scale[scale == 0.0] = 1.0
+        return mean, var, scale
+
+    def sse(self, coef, intercept):
+        """이 통계량에 해당하는 행들의 제곱 오차 합 Σ(y - Xw - b)²"""
+        return float(
+            self.yty
+            - 2.0 * coef @ self.xty
+            - 2.0 * intercept * self.y_sum
+            + coef @ self.xtx @ coef
+            + 2.0 * intercept * coef @ self.x_sum
+            + self.n * intercept ** 2
+        )
+
+
+def solve_ridge(stats, alpha, scale=None):
+    """
+    통계량 → Ridge(fit_intercept=True) 해 (coef는 원래 X 단위, intercept)
+
+    scale이 주어지면 X / scale 에 Ridge를 학습한 것과 같은 해
+    (StandardScaler 뒤 Ridge: 평균은 intercept가 흡수하므로 scale만 필요)
+    """
+    scale = np.ones_like(stats.x_sum) if scale is None else scale
+    mean = stats.x_sum / stats.n
+    y_mean = stats.y_sum / stats.n
+    # 평균 중심화 (intercept는 규제하지 않음 - sklearn Ridge와 동일)
+    cov = (stats.xtx - stats.n * np.outer(mean, mean)) / np.outer(scale, scale)
+    cross = (stats.xty - stats.n * mean * y_mean) / scale
+    coef = np.linalg.solve(cov + alpha * np.eye(len(mean)), cross) / scale
+    return coef, float(y_mean - mean @ coef)
+
+
+# ============================================================
+# 2) 온라인 Ridge
+# ============================================================
+class OnlineRidge:
+    """
+    fold별 충분 통계량을 보관하는 Ridge
+
+    Parameters
+    ----------
+    n_features : int
+    alphas : list[float]
+        교차검증 alpha 후보
+    n_folds : int
+        fold 수 (partial_fit에서 fold를 지정하지 않으면 행 순번 % n_folds 로 배정)
+    standardize : bool
+        True면 StandardScaler + Ridge, False면 입력 X 그대로 Ridge (이미 스케일링된 데이터)
+    scoring : 'rmse' | 'r2'
+        fold 점수 (GridSearchCV neg_root_mean_squared_error / RidgeCV 기본 R²)
+    """
+
+    def __init__(self, n_features, alphas=(0.1, 1.0, 10.0, 50.0, 100.0), n_folds=5,
+                 standardize=True, scoring='rmse', feature_names=None):
+        if scoring not in ('rmse', 'r2'):
+            raise ValueError(f"scoring은 'rmse' 또는 'r2' 입니다: {scoring}")
+        self.alphas = [float(a) for a in alphas]
+        self.n_folds = n_folds
+        self.standardize = standardize
+        self.scoring = scoring
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.folds = [SufficientStats(n_features) for _ in range(n_folds)]
+        self.rows_seen = 0
+        self.alpha_ = None
+        self.coef_ = None
+        self.intercept_ = None
+        self.cv_scores_ = None
+
+    # ------------------------------------------------------------------
+    # 행 추가
+    # ------------------------------------------------------------------
+    def partial_fit(self, X, y, fold=None):
+        """
+        새 행 추가 (O(d²) / 행). fold를 지정하지 않으면 누적 행 순번 % n_folds 로 나눠 담는다.
+        모델 계수는 refit()을 호출해야 갱신된다.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if fold is not None:
+            self.folds[fold].update(X, y)
+        else:
+            assigned = (self.rows_seen + np.arange(len(y))) % self.n_folds
+            for k in range(self.n_folds):
+                mask = assigned == k
+                if mask.any():
+                    self.folds[k].update(X[mask], y[mask])
+        self.rows_seen += len(y)
+        return self
+
+    def partial_fit_kfold(self, X, y):
+        """
+        sklearn KFold(n_folds) (shuffle 없음)과 같은 연속 구간으로 fold 배정
+        → 같은 데이터로 RidgeCV(cv=n_folds) / GridSearchCV(cv=n_folds)와 같은 교차검증
+        """
+        from sklearn.model_selection import KFold
+
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        for k, (_, idx) in enumerate(KFold(n_splits=self.n_folds).split(X)):
+            self.folds[k].update(X[idx], y[idx])
+        self.rows_seen += len(y)
+        return self
+
+    # ------------------------------------------------------------------
+    # 풀이
+    # ------------------------------------------------------------------
+    def total(self):
+        stats = self.folds[0]
+        for fold in self.folds[1:]:
+            stats = stats + fold
+        return stats
+
+    def _scale(self, total):
+        return total.mean_scale()[2] if self.standardize else None
+
+    def cv(self):
+        """alpha 후보별 fold 평균 점수 (rmse: 낮을수록 / r2: 높을수록 좋음)"""
+        total = self.total()
+        # StandardScaler는 전체 학습 데이터로 한 번 fit 된 뒤 fold로 나뉜다 (Pipeline → RidgeCV와 동일)
+        scale = self._scale(total)
+        scores = np.zeros((len(self.alphas), self.n_folds))
+        for k, fold in enumerate(self.folds):
+            train = total - fold
+            for i, alpha in enumerate(self.alphas):
+                coef, intercept = solve_ridge(train, alpha, scale)
+                sse = max(fold.sse(coef, intercept), 0.0)
+                if self.scoring == 'rmse':
+                    scores[i, k] = np.sqrt(sse / fold.n)
+                else:
+                    sst = fold.yty - fold.y_sum ** 2 / fold.n
+                    scores[i, k] = 1.0 - sse / sst if sst > 0 else 0.0
+        return scores.mean(axis=1)
+
+    def refit(self, alpha=None):
+        """alpha 격자 교차검증(alpha 미지정 시) → 전체 통계량으로 계수 계산"""
+        if alpha is None:
+            self.cv_scores_ = self.cv()
+            best = np.argmin(self.cv_scores_) if self.scoring == 'rmse' else np.argmax(self.cv_scores_)
+            alpha = self.alphas[int(best)]
+        total = self.total()
+        self.alpha_ = float(alpha)
+        self.coef_, self.intercept_ = solve_ridge(total, self.alpha_, self._scale(total))
+        return self
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+    # ------------------------------------------------------------------
+    # sklearn 모델로 변환 (predict_budget.py / ensemble_model.py에서 그대로 사용)
+    # ------------------------------------------------------------------
+    def to_ridge(self, mean=None, scale=None):
+        """
+        학습된 sklearn Ridge
+        mean / scale이 주어지면 StandardScaler(mean, scale) 출력에 붙일 계수로 변환
+        """
+        coef, intercept = self.coef_, self.intercept_
+        if scale is not None:
+            intercept = intercept + float(mean @ coef)
+            coef = coef * scale
+        ridge = Ridge(alpha=self.alpha_, random_state=42)
+        ridge.coef_ = coef
+        ridge.intercept_ = intercept
+        ridge.n_features_in_ = len(coef)
+        return ridge
+
+    def to_pipeline(self):
+        """StandardScaler + Ridge Pipeline (train_model_ridge.py 저장 형식과 동일)"""
+        total = self.total()
+        mean, var, scale = total.mean_scale()
+        scaler = StandardScaler()
+        scaler.mean_, scaler.var_, scaler.scale_ = mean, var, scale
+        scaler.n_samples_seen_ = total.n
+        scaler.n_features_in_ = len(mean)
+        if self.feature_names is not None:
+            scaler.feature_names_in_ = np.asarray(self.feature_names, dtype=object)
+        return Pipeline(steps=[("scaler", scaler), ("ridge", self.to_ridge(mean, scale))])
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+
+# ============================================================
+# 3) 명령행: 상태 파일에 새 행 추가 후 재계산
+# ============================================================
+def read_rows(path, feature_names, target):
+    """Parquet / CSV → (X, y)"""
+    import pandas as pd
+
+    df = pd.read_parquet(path) if str(path).endswith('.parquet') else pd.read_csv(path)
+    missing = [c for c in feature_names + [target] if c not in df.columns]
+    if missing:
+        raise ValueError(f"컬럼이 없습니다: {', '.join(missing)}")
+    return df[feature_names].to_numpy(np.float64), df[target].to_numpy(np.float64)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='충분 통계량 Ridge 상태 갱신')
+    parser.add_argument('--state', required=True, help='OnlineRidge 상태 파일 (train_model_ridge.py가 저장)')
+    parser.add_argument('--rows', required=True, help='새 학습 행 (Parquet 또는 CSV, 학습 Feature + 타깃 컬럼)')
+    parser.add_argument('--target', default='Target_ROAS')
+    parser.add_argument('--out', default=None, help='갱신된 StandardScaler + Ridge 파이프라인 저장 경로')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        model = OnlineRidge.load(args.state)
+        X, y = read_rows(args.rows, model.feature_names, args.target)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"Ridge 갱신 실패: {str(e)}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    started = time.perf_counter()
+    model.partial_fit(X, y)
+    update_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    model.refit()
+    refit_ms = (time.perf_counter() - started) * 1000
+
+    model.save(args.state)
+    if args.out:
+        joblib.dump(model.to_pipeline(), args.out)
+
+    print(json.dumps({
+        "added": int(len(y)),
+        "rows": int(model.rows_seen),
+        "alpha": model.alpha_,
+        "cvScores": dict(zip(map(str, model.alphas), np.round(model.cv_scores_, 4).tolist())),
+        "updateMs": round(update_ms, 2),
+        "refitMs": round(refit_ms, 2),
+    }, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
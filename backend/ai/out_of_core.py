@@ -0,0 +1,266 @@
+# out_of_core.py
+
+# ============================================================
+# [메모리보다 큰 Parquet 데이터셋 학습 (out-of-core)]
+# ============================================================
+# 기존 학습 스크립트는 전체 데이터를 DataFrame으로 메모리에 올린 뒤 fit 한다.
+# 이 모듈은 synthetic_data.write_parquet 같은 청크 Parquet 파일을 row group 단위로 흘려 보내며 학습한다.
+#
+# - XGBoost : xgb.DataIter + ExtMemQuantileDMatrix (hist, float32 Feature)
+#             → 배치를 quantile 압축 페이지로 디스크 캐시에 쓰고 학습 중에는 페이지만 읽음
+# - Ridge   : 같은 스트림에서 충분 통계량(XᵀX, Xᵀy, 합계)만 누적한 뒤 닫힌 해로 계산
+#             → Feature 수 x Feature 수 행렬만 메모리에 유지
+# - 검증    : 전체 행 번호 % holdout_every == 0 인 행을 검증 셋으로 (배치 크기와 무관하게 항상 같은 분할)
+#
+# 사용 방법:
+#   python synthetic_data.py --rows=50000000 --out=roas_train.parquet
+#   python out_of_core.py --data=roas_train.parquet [--target=target_roas] [--batch_rows=500000] \
+#     [--rounds=200] [--cache_dir=/tmp/xgb_cache] [--out_dir=모델 저장 폴더]
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import tempfile
+
+import numpy as np
+import xgboost as xgb
+
+from online_ridge import SufficientStats, solve_ridge
+
+DEFAULT_BATCH_ROWS = 500_000
+DEFAULT_HOLDOUT_EVERY = 5     # 5행 중 1행 검증 (20%)
+
+DEFAULT_XGB_PARAMS = {
+    'objective': 'reg:squarederror',
+    'tree_method': 'hist',
+    'max_depth': 5,
+    'learning_rate': 0.1,
+    'max_bin': 256,
+    'seed': 42,
+}
+
+
+def peak_rss_mb():
+    """현재 프로세스 최대 메모리 사용량 (MB, 측정 불가 시 None)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+# ============================================================
+# 1) Parquet 배치 스트림
+# ============================================================
+class ParquetBatches:
+    """
+    Parquet 파일을 batch_rows 행씩 (X float32, y float64) 배열로 읽는 반복자
+
+    subset : 'all' | 'train' | 'valid'
+        전체 행 번호 기준 holdout_every 번째 행마다 검증용으로 분리
+    """
+
+    def __init__(self, path, target, features=None, batch_rows=DEFAULT_BATCH_ROWS,
+                 subset='all', holdout_every=DEFAULT_HOLDOUT_EVERY):
+        import pyarrow.parquet as pq
+
+        self.path = str(path)
+        self.target = target
+        self.batch_rows = batch_rows
+        self.subset = subset
+        self.holdout_every = holdout_every
+
+        metadata = pq.ParquetFile(self.path)
+        names = metadata.schema_arrow.names
+        if target not in names:
+            raise ValueError(f"Parquet에 타깃 컬럼이 없습니다: {target}")
+        self.features = list(features) if features else [c for c in names if c != target]
+        self.num_rows = metadata.metadata.num_rows
+
+    def __iter__(self):
+        import pyarrow.parquet as pq
+
+        offset = 0
+        parquet = pq.ParquetFile(self.path)
+        for batch in parquet.iter_batches(batch_size=self.batch_rows,
+                                          columns=self.features + [self.target]):
+            n = batch.num_rows
+            X = np.empty((n, len(self.features)), dtype=np.float32)
+            for j, name in enumerate(self.features):
+                X[:, j] = batch.column(name).to_numpy()
+            y = batch.column(self.target).to_numpy().astype(np.float64, copy=False)
+
+            if self.subset != 'all':
+                is_valid = (np.arange(offset, offset + n) % self.holdout_every) == 0
+                keep = is_valid if self.subset == 'valid' else ~is_valid
+                X, y = X[keep], y[keep]
+            offset += n
+            if len(y):
+                yield X, y
+
+
+class XGBParquetIter(xgb.DataIter):
+    """ParquetBatches → XGBoost 외부 메모리 DataIter (배치마다 input_data 호출)"""
+
+    def __init__(self, batches: ParquetBatches, cache_prefix):
+        self._batches = batches
+        self._it = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._it is None:
+            self._it = iter(self._batches)
+        try:
+            X, y = next(self._it)
+        except StopIteration:
+            return False
+        input_data(data=X, label=y, feature_names=self._batches.features)
+        return True
+
+    def reset(self):
+        self._it = None
+
+
+# ============================================================
+# 2) 학습
+# ============================================================
+def train_xgb_external(train_batches, params=None, num_boost_round=200, cache_dir=None, nthread=None):
+    """
+    외부 메모리 XGBoost 학습 (hist, ExtMemQuantileDMatrix)
+
+    Returns
+    -------
+    (xgb.Booster, dict)
+        학습된 Booster, 정보 (학습 행 수, 소요 시간)
+    """
+    params = {**DEFAULT_XGB_PARAMS, **(params or {})}
+    if nthread:
+        params['nthread'] = nthread
+    # 캐시 폴더를 지정하지 않으면 임시 폴더를 쓰고 학습 후 삭제
+    temporary = cache_dir is None
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix='xgb_cache_')
+    os.makedirs(cache_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    try:
+        it = XGBParquetIter(train_batches, cache_prefix=os.path.join(cache_dir, 'train'))
+        dtrain = xgb.ExtMemQuantileDMatrix(it, max_bin=params['max_bin'], nthread=nthread)
+        build_sec = time.perf_counter() - started
+
+        booster = xgb.train(params, dtrain, num_boost_round=num_boost_round)
+        rows = int(dtrain.num_row())
+        del dtrain, it
+    finally:
+        if temporary:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return booster, {
+        'rows': rows,
+        'buildSec': round(build_sec, 3),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def stream_rmse(batches, predict):
+    """배치 스트림 RMSE (예측 함수: X → 예측값)"""
+    sq_sum, n = 0.0, 0
+    for X, y in batches:
+        err = y - predict(X)
+        sq_sum += float(err @ err)
+        n += len(y)
+    return float(np.sqrt(sq_sum / n)) if n else None
+
+
+def train_out_of_core(path, target='target_roas', batch_rows=DEFAULT_BATCH_ROWS, num_boost_round=200,
+                      alpha=1.0, holdout_every=DEFAULT_HOLDOUT_EVERY, cache_dir=None,
+                      xgb_params=None, nthread=None):
+    """
+    Parquet 파일 → (Booster, Ridge 해, 보고서 dict)
+    전체 데이터를 DataFrame으로 만들지 않고 배치 단위로만 읽는다.
+    """
+    started = time.perf_counter()
+
+    def batches(subset):
+        return ParquetBatches(path, target, batch_rows=batch_rows, subset=subset,
+                              holdout_every=holdout_every)
+
+    train = batches('train')
+    booster, xgb_info = train_xgb_external(train, xgb_params, num_boost_round, cache_dir, nthread)
+
+    ridge_started = time.perf_counter()
+    # XᵀX, Xᵀy 등 충분 통계량만 누적 → StandardScaler + Ridge 닫힌 해
+    stats = SufficientStats(len(train.features))
+    for X, y in train:
+        stats.update(X, y)
+    mean, _, scale = stats.mean_scale()
+    coef, intercept = solve_ridge(stats, alpha, scale)
+    ridge = {'coef': coef, 'intercept': intercept, 'mean': mean, 'scale': scale}
+    ridge_sec = time.perf_counter() - ridge_started
+
+    valid = batches('valid')
+    xgb_rmse = stream_rmse(valid, lambda X: booster.inplace_predict(X, validate_features=False))
+    ridge_rmse = stream_rmse(valid, lambda X: X.astype(np.float64) @ ridge['coef'] + ridge['intercept'])
+
+    report = {
+        'data': {'path': str(path), 'rows': train.num_rows, 'features': train.features,
+                 'batchRows': batch_rows},
+        'xgboost': {**xgb_info, 'rounds': num_boost_round, 'validRmse': round(xgb_rmse, 4)},
+        'ridge': {'rows': stats.n, 'alpha': alpha, 'seconds': round(ridge_sec, 3),
+                  'validRmse': round(ridge_rmse, 4)},
+        'seconds': round(time.perf_counter() - started, 3),
+        'peakRssMb': peak_rss_mb(),
+    }
+    return booster, ridge, report
+
+
+def save_models(out_dir, booster, ridge, features):
+    """XGBoost Booster(json) + Ridge 계수(json) 저장"""
+    os.makedirs(out_dir, exist_ok=True)
+    booster.save_model(os.path.join(out_dir, 'out_of_core_xgb.json'))
+    with open(os.path.join(out_dir, 'out_of_core_ridge.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'features': features,
+            'coef': ridge['coef'].tolist(),
+            'intercept': ridge['intercept'],
+            'mean': ridge['mean'].tolist(),
+            'scale': ridge['scale'].tolist(),
+        }, f, ensure_ascii=False)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='청크 Parquet out-of-core 학습 (XGBoost 외부 메모리 + Ridge 충분 통계량)')
+    parser.add_argument('--data', required=True, help='학습 Parquet 경로 (synthetic_data.py --out)')
+    parser.add_argument('--target', default='target_roas')
+    parser.add_argument('--batch_rows', type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--alpha', type=float, default=1.0, help='Ridge 규제 강도')
+    parser.add_argument('--holdout_every', type=int, default=DEFAULT_HOLDOUT_EVERY)
+    parser.add_argument('--cache_dir', default=None, help='XGBoost 외부 메모리 캐시 폴더 (기본: 임시 폴더)')
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--out_dir', default=None, help='모델 저장 폴더 (없으면 저장 안 함)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        booster, ridge, report = train_out_of_core(
+            args.data, target=args.target, batch_rows=args.batch_rows, num_boost_round=args.rounds,
+            alpha=args.alpha, holdout_every=args.holdout_every, cache_dir=args.cache_dir,
+            nthread=args.threads,
+        )
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"out-of-core 학습 실패: {str(e)}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    if args.out_dir:
+        save_models(args.out_dir, booster, ridge, report['data']['features'])
+        report['outDir'] = args.out_dir
+    print(json.dumps(report, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
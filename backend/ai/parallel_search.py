@@ -0,0 +1,231 @@
+# parallel_search.py
+
+# ============================================================
+# [프로세스 병렬 하이퍼파라미터 탐색]
+# ============================================================
+# GridSearchCV(n_jobs=N)는 작업마다 학습 행렬을 pickle 해서 워커로 보내고,
+# 각 워커의 XGBoost는 기본으로 CPU 코어 전체 스레드를 쓰기 때문에
+# 워커 N개 x 코어 수 만큼 스레드가 생겨 오히려 느려질 수 있다.
+#
+# 이 모듈은
+# 1. 학습 행렬(X, y)을 공유 메모리(multiprocessing.shared_memory)에 한 번만 올리고
+#    워커는 이름으로 붙어 복사 없이 numpy view로 사용
+#    (KFold(shuffle=False) fold는 연속 구간 → test fold와 양 끝 fold의 train은 slice view,
+#     가운데 fold의 train만 앞뒤 구간을 이어 붙인 복사본 1개)
+# 2. 워커마다 고정 스레드 수를 배정 (XGBoost n_jobs + BLAS/OpenMP threadpool 제한)
+#    → 워커 수 x 워커당 스레드 ≤ CPU 코어 수
+# 3. (후보 x fold) 단위 작업을 나눠 실행하고, fold 분할/채점은 GridSearchCV(cv=3)와 동일
+#    → 같은 최적 파라미터와 CV 점수, 최적 모델은 부모 프로세스에서 train 전체로 다시 학습
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid
+
+
+# ============================================================
+# 1) 공유 메모리 배열
+# ============================================================
+class SharedArrays:
+    """
+    여러 numpy 배열을 공유 메모리 블록 1개에 올려 두는 컨테이너 (부모 프로세스 소유)
+
+    with SharedArrays({'X': X, 'y': y}) as shared:
+        shared.spec  → 워커에 넘길 (블록 이름, 배열별 dtype/shape/offset) - 크기가 작아 pickle 비용 없음
+    """
+
+    def __init__(self, arrays: dict):
+        arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+        layout, offset = {}, 0
+        for name, arr in arrays.items():
+            offset = (offset + 63) // 64 * 64   # 64바이트 정렬
+            layout[name] = (arr.dtype.str, arr.shape, offset)
+            offset += arr.nbytes
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, arr in arrays.items():
+            _, _, start = layout[name]
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=self._shm.buf, offset=start)[...] = arr
+        self.spec = (self._shm.name, layout)
+        self.nbytes = offset
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_shared(spec):
+    """워커 측: 공유 메모리 블록에 붙어 배열 view dict 반환 (복사 없음) → (SharedMemory, dict)"""
+    name, layout = spec
+    try:
+        # Python 3.13+: 부모가 만든 블록을 워커 쪽에서 추적하지 않음
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # 3.12 이하: 풀 워커는 부모의 resource tracker를 함께 쓰므로 등록이 중복되어도
+        # 블록은 부모가 unlink 할 때 한 번만 정리된다 (워커에서 unregister 하면 안 됨)
+        shm = shared_memory.SharedMemory(name=name)
+    arrays = {
+        key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        for key, (dtype, shape, offset) in layout.items()
+    }
+    return shm, arrays
+
+
+# ============================================================
+# 2) 워커
+# ============================================================
+# 워커 프로세스 전역 상태 (initializer에서 1회 설정)
+_worker = {}
+
+
+def _init_worker(spec, threads):
+    """워커 시작 시 공유 배열 연결 + 스레드 수 고정"""
+    from threadpoolctl import threadpool_limits
+
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    _worker['limits'] = threadpool_limits(limits=threads)
+    _worker['shm'], arrays = attach_shared(spec)
+    _worker['X'], _worker['y'] = arrays['X'], arrays['y']
+    _worker['threads'] = threads
+
+
+def _with_threads(estimator, threads):
+    """n_jobs 파라미터가 있는 모델(XGBoost 등)은 워커 스레드 수로 고정"""
+    if 'n_jobs' in estimator.get_params():
+        estimator.set_params(n_jobs=threads)
+    return estimator
+
+
+def _train_rows(arr, start, stop):
+    """test 구간 [start, stop)을 뺀 나머지 행 (양 끝 fold면 slice view, 가운데 fold면 이어 붙인 복사본)"""
+    if start == 0:
+        return arr[stop:]
+    if stop == len(arr):
+        return arr[:start]
+    return np.concatenate((arr[:start], arr[stop:]))
+
+
+def _fit_fold(task):
+    """(후보 번호, fold 번호, 모델, 파라미터, test 시작 행, test 끝 행) → (후보, fold, RMSE, 초)"""
+    cand_idx, fold_idx, estimator, params, start, stop = task
+    X, y = _worker['X'], _worker['y']
+    started = time.perf_counter()
+    model = _with_threads(clone(estimator).set_params(**params), _worker['threads'])
+    model.fit(_train_rows(X, start, stop), _train_rows(y, start, stop))
+    pred = model.predict(X[start:stop])
+    rmse = float(np.sqrt(np.mean((y[start:stop] - pred) ** 2)))
+    return cand_idx, fold_idx, rmse, time.perf_counter() - started
+
+
+# ============================================================
+# 3) 탐색 실행기
+# ============================================================
+def thread_allowance(n_workers, total_threads=None):
+    """워커당 스레드 수 (워커 수 x 스레드 ≤ 전체 코어)"""
+    total_threads = total_threads or os.cpu_count() or 1
+    return max(1, total_threads // max(1, n_workers))
+
+
+def parallel_grid_search(estimator, param_grid, X, y, cv=3, n_workers=None, threads_per_worker=None):
+    """
+    GridSearchCV(cv=cv, scoring='neg_root_mean_squared_error')와 같은 탐색을 프로세스 병렬로 실행
+
+    Parameters
+    ----------
+    estimator : sklearn 호환 회귀 모델 (clone 가능)
+    param_grid : dict
+    X, y : np.ndarray
+    cv : int
+        KFold 분할 수 (GridSearchCV 회귀 기본값과 같이 shuffle 없음)
+    n_workers : int
+        워커 프로세스 수 (기본: CPU 코어 수)
+    threads_per_worker : int
+        워커당 스레드 수 (기본: 코어 수 // 워커 수)
+
+    Returns
+    -------
+    (estimator, dict)
+        train 전체로 다시 학습한 최적 모델,
+        탐색 정보 (최적 파라미터, 후보별 평균 RMSE, 소요 시간, 공유 메모리 크기)
+    """
+    started = time.perf_counter()
+    n_workers = n_workers or os.cpu_count() or 1
+    threads = threads_per_worker or thread_allowance(n_workers)
+
+    X = np.ascontiguousarray(X)
+    y = np.ascontiguousarray(y)
+    candidates = list(ParameterGrid(param_grid))
+    # shuffle 없는 KFold의 test fold는 연속 구간 → 인덱스 배열 대신 (시작, 끝) 행만 전달
+    folds = [(int(test_idx[0]), int(test_idx[-1]) + 1) for _, test_idx in KFold(n_splits=cv).split(X)]
+    tasks = [
+        (cand_idx, fold_idx, estimator, params, start, stop)
+        for cand_idx, params in enumerate(candidates)
+        for fold_idx, (start, stop) in enumerate(folds)
+    ]
+
+    scores = np.zeros((len(candidates), cv))
+    with SharedArrays({'X': X, 'y': y}) as shared:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(shared.spec, threads)) as pool:
+            # 오래 걸리는 후보가 마지막에 몰리지 않도록 작업 단위를 작게 (chunksize=1)
+            for cand_idx, fold_idx, rmse, _ in pool.map(_fit_fold, tasks):
+                scores[cand_idx, fold_idx] = rmse
+        shared_mb = shared.nbytes / (1024 * 1024)
+    search_sec = time.perf_counter() - started
+
+    mean_rmse = scores.mean(axis=1)
+    # GridSearchCV와 같이 점수가 같으면 먼저 나온 후보 선택
+    best_idx = int(np.argmin(mean_rmse))
+    best_params = candidates[best_idx]
+
+    best_model = _with_threads(clone(estimator).set_params(**best_params), os.cpu_count() or 1)
+    best_model.fit(X, y)
+
+    return best_model, {
+        'method': 'parallel_grid',
+        'best_params': best_params,
+        'mean_rmse': mean_rmse.tolist(),
+        'best_rmse': float(mean_rmse[best_idx]),
+        'fits': len(tasks) + 1,
+        'workers': n_workers,
+        'threads_per_worker': threads,
+        'search_seconds': search_sec,
+        'seconds': time.perf_counter() - started,
+        'shared_mb': shared_mb,
+    }
+
+
+def benchmark_workers(estimator, param_grid, X, y, worker_counts=(1, 2, 4, 8), cv=3):
+    """
+    워커 수별 탐색 시간과 속도 향상 비율 (1 워커 기준, worker_counts에 1이 없어도 먼저 실행)
+
+    Returns
+    -------
+    list[dict]
+        [{'workers', 'threads_per_worker', 'seconds', 'speedup', 'best_params'}, ...]
+    """
+    rows = []
+    for n_workers in [1] + [n for n in worker_counts if n != 1]:
+        _, info = parallel_grid_search(estimator, param_grid, X, y, cv=cv, n_workers=n_workers)
+        rows.append({
+            'workers': n_workers,
+            'threads_per_worker': info['threads_per_worker'],
+            'seconds': info['search_seconds'],
+            'best_params': info['best_params'],
+        })
+    base = next(row['seconds'] for row in rows if row['workers'] == 1)
+    for row in rows:
+        row['speedup'] = base / row['seconds'] if row['seconds'] else None
+    return rows
@@ -71,6 +71,91 @@ class NumpyEncoder(json.JSONEncoder):
         return super(NumpyEncoder, self).default(obj)
 
 
+# 모델 입력 Feature → 리포트 표시용 이름
+FEATURE_LABELS = {
+    'cost': '채널 예산',
+    'cpc': 'CPC',
+    'ctr': 'CTR',
+    'trend_score': '트렌드 점수',
+    'channel_naver': '채널 특성',
+    'channel_meta': '채널 특성',
+    'channel_google': '채널 특성',
+    'channel_karrot': '채널 특성',
+    'expected_clicks': '예상 클릭수',
+    'trend_efficiency': '트렌드 효율',
+    'click_value': '클릭 가치',
+}
+
+
+def predict_with_contributions(ensemble_model, X_scaled):
+    """
+    앙상블 예측값과 Feature별 기여도를 함께 계산
+
+    Parameters
+    ----------
+    ensemble_model : VotingRegressor
+        Ridge + XGBoost 가중 평균 앙상블
+    X_scaled : np.ndarray
+        scaler.transform 결과 (채널 수, Feature 수)
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray)
+        예측 ROAS (n,), 기여도 (n, Feature 수 + 1) - 마지막 열은 bias
+
+    설명
+    ----
+    - XGBoost: 내장 pred_contribs(approx_contribs, 경로 기반 기여도)로 계산
+      기여도 행 합계 = XGBoost 예측값
+    - Ridge  : 계수 * 입력값 (+ intercept를 bias로)
+    - 앙상블 : VotingRegressor 가중치로 두 기여도를 가중 평균
+    기여도의 행 합계가 곧 앙상블 예측값이므로 predict를 따로 호출하지 않는다.
+    """
+    import xgboost as xgb
+
+    X = np.asarray(X_scaled, dtype=np.float64)
+    n_rows, n_features = X.shape
+
+    weights = ensemble_model.weights
+    if weights is None:
+        weights = [1.0] * len(ensemble_model.estimators_)
+    weights = np.asarray(weights, dtype=float) / np.sum(weights)
+
+    contribs = np.zeros((n_rows, n_features + 1))
+    for weight, estimator in zip(weights, ensemble_model.estimators_):
+        if hasattr(estimator, 'get_booster'):
+            part = estimator.get_booster().predict(
+                xgb.DMatrix(X.astype(np.float32)),
+                pred_contribs=True,
+                approx_contribs=True,
+                validate_features=False
+            )
+        elif hasattr(estimator, 'coef_'):
+            part = np.zeros((n_rows, n_features + 1))
+            part[:, :-1] = X * np.ravel(estimator.coef_)
+            part[:, -1] = estimator.intercept_
+        else:
+            # 기여도를 알 수 없는 모델은 예측값 전체를 bias로 처리
+            part = np.zeros((n_rows, n_features + 1))
+            part[:, -1] = estimator.predict(X)
+        contribs += weight * part
+
+    return contribs.sum(axis=1), contribs
+
+
+def top_drivers(contrib_row, feature_names, k=3):
+    """
+    기여도 절댓값 상위 k개 Feature (bias 제외, 채널 one-hot은 하나로 합산)
+    """
+    merged = {}
+    for name, value in zip(feature_names, contrib_row[:-1]):
+        label = FEATURE_LABELS.get(name, name)
+        merged[label] = merged.get(label, 0.0) + float(value)
+
+    ranked = sorted(merged.items(), key=lambda item: abs(item[1]), reverse=True)[:k]
+    return [{"feature": label, "contribution": round(value, 2)} for label, value in ranked if value != 0]
+
+
 def generate_past_history(predicted_roas, duration=7, seed_date=None):
     """
     예측된 채널별 ROAS를 기준으로 과거 추이처럼 보이는 history 데이터를 생성
@@ -208,7 +293,7 @@ def build_safe_bounds(n, total_budget, min_budget_default=30000, max_ratio_defau
     return [(min_per, max_per) for _ in range(n)]
 
 
-def build_pro_report(total_budget, allocated_budget, predicted_roas, expected_revenue, duration, clip_min, clip_max, min_budget_default, max_ratio_default):
+def build_pro_report(total_budget, allocated_budget, predicted_roas, expected_revenue, duration, clip_min, clip_max, min_budget_default, max_ratio_default, drivers=None):
     """
     최종 예산 추천 결과를 사람이 읽기 쉬운 자연어 리포트로 생성
 
@@ -230,6 +315,8 @@ def build_pro_report(total_budget, allocated_budget, predicted_roas, expected_re
         채널별 최소 예산
     max_ratio_default : float
         채널별 최대 예산 비율
+    drivers : list[list[dict]], optional
+        채널별 예측 ROAS의 주요 기여 Feature (top_drivers 결과)
 
     Returns
     -------
@@ -298,11 +385,18 @@ def build_pro_report(total_budget, allocated_budget, predicted_roas, expected_re
                 action = "**부분 감액 고려** + 고효율 채널로 일부 이동"
                 effect = "예상 수익률을 끌어올리는 방향으로 재배분."
 
+        # 모델이 실제로 근거로 삼은 Feature (기여도 상위)
+        model_basis = ""
+        if drivers and drivers[i]:
+            factors = ", ".join(f"{d['feature']} {d['contribution']:+.1f}%p" for d in drivers[i])
+            model_basis = f"  - 모델 예측 요인: {factors}\n"
+
         # 채널별 상세 설명 추가
         lines.append(
             f"• **{name}**\n"
             f"  - 현상: 예측 ROAS **{r:.2f}%** / 예산 배정 **{ratio}%**\n"
             f"  - 데이터 근거: 평균 대비 **{compare_abs:.2f}%p {compare_word}**, 예상 매출 기여 **{int(round(rev)):,}원**\n"
+            f"{model_basis}"
             f"  - 전략 제안: {action}\n"
             f"  - 기대 효과: {effect}"
         )
@@ -531,7 +625,7 @@ def main():
     # 전체 예산을 일단 균등 분할한 가상의 baseline budget을 만든 뒤,
     # 각 채널에 대해 "이 정도 예산이 들어갔을 때의 예상 ROAS"를 예측한다.
     baseline_budget = budget_num / n_channels
-    predicted_roas_list = []
+    rows = []
     
     for ch in channels:
         factor = channel_factors[ch]
@@ -564,15 +658,14 @@ def main():
             'click_value': click_value
         }
         
-        # 학습 시와 동일한 컬럼 순서로 DataFrame 생성
-        df_temp = pd.DataFrame([row])[model_columns]
-
-        # 학습 때 저장한 scaler로 표준화
-        X_scaled = pd.DataFrame(scaler.transform(df_temp), columns=df_temp.columns)
+        rows.append(row)
 
-        # 앙상블 모델로 해당 채널의 예측 ROAS 계산
-        pred_roas = ensemble_model.predict(X_scaled)[0]
-        predicted_roas_list.append(pred_roas)
+    # 네 채널을 한 번에 표준화 + 예측 (학습 시와 동일한 컬럼 순서)
+    # 예측과 함께 Feature별 기여도를 계산해 리포트 근거로 사용
+    df_channels = pd.DataFrame(rows)[model_columns]
+    X_scaled = scaler.transform(df_channels)
+    predicted_roas_list, contributions = predict_with_contributions(ensemble_model, X_scaled)
+    channel_drivers = [top_drivers(c, model_columns) for c in contributions]
 
     # 예측값이 비현실적인 범위를 벗어나면 clip 처리
     predicted_roas_list = clip_predicted_roas(predicted_roas_list, CLIP_MIN, CLIP_MAX)
@@ -626,7 +719,8 @@ def main():
             clip_min=CLIP_MIN,
             clip_max=CLIP_MAX,
             min_budget_default=MIN_BUDGET_DEFAULT,
-            max_ratio_default=MAX_RATIO_DEFAULT
+            max_ratio_default=MAX_RATIO_DEFAULT,
+            drivers=channel_drivers
         )
 
         # 차트용 히스토리 데이터 생성 (씨드 처리 추가)
@@ -638,6 +732,7 @@ def main():
             "total_budget": int(total_budget),
             "allocated_budget": [int(b) for b in np.round(allocated_budget, 0)],
             "predicted_roas": [round(float(r), 2) for r in predicted_roas_list],
+            "roas_drivers": dict(zip(channels, channel_drivers)),
             "expected_revenue": int(round(real_expected_revenue, 0)),
             "history": history_data,
             "ai_report": report_text
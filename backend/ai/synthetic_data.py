@@ -0,0 +1,272 @@
+# synthetic_data.py
+
+# ============================================================
+# [벡터화된 ROAS 학습 데이터 생성기]
+# ============================================================
+# ensemble_model.generate_realistic_data의 가정(채널별 성향, 적정 예산 패널티,
+# 트렌드 영향, noise)을 그대로 유지하면서 행 단위 for 루프 대신
+# 전체 행의 난수를 배열로 한 번에 뽑아 계산한다.
+#
+# - generate_frame(n, rng)   : n행을 한 번에 생성 (메모리에 올라가는 크기)
+# - generate_chunks(...)     : chunk_size 단위로 나눠 생성하는 generator (메모리 사용량 = 청크 1개)
+# - write_parquet(...)       : 청크를 하나씩 Parquet 파일에 이어 쓰기 (RAM보다 큰 데이터셋)
+# - compare_marginals(...)   : 기존 행 단위 생성기와 컬럼별 분포 비교 (KS 검정)
+#
+# 난수 순서가 달라 기존 생성기와 값이 한 행씩 일치하지는 않지만, 분포는 같다.
+#
+# 사용 방법:
+#   python synthetic_data.py --rows=10000000 --out=roas_train.parquet [--chunk_size=1000000] [--seed=42]
+#   python synthetic_data.py --check [--rows=20000]    # 기존 생성기와 분포 비교
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------
+# 채널별 기본 성향 / 적정 예산 (ensemble_model.generate_realistic_data와 동일)
+# ------------------------------------------------------------
+CHANNELS = ["naver", "meta", "google", "karrot"]
+BASE_METRICS = {
+    "naver": {"roas": 3.5, "cpc": 800, "ctr": 2.5},
+    "meta": {"roas": 2.2, "cpc": 400, "ctr": 1.2},
+    "google": {"roas": 2.8, "cpc": 600, "ctr": 1.8},
+    "karrot": {"roas": 3.0, "cpc": 300, "ctr": 3.0}
+}
+OPTIMAL_BUDGET = {
+    "naver": 500_000,
+    "meta": 300_000,
+    "google": 400_000,
+    "karrot": 100_000
+}
+
+# 채널 번호로 바로 꺼내 쓰는 조회 배열 (CHANNELS 순서)
+_BASE_ROAS = np.array([BASE_METRICS[c]["roas"] for c in CHANNELS])
+_BASE_CPC = np.array([BASE_METRICS[c]["cpc"] for c in CHANNELS], dtype=float)
+_BASE_CTR = np.array([BASE_METRICS[c]["ctr"] for c in CHANNELS])
+_OPTIMAL = np.array([OPTIMAL_BUDGET[c] for c in CHANNELS], dtype=float)
+
+# 기존 생성기와 같은 컬럼 순서
+COLUMNS = [
+    "cost", "cpc", "ctr", "trend_score",
+    "channel_naver", "channel_meta", "channel_google", "channel_karrot",
+    "expected_clicks", "trend_efficiency", "click_value",
+    "target_roas",
+]
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+# ============================================================
+# 1) 벡터화 생성
+# ============================================================
+def generate_frame(n_samples: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    n_samples 행을 배열 연산으로 한 번에 생성
+
+    Parameters
+    ----------
+    n_samples : int
+        생성할 행 수
+    rng : np.random.Generator
+        난수 생성기 (np.random.default_rng(seed))
+
+    Returns
+    -------
+    pd.DataFrame
+        COLUMNS 순서의 feature + target_roas
+    """
+    # 채널 / 광고비(1만 ~ 200만원) / 트렌드 점수(30 ~ 99)
+    channel = rng.integers(0, len(CHANNELS), n_samples)
+    cost = rng.integers(10_000, 2_000_000, n_samples)
+    trend_score = rng.integers(30, 100, n_samples)
+
+    # 적정 예산 이탈 패널티 (최대 2.0) / 트렌드 영향
+    optimal_budget = _OPTIMAL[channel]
+    diff_ratio = np.abs(cost - optimal_budget) / optimal_budget
+    penalty_factor = np.minimum((diff_ratio ** 2) * 1.5, 2.0)
+    trend_impact = (trend_score - 50) * 0.05
+
+    # CPC / CTR (0.9 ~ 1.1 랜덤 계수, 하한 처리)
+    cpc = _BASE_CPC[channel] * (1.0 + penalty_factor * 0.2) * rng.uniform(0.9, 1.1, n_samples)
+    ctr = _BASE_CTR[channel] * (1.0 + trend_impact * 0.1 - penalty_factor * 0.1) \
+        * rng.uniform(0.9, 1.1, n_samples)
+    np.maximum(cpc, 100, out=cpc)
+    np.maximum(ctr, 0.1, out=ctr)
+
+    # target ROAS (noise 표준편차 0.5, 0.5 ~ 8.0 clip, % 단위 100배)
+    true_value = _BASE_ROAS[channel] - penalty_factor + trend_impact
+    target_roas = np.clip(true_value + rng.normal(0, 0.5, n_samples), 0.5, 8.0) * 100
+
+    expected_clicks = cost / cpc
+    columns = {
+        "cost": cost,
+        "cpc": cpc,
+        "ctr": ctr,
+        "trend_score": trend_score,
+    }
+    for i, name in enumerate(CHANNELS):
+        columns[f"channel_{name}"] = (channel == i).astype(np.int64)
+    columns["expected_clicks"] = expected_clicks
+    columns["trend_efficiency"] = trend_score / np.log1p(cost)
+    columns["click_value"] = expected_clicks * ctr
+    columns["target_roas"] = target_roas
+    return pd.DataFrame(columns, columns=COLUMNS, copy=False)
+
+
+def generate_chunks(n_samples: int, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 42):
+    """
+    chunk_size 행씩 DataFrame을 차례로 생성 (메모리에는 청크 1개만 유지)
+
+    청크마다 SeedSequence.spawn으로 독립된 난수 스트림을 쓰므로
+    같은 (seed, chunk_size)면 항상 같은 데이터가 나온다.
+    """
+    n_chunks = -(-n_samples // chunk_size) if n_samples > 0 else 0
+    for i, child in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        size = min(chunk_size, n_samples - i * chunk_size)
+        yield generate_frame(size, np.random.default_rng(child))
+
+
+def write_parquet(path, n_samples: int, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 42) -> dict:
+    """
+    청크를 생성하는 즉시 Parquet row group으로 이어 써서 RAM보다 큰 데이터셋을 만든다.
+
+    Returns
+    -------
+    dict
+        rows, chunks, seconds, 생성 속도(rowsPerSec)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    started = time.perf_counter()
+    writer = None
+    chunks = 0
+    try:
+        for chunk in generate_chunks(n_samples, chunk_size, seed):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(str(path), table.schema)
+            writer.write_table(table)
+            chunks += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    seconds = time.perf_counter() - started
+    return {
+        "path": str(path),
+        "rows": n_samples,
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "rowsPerSec": round(n_samples / seconds) if seconds else None,
+    }
+
+
+# ============================================================
+# 2) 기존 생성기와 분포 비교
+# ============================================================
+def reference_frame(n_samples: int, seed: int = 42) -> pd.DataFrame:
+    """
+    기존 행 단위 생성기 (ensemble_model.generate_realistic_data 변경 전 구현) - 분포 비교 기준용
+    """
+    rs = np.random.RandomState(seed)
+    rows = []
+    for _ in range(n_samples):
+        channel = rs.choice(CHANNELS)
+        cost = rs.randint(10_000, 2_000_000)
+        trend_score = rs.randint(30, 100)
+        optimal_budget = OPTIMAL_BUDGET[channel]
+        diff_ratio = abs(cost - optimal_budget) / optimal_budget
+        penalty_factor = min((diff_ratio ** 2) * 1.5, 2.0)
+        trend_impact = (trend_score - 50) * 0.05
+        cpc = BASE_METRICS[channel]["cpc"] * (1.0 + (penalty_factor * 0.2)) * rs.uniform(0.9, 1.1)
+        ctr = BASE_METRICS[channel]["ctr"] * (1.0 + (trend_impact * 0.1) - (penalty_factor * 0.1)) \
+            * rs.uniform(0.9, 1.1)
+        cpc = max(100, cpc)
+        ctr = max(0.1, ctr)
+        true_value = BASE_METRICS[channel]["roas"] - penalty_factor + trend_impact
+        target_roas = np.clip(true_value + rs.normal(0, 0.5), 0.5, 8.0)
+        row = {"cost": cost, "cpc": cpc, "ctr": ctr, "trend_score": trend_score}
+        for name in CHANNELS:
+            row[f"channel_{name}"] = 1 if channel == name else 0
+        row["expected_clicks"] = cost / cpc
+        row["trend_efficiency"] = trend_score / np.log1p(cost)
+        row["click_value"] = (cost / cpc) * ctr
+        row["target_roas"] = target_roas * 100
+        rows.append(row)
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def compare_marginals(df_new: pd.DataFrame, df_ref: pd.DataFrame, alpha: float = 0.01) -> dict:
+    """
+    컬럼별 2표본 Kolmogorov-Smirnov 검정 (채널 원-핫 컬럼은 비율 차이도 함께 표시)
+
+    Returns
+    -------
+    dict
+        {"columns": {컬럼: {ks, pValue, meanNew, meanRef, ok}}, "ok": 모든 컬럼 p >= alpha}
+    """
+    from scipy.stats import ks_2samp
+
+    result = {}
+    for column in COLUMNS:
+        test = ks_2samp(df_new[column].to_numpy(), df_ref[column].to_numpy())
+        result[column] = {
+            "ks": round(float(test.statistic), 4),
+            "pValue": round(float(test.pvalue), 4),
+            "meanNew": round(float(df_new[column].mean()), 4),
+            "meanRef": round(float(df_ref[column].mean()), 4),
+            "ok": bool(test.pvalue >= alpha),
+        }
+    return {"columns": result, "alpha": alpha, "ok": all(c["ok"] for c in result.values())}
+
+
+# ============================================================
+# 3) 명령행 실행
+# ============================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='벡터화 ROAS 학습 데이터 생성')
+    parser.add_argument('--rows', type=int, default=None,
+                        help='생성할 행 수 (기본: 생성 10,000,000 / --check 20,000)')
+    parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default=None, help='Parquet 출력 경로 (없으면 생성 속도만 측정)')
+    parser.add_argument('--check', action='store_true', help='기존 행 단위 생성기와 분포(KS) 비교')
+    parser.add_argument('--alpha', type=float, default=0.01)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.check:
+        n_samples = args.rows or 20_000
+        started = time.perf_counter()
+        df_ref = reference_frame(n_samples, seed=args.seed)
+        ref_sec = time.perf_counter() - started
+        started = time.perf_counter()
+        df_new = generate_frame(n_samples, np.random.default_rng(args.seed + 1))
+        new_sec = time.perf_counter() - started
+        report = compare_marginals(df_new, df_ref, alpha=args.alpha)
+        report.update({"rows": n_samples, "referenceSec": round(ref_sec, 3),
+                       "vectorizedSec": round(new_sec, 4)})
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        sys.exit(0 if report["ok"] else 1)
+
+    n_samples = args.rows or 10_000_000
+    if args.out:
+        report = write_parquet(args.out, n_samples, args.chunk_size, args.seed)
+    else:
+        started = time.perf_counter()
+        for _ in generate_chunks(n_samples, args.chunk_size, args.seed):
+            pass
+        seconds = time.perf_counter() - started
+        report = {"rows": n_samples, "seconds": round(seconds, 3),
+                  "rowsPerSec": round(n_samples / seconds) if seconds else None}
+    print(json.dumps(report, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+# train_all.py
+
+# ============================================================
+# [학습 스크립트 통합 실행기 + 산출물 캐시]
+# ============================================================
+# 흩어져 있는 학습 스크립트를 한 곳에서 선언하고 실행한다.
+#
+#   ensemble_roas    backend/ai/ensemble_model.py           → ensemble_roas_model.pkl, roas_scaler.pkl
+#   budget_xgb       backend/ai/train_model_v2.py           → optimal_budget_xgb_model.json
+#   budget_ridge     backend/ai/train_model_ridge.py        → optimal_budget_xgb_model.json, baseline_ridge_*.joblib
+#   campaign_local   ml_training/train_models_local.py      → roas_predictor.pkl, platform_recommender.pkl, ...
+#
+# 모델마다 (데이터 소스, 파라미터, 코드 파일, 라이브러리 버전)을 해시해
+# 레지스트리의 manifest.json 해시와 같고 산출물이 모두 있으면 학습을 건너뛴다.
+# 변경된 모델은 서로 독립이므로 동시에 학습 프로세스로 실행하고 (--workers),
+# 임시 폴더에 학습한 뒤 os.replace로 레지스트리 폴더를 교체한다. (실패 시 기존 산출물 유지)
+#
+# 레지스트리 구조 (기본: backend/ml_models/registry, ML_REGISTRY_DIR로 변경 가능):
+#   <모델 이름>/
+#     manifest.json   입력 해시, 파라미터, 산출물, 단계별 소요 시간
+#     train.log       학습 스크립트 출력
+#     <산출물 파일>
+#   index.json        마지막 실행 보고서
+#
+# 사용 방법:
+#   python train_all.py [--models=ensemble_roas,budget_ridge] [--workers=N] [--force] [--dry_run]
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+AI_DIR = Path(__file__).resolve().parent
+REPO_DIR = AI_DIR.parent.parent
+DEFAULT_REGISTRY_DIR = Path(os.environ.get('ML_REGISTRY_DIR', REPO_DIR / 'backend' / 'ml_models' / 'registry'))
+
+# 해시에 포함할 라이브러리 (버전이 바뀌면 pickle 호환성 때문에 다시 학습)
+LIBRARIES = ['numpy', 'pandas', 'sklearn', 'xgboost', 'joblib']
+
+# ------------------------------------------------------------
+# 모델 선언
+# ------------------------------------------------------------
+# script    : 학습 스크립트 (--out_dir=<폴더> 로 산출물 위치를 받음)
+# sources   : 스크립트가 import 하는 로컬 모듈 (코드가 바뀌면 다시 학습)
+# data      : 학습 데이터 소스 (n_samples는 --n_samples 로 전달)
+# params    : 그 외 스크립트 인수 (--key=value)
+# artifacts : 산출물 파일 이름
+MODELS = {
+    'ensemble_roas': {
+        'script': AI_DIR / 'ensemble_model.py',
+        'sources': [AI_DIR / 'synthetic_data.py', AI_DIR / 'online_ridge.py', AI_DIR / 'parallel_search.py',
+                    AI_DIR / 'train_phases.py'],
+        'data': {'source': 'synthetic_data.generate_frame', 'seed': 42, 'n_samples': 5000},
+        'params': {'search': 'grid'},
+        'artifacts': ['ensemble_roas_model.pkl', 'roas_scaler.pkl'],
+    },
+    'budget_xgb': {
+        'script': AI_DIR / 'train_model_v2.py',
+        'sources': [AI_DIR / 'train_phases.py'],
+        'data': {'source': 'train_model_v2.generate_realistic_data', 'seed': 42, 'n_samples': 5000},
+        'params': {},
+        'artifacts': ['optimal_budget_xgb_model.json'],
+    },
+    'budget_ridge': {
+        'script': AI_DIR / 'train_model_ridge.py',
+        'sources': [AI_DIR / 'online_ridge.py', AI_DIR / 'train_phases.py'],
+        'data': {'source': 'train_model_ridge.generate_realistic_data', 'seed': 42, 'n_samples': 5000},
+        'params': {},
+        'artifacts': ['optimal_budget_xgb_model.json', 'baseline_ridge_model.joblib',
+                      'baseline_ridge_state.joblib'],
+    },
+    'campaign_local': {
+        'script': REPO_DIR / 'ml_training' / 'train_models_local.py',
+        'sources': [AI_DIR / 'train_phases.py'],
+        'data': {'source': 'train_models_local (synthetic campaigns)', 'seed': 42, 'n_samples': 10000},
+        'params': {},
+        'artifacts': ['roas_predictor.pkl', 'platform_recommender.pkl', 'scaler.pkl', 'scaler_platform.pkl',
+                      'label_encoders.pkl', 'feature_columns.pkl', 'platform_feature_columns.pkl'],
+    },
+}
+
+
+# ============================================================
+# 1) 입력 해시
+# ============================================================
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def library_versions():
+    versions = {}
+    for name in LIBRARIES:
+        try:
+            module = __import__(name)
+            versions[name] = getattr(module, '__version__', 'unknown')
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+def input_fingerprint(spec, versions):
+    """모델 입력(코드, 데이터 소스, 파라미터, Python/라이브러리 버전) → (sha256, 구성 dict)"""
+    files = [spec['script']] + list(spec['sources'])
+    # 데이터 소스가 파일이면 내용도 해시
+    data = dict(spec['data'])
+    if data.get('path'):
+        files.append(Path(data['path']))
+    inputs = {
+        'files': {str(Path(f).relative_to(REPO_DIR)) if Path(f).is_relative_to(REPO_DIR) else str(f):
+                  file_digest(f) for f in files},
+        'data': data,
+        'params': spec['params'],
+        'python': sys.version.split()[0],
+        'libraries': versions,
+    }
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return digest, inputs
+
+
+def load_manifest(model_dir):
+    try:
+        with open(model_dir / 'manifest.json', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_up_to_date(model_dir, spec, digest):
+    manifest = load_manifest(model_dir)
+    return (
+        manifest is not None
+        and manifest.get('hash') == digest
+        and all((model_dir / name).exists() for name in spec['artifacts'])
+    )
+
+
+# ============================================================
+# 2) 학습 실행
+# ============================================================
+def build_command(spec, out_dir):
+    command = [sys.executable, str(spec['script']), f"--out_dir={out_dir}"]
+    if 'n_samples' in spec['data']:
+        command.append(f"--n_samples={spec['data']['n_samples']}")
+    command += [f"--{key}={value}" for key, value in spec['params'].items()]
+    return command
+
+
+def train_model(name, spec, registry, digest, inputs, threads=None):
+    """
+    학습 스크립트 1개를 별도 프로세스로 실행 → 레지스트리 폴더 교체 → (manifest dict, 교체 소요 초)
+    학습이 실패하면 기존 레지스트리 폴더는 그대로 둔다.
+    """
+    steps = {}
+    target = registry / name
+    staging = registry / f"{name}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    env = dict(os.environ)
+    if threads:
+        # 동시에 여러 모델을 학습할 때 스크립트마다 코어 전체를 쓰지 않도록 제한
+        for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+            env[var] = str(threads)
+    env['PYTHONIOENCODING'] = 'utf-8'
+
+    started = time.perf_counter()
+    try:
+        with open(staging / 'train.log', 'w', encoding='utf-8') as log:
+            proc = subprocess.run(build_command(spec, staging), cwd=str(Path(spec['script']).parent),
+                                  stdout=log, stderr=subprocess.STDOUT, env=env)
+        steps['trainSec'] = round(time.perf_counter() - started, 3)
+        if proc.returncode != 0:
+            raise RuntimeError(f"학습 스크립트 종료 코드 {proc.returncode} "
+                               f"(로그: {registry / f'{name}.failed' / 'train.log'})")
+        missing = [a for a in spec['artifacts'] if not (staging / a).exists()]
+        if missing:
+            raise RuntimeError(f"산출물이 생성되지 않았습니다: {', '.join(missing)}")
+
+        publish_started = time.perf_counter()
+        manifest = {
+            'model': name,
+            'hash': digest,
+            'inputs': inputs,
+            'artifacts': {a: file_digest(staging / a) for a in spec['artifacts']},
+            'trainedAt': datetime.now().isoformat(timespec='seconds'),
+            'steps': steps,
+        }
+        with open(staging / 'manifest.json', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # 폴더 교체 (model_store.ModelStore.save와 같은 방식)
+        old = None
+        if target.exists():
+            old = registry / f"{name}.old-{os.getpid()}"
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(target, old)
+        os.replace(staging, target)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        return manifest, round(time.perf_counter() - publish_started, 3)
+    except Exception:
+        # 실패 로그는 남겨 두고 (다음 실행 시 덮어씀) 기존 산출물은 유지
+        failed = registry / f"{name}.failed"
+        shutil.rmtree(failed, ignore_errors=True)
+        if staging.exists():
+            os.replace(staging, failed)
+        raise
+
+
+def run(args):
+    registry = Path(args.registry)
+    registry.mkdir(parents=True, exist_ok=True)
+    names = [n.strip() for n in args.models.split(',')] if args.models else list(MODELS)
+    unknown = [n for n in names if n not in MODELS]
+    if unknown:
+        raise ValueError(f"알 수 없는 모델: {', '.join(unknown)} (가능: {', '.join(MODELS)})")
+
+    started = time.perf_counter()
+    versions = library_versions()
+    report = {'models': {}, 'trained': [], 'skipped': [], 'failed': []}
+
+    # 1) 해시 비교 → 학습 대상 선정
+    todo = []
+    for name in names:
+        spec = MODELS[name]
+        hash_started = time.perf_counter()
+        digest, inputs = input_fingerprint(spec, versions)
+        hash_sec = round(time.perf_counter() - hash_started, 4)
+        if not args.force and is_up_to_date(registry / name, spec, digest):
+            report['skipped'].append(name)
+            report['models'][name] = {'status': 'skipped', 'hash': digest, 'steps': {'hashSec': hash_sec}}
+        else:
+            todo.append((name, spec, digest, inputs, hash_sec))
+
+    # 2) 변경된 모델만 동시 학습
+    #    모델마다 학습 스크립트를 별도 Python 프로세스로 실행하고 (전역 난수 시드 / sys.argv 격리),
+    #    스레드는 프로세스 종료만 기다린다. 프로세스당 BLAS/OpenMP 스레드 = 코어 수 // workers
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(todo) or 1))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    if args.dry_run:
+        for name, _, digest, _, hash_sec in todo:
+            report['models'][name] = {'status': 'stale', 'hash': digest, 'steps': {'hashSec': hash_sec}}
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(train_model, name, spec, registry, digest, inputs, threads): (name, hash_sec)
+                for name, spec, digest, inputs, hash_sec in todo
+            }
+            for future in as_completed(futures):
+                name, hash_sec = futures[future]
+                try:
+                    manifest, publish_sec = future.result()
+                except Exception as e:
+                    report['failed'].append(name)
+                    report['models'][name] = {'status': 'failed', 'error': str(e),
+                                              'steps': {'hashSec': hash_sec}}
+                    print(f"[train_all] {name} 학습 실패: {e}", file=sys.stderr)
+                    continue
+                report['trained'].append(name)
+                report['models'][name] = {'status': 'trained', 'hash': manifest['hash'],
+                                          'steps': {'hashSec': hash_sec, **manifest['steps'],
+                                                    'publishSec': publish_sec}}
+                print(f"[train_all] {name} 학습 완료: {manifest['steps']['trainSec']}초", file=sys.stderr)
+
+    report['workers'] = workers
+    report['registry'] = str(registry)
+    report['elapsedSec'] = round(time.perf_counter() - started, 3)
+    if not args.dry_run:
+        with open(registry / 'index.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='학습 스크립트 통합 실행 (입력이 바뀐 모델만 학습)')
+    parser.add_argument('--models', default=None, help=f"학습할 모델 (쉼표 구분, 기본: 전체 - {', '.join(MODELS)})")
+    parser.add_argument('--workers', type=int, default=0, help='동시에 학습할 모델 수 (0: CPU 코어 수)')
+    parser.add_argument('--registry', default=str(DEFAULT_REGISTRY_DIR), help='모델 레지스트리 폴더')
+    parser.add_argument('--force', action='store_true', help='해시가 같아도 다시 학습')
+    parser.add_argument('--dry_run', action='store_true', help='학습하지 않고 변경 여부만 출력')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        report = run(args)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"학습 실행 실패: {str(e)}"}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(report, ensure_ascii=False))
+    sys.exit(1 if report['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
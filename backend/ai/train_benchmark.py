@@ -0,0 +1,286 @@
+# train_benchmark.py
+
+# ============================================================
+# [학습 성능 벤치마크 + 기록 장부(ledger)]
+# ============================================================
+# train_all.py에 선언된 학습 스크립트를 고정 시드 / 고정 데이터 크기(기본 5천, 10만, 100만 행)로 실행하고
+# 단계별(데이터 생성, 스케일링, 탐색, 학습, 평가, 저장) 벽시계 시간 / CPU 시간 / 최대 RSS와
+# 최종 성능 지표를 JSON Lines 장부에 한 줄씩 추가한다. (기존 줄은 수정하지 않음)
+#
+# 단계 기록은 각 학습 스크립트의 train_phases.PhaseRecorder가 TRAIN_PHASES_FILE에 남긴다.
+#
+# 회귀 감지:
+#   같은 (모델, 행 수, 호스트, 스레드 수)의 최근 --window 개 정상 실행의 중앙값을 기준선으로 삼아
+#   전체 또는 단계별 시간이 기준선보다 --threshold 비율 이상 느리면 (그리고 --min_seconds 이상 차이나면) 표시한다.
+#   회귀가 하나라도 있으면 종료 코드 2 (cron / CI에서 감지)
+#
+# 장부 위치 (기본: backend/ml_models/benchmarks/ledger.jsonl, TRAIN_BENCHMARK_LEDGER로 변경 가능)
+#
+# 사용 방법:
+#   python train_benchmark.py [--models=budget_xgb,campaign_local] [--sizes=5000,100000,1000000] \
+#     [--threads=1] [--window=5] [--threshold=0.25] [--min_seconds=0.5] [--timeout=3600] [--dry_run]
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: 자식 프로세스 CPU 시간은 단계 기록 합계로 대신함
+    resource = None
+
+from train_all import MODELS, REPO_DIR, build_command, input_fingerprint, library_versions
+from train_phases import PHASES_ENV
+
+DEFAULT_SIZES = [5000, 100000, 1000000]
+DEFAULT_LEDGER = Path(os.environ.get('TRAIN_BENCHMARK_LEDGER',
+                                     REPO_DIR / 'backend' / 'ml_models' / 'benchmarks' / 'ledger.jsonl'))
+DEFAULT_WINDOW = 5
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_SECONDS = 0.5
+LOG_TAIL_LINES = 20
+
+
+def children_cpu_sec():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def read_phases(path):
+    """PhaseRecorder 출력 → (단계 dict, 지표 dict) - 같은 단계가 여러 번이면 합산"""
+    phases, metrics = {}, {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return phases, metrics
+    for entry in lines:
+        if 'metrics' in entry:
+            metrics.update(entry['metrics'])
+            continue
+        phase = phases.setdefault(entry['phase'], {'wallSec': 0.0, 'cpuSec': 0.0, 'peakRssMb': None})
+        phase['wallSec'] = round(phase['wallSec'] + entry['wallSec'], 4)
+        phase['cpuSec'] = round(phase['cpuSec'] + entry['cpuSec'], 4)
+        if entry.get('peakRssMb') is not None:
+            phase['peakRssMb'] = max(phase['peakRssMb'] or 0.0, entry['peakRssMb'])
+    return phases, metrics
+
+
+# ============================================================
+# 1) 학습 스크립트 1회 실행
+# ============================================================
+def run_trainer(spec, n_samples, threads=None, timeout=None):
+    """
+    학습 스크립트를 임시 폴더에 산출물을 쓰도록 실행 → 측정 결과 dict
+    벤치마크는 한 번에 하나씩 실행한다 (동시 실행 시 서로의 시간에 영향)
+    """
+    with tempfile.TemporaryDirectory(prefix='train-benchmark-') as work:
+        work = Path(work)
+        phases_file = work / 'phases.jsonl'
+        env = dict(os.environ)
+        env[PHASES_ENV] = str(phases_file)
+        env['PYTHONIOENCODING'] = 'utf-8'
+        if threads:
+            for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+                env[var] = str(threads)
+
+        command = build_command({**spec, 'data': {**spec['data'], 'n_samples': n_samples}}, work / 'out')
+        cpu_started = children_cpu_sec()
+        started = time.perf_counter()
+        error = None
+        with open(work / 'train.log', 'w', encoding='utf-8') as log:
+            proc = subprocess.Popen(command, cwd=str(Path(spec['script']).parent),
+                                    stdout=log, stderr=subprocess.STDOUT, env=env)
+            try:
+                return_code = proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                return_code = proc.wait()
+                error = f"시간 제한 {timeout}초 초과"
+        wall_sec = time.perf_counter() - started
+        cpu_ended = children_cpu_sec()
+
+        phases, metrics = read_phases(phases_file)
+        if error is None and return_code != 0:
+            with open(work / 'train.log', encoding='utf-8', errors='replace') as f:
+                tail = f.read().splitlines()[-LOG_TAIL_LINES:]
+            error = f"종료 코드 {return_code}: " + '\n'.join(tail)
+
+    rss = [p['peakRssMb'] for p in phases.values() if p['peakRssMb'] is not None]
+    return {
+        'status': 'ok' if error is None else 'failed',
+        'wallSec': round(wall_sec, 4),
+        'cpuSec': (round(cpu_ended - cpu_started, 4) if cpu_started is not None
+                   else round(sum(p['cpuSec'] for p in phases.values()), 4)),
+        'peakRssMb': max(rss) if rss else None,
+        'phases': phases,
+        'metrics': metrics,
+        **({'error': error} if error else {}),
+    }
+
+
+# ============================================================
+# 2) 장부 / 기준선
+# ============================================================
+def read_ledger(path):
+    entries = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # 중간에 끊긴 줄은 건너뜀
+    except OSError:
+        pass
+    return entries
+
+
+def append_ledger(path, entry):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def baseline_key(entry):
+    return (entry['model'], entry['nSamples'], entry['host']['node'], entry['threads'])
+
+
+def rolling_baseline(history, key, window):
+    """같은 조건의 최근 window개 정상 실행 → 전체 / 단계별 벽시계 시간 중앙값 (없으면 None)"""
+    runs = [e for e in history if e.get('status') == 'ok' and baseline_key(e) == key][-window:]
+    if not runs:
+        return None
+    phase_names = {name for e in runs for name in e['phases']}
+    return {
+        'runs': len(runs),
+        'wallSec': round(statistics.median(e['wallSec'] for e in runs), 4),
+        'phases': {
+            name: round(statistics.median(e['phases'][name]['wallSec'] for e in runs if name in e['phases']), 4)
+            for name in sorted(phase_names)
+        },
+    }
+
+
+def find_regressions(entry, baseline, threshold, min_seconds):
+    """기준선 대비 threshold 비율 이상 + min_seconds 이상 느려진 항목 (전체 = 'total')"""
+    if baseline is None or entry['status'] != 'ok':
+        return []
+    pairs = [('total', entry['wallSec'], baseline['wallSec'])]
+    pairs += [(name, phase['wallSec'], baseline['phases'][name])
+              for name, phase in entry['phases'].items() if name in baseline['phases']]
+    return [
+        {'phase': name, 'wallSec': wall, 'baselineSec': base,
+         'ratio': round(wall / base, 3) if base > 0 else None}
+        for name, wall, base in pairs
+        if wall > base * (1.0 + threshold) and wall - base >= min_seconds
+    ]
+
+
+# ============================================================
+# 3) 실행
+# ============================================================
+def run(args):
+    names = [n.strip() for n in args.models.split(',')] if args.models else list(MODELS)
+    unknown = [n for n in names if n not in MODELS]
+    if unknown:
+        raise ValueError(f"알 수 없는 모델: {', '.join(unknown)} (가능: {', '.join(MODELS)})")
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()] if args.sizes else DEFAULT_SIZES
+
+    ledger = Path(args.ledger)
+    history = read_ledger(ledger)
+    versions = library_versions()
+    host = {
+        'node': platform.node(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'python': sys.version.split()[0],
+        'libraries': versions,
+    }
+    report = {'ledger': str(ledger), 'runs': [], 'regressions': [], 'failed': []}
+
+    for name in names:
+        spec = MODELS[name]
+        for n_samples in sizes:
+            digest, _ = input_fingerprint({**spec, 'data': {**spec['data'], 'n_samples': n_samples}}, versions)
+            print(f"[train_benchmark] {name} n_samples={n_samples} 실행 중...", file=sys.stderr)
+            result = run_trainer(spec, n_samples, threads=args.threads, timeout=args.timeout)
+            entry = {
+                'recordedAt': datetime.now().isoformat(timespec='seconds'),
+                'model': name,
+                'nSamples': n_samples,
+                'seed': spec['data'].get('seed'),
+                'threads': args.threads or None,
+                'host': host,
+                'inputHash': digest,
+                **result,
+            }
+            baseline = rolling_baseline(history, baseline_key(entry), args.window)
+            regressions = find_regressions(entry, baseline, args.threshold, args.min_seconds)
+            entry['baseline'] = baseline
+            entry['regressions'] = regressions
+            if not args.dry_run:
+                append_ledger(ledger, entry)
+            history.append(entry)
+
+            summary = {
+                'model': name, 'nSamples': n_samples, 'status': entry['status'],
+                'wallSec': entry['wallSec'], 'cpuSec': entry['cpuSec'], 'peakRssMb': entry['peakRssMb'],
+                'phases': {phase: values['wallSec'] for phase, values in entry['phases'].items()},
+                'metrics': entry['metrics'],
+                'baselineSec': baseline['wallSec'] if baseline else None,
+            }
+            report['runs'].append(summary)
+            if entry['status'] != 'ok':
+                report['failed'].append({'model': name, 'nSamples': n_samples, 'error': entry['error']})
+                print(f"[train_benchmark] {name} n_samples={n_samples} 실패: {entry['error']}", file=sys.stderr)
+            for regression in regressions:
+                report['regressions'].append({'model': name, 'nSamples': n_samples, **regression})
+                print(f"[train_benchmark] ⚠️ {name} n_samples={n_samples} [{regression['phase']}] "
+                      f"{regression['wallSec']}초 (기준선 {regression['baselineSec']}초)", file=sys.stderr)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='학습 스크립트 단계별 성능 벤치마크 (장부 기록 + 회귀 감지)')
+    parser.add_argument('--models', default=None, help=f"벤치마크할 모델 (쉼표 구분, 기본: 전체 - {', '.join(MODELS)})")
+    parser.add_argument('--sizes', default=None,
+                        help=f"데이터 행 수 (쉼표 구분, 기본: {','.join(str(s) for s in DEFAULT_SIZES)})")
+    parser.add_argument('--threads', type=int, default=0, help='학습 프로세스 BLAS/OpenMP 스레드 수 (0: 제한 없음)')
+    parser.add_argument('--ledger', default=str(DEFAULT_LEDGER), help='기록 장부 (JSON Lines, 추가만 함)')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help='기준선으로 쓸 최근 정상 실행 수')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='회귀로 볼 기준선 대비 증가 비율 (0.25 = 25%% 이상 느려지면)')
+    parser.add_argument('--min_seconds', type=float, default=DEFAULT_MIN_SECONDS,
+                        help='회귀로 볼 최소 증가 시간 (초, 짧은 단계의 측정 잡음 무시)')
+    parser.add_argument('--timeout', type=float, default=None, help='실행 1회 시간 제한 (초)')
+    parser.add_argument('--dry_run', action='store_true', help='측정만 하고 장부에 기록하지 않음')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        report = run(args)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"벤치마크 실패: {str(e)}"}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(report, ensure_ascii=False))
+    if report['failed']:
+        sys.exit(1)
+    sys.exit(2 if report['regressions'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,7 @@
 # 산출물(backend/ai 폴더):
 # - optimal_budget_xgb_model_ridge.json      (XGB: 배포 안정성 좋음)
 # - baseline_ridge_model.joblib             (Ridge: scaler 포함 pipeline)
+# - baseline_ridge_state.joblib             (Ridge 충분 통계량: online_ridge.py로 새 행만 추가 갱신)
 #
 # ※ predict_budget.py가 기본적으로 optimal_budget_xgb_model.json을 로드하고 있다면,
 #   아래 json 파일명을 동일하게 맞추거나(predict 변경 최소),
@@ -16,6 +17,7 @@
 # ============================================================
 
 import os
+import argparse
 import numpy as np
 import pandas as pd
 import xgboost as xgb
@@ -24,9 +26,12 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 
 # ✅ Ridge baseline(정규화 선형 회귀) 관련
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import RidgeCV
+# - OnlineRidge: XᵀX, Xᵀy 등 충분 통계량만으로 StandardScaler + RidgeCV와 같은 해를 계산
+#   (새 행이 들어오면 전체 재학습 없이 online_ridge.py로 갱신)
+from online_ridge import OnlineRidge
+
+# ✅ 단계별 소요 시간 기록 (train_benchmark.py 실행 시에만 파일로 남김)
+from train_phases import PhaseRecorder
 
 # ✅ pipeline 저장
 import joblib
@@ -99,18 +104,30 @@ def generate_realistic_data(n_samples: int = 5000) -> pd.DataFrame:
     return pd.DataFrame(data)
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='XGBoost + Ridge baseline 학습')
+    parser.add_argument('--n_samples', type=int, default=5000, help='생성할 학습 데이터 행 수')
+    parser.add_argument('--out_dir', default=None, help='모델 저장 폴더 (기본: 이 파일이 있는 폴더)')
+    return parser.parse_args(argv)
+
+
 # ============================================================
 # 2) 메인: XGB + Ridge 학습/평가/저장
 # ============================================================
 if __name__ == "__main__":
+    args = parse_args()
+    phases = PhaseRecorder()
+
     # --------------------------
     # (1) 데이터 준비
     # --------------------------
-    df = generate_realistic_data(n_samples=5000)
+    phases.start('data')
+    df = generate_realistic_data(n_samples=args.n_samples)
 
     X = df.drop(["Target_ROAS"], axis=1)
     y = df["Target_ROAS"]
 
+    phases.start('split')
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
@@ -120,6 +137,7 @@ if __name__ == "__main__":
     # ========================================================
     # (2) XGBoost 학습 (주 모델)
     # ========================================================
+    phases.start('fit_xgb')
     xgb_model = xgb.XGBRegressor(
         n_estimators=100,
         learning_rate=0.05,
@@ -129,6 +147,7 @@ if __name__ == "__main__":
     xgb_model.fit(X_train, y_train)
 
     # 평가
+    phases.start('evaluate_xgb')
     xgb_train_pred = xgb_model.predict(X_train)
     xgb_test_pred = xgb_model.predict(X_test)
 
@@ -147,14 +166,21 @@ if __name__ == "__main__":
     # (3) Ridge Baseline 학습 (보조 모델)
     # --------------------------------------------------------
     # - StandardScaler: 스케일 차이 보정
-    # - RidgeCV: alpha(규제 강도)를 교차검증으로 자동 선택
+    # - alpha(규제 강도)를 5-fold 교차검증(R²)으로 자동 선택 (RidgeCV(cv=5)와 같은 fold / 점수)
+    # - fold별 충분 통계량을 상태 파일로 저장해 두면 새 행은 O(d²), 재계산은 O(d³)
     # ========================================================
-    ridge_pipeline = Pipeline(steps=[
-        ("scaler", StandardScaler()),
-        ("ridge", RidgeCV(alphas=[0.1, 1.0, 10.0, 50.0, 100.0], cv=5))
-    ])
-    ridge_pipeline.fit(X_train, y_train)
+    phases.start('fit_ridge')
+    ridge_online = OnlineRidge(
+        n_features=X_train.shape[1],
+        alphas=[0.1, 1.0, 10.0, 50.0, 100.0],
+        n_folds=5,
+        scoring="r2",
+        feature_names=list(X_train.columns),
+    )
+    ridge_online.partial_fit_kfold(X_train.values, y_train.values).refit()
+    ridge_pipeline = ridge_online.to_pipeline()
 
+    phases.start('evaluate_ridge')
     ridge_train_pred = ridge_pipeline.predict(X_train)
     ridge_test_pred = ridge_pipeline.predict(X_test)
 
@@ -163,7 +189,9 @@ if __name__ == "__main__":
     ridge_test_rmse = np.sqrt(mean_squared_error(y_test, ridge_test_pred))
     ridge_test_r2 = r2_score(y_test, ridge_test_pred)
 
-    best_alpha = float(ridge_pipeline.named_steps["ridge"].alpha_)
+    best_alpha = ridge_online.alpha_
+    phases.metrics(xgb_test_rmse=xgb_test_rmse, xgb_test_r2=xgb_test_r2,
+                   ridge_test_rmse=ridge_test_rmse, ridge_test_r2=ridge_test_r2)
 
     print("-" * 55)
     print("📊 Ridge Baseline 성능")
@@ -176,7 +204,9 @@ if __name__ == "__main__":
     # --------------------------
     # (4) 저장
     # --------------------------
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    phases.start('save')
+    current_dir = args.out_dir or os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(current_dir, exist_ok=True)
 
     # ✅ 선택 1) 기존 predict_budget.py가 'optimal_budget_xgb_model.json'을 로드한다면
     #          파일명을 그대로 유지하는 게 변경 최소.
@@ -189,10 +219,17 @@ if __name__ == "__main__":
     joblib.dump(ridge_pipeline, ridge_path)
     print(f"✅ Ridge 모델 저장 완료: {ridge_path}")
 
+    # ✅ Ridge 충분 통계량 저장 (online_ridge.py --state 로 새 행 추가 후 재계산)
+    ridge_state_path = os.path.join(current_dir, "baseline_ridge_state.joblib")
+    ridge_online.save(ridge_state_path)
+    print(f"✅ Ridge 상태 저장 완료: {ridge_state_path}")
+    phases.stop()
+
     # --------------------------
     # (5) 운영 안내
     # --------------------------
     print("\n📝 운영 안내")
     print("- 두 파일을 backend/ai 폴더에 같이 둔 뒤 predict_budget.py를 실행하세요.")
     print("- predict_budget.py에서 USE_ENSEMBLE=True면 XGB+Ridge 앙상블을 사용합니다.")
-    print("- XGB가 실패하면 Ridge로 폴백할 수 있습니다.\n")
\ No newline at end of file
+    print("- XGB가 실패하면 Ridge로 폴백할 수 있습니다.")
+    print("- 새 학습 행은 online_ridge.py --state=baseline_ridge_state.joblib 로 Ridge만 빠르게 갱신할 수 있습니다.\n")
\ No newline at end of file
@@ -2,8 +2,10 @@ import pandas as pd
 import numpy as np
 import xgboost as xgb
 import os
+import argparse
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
+from train_phases import PhaseRecorder
 
 # ==========================================
 # 1. 데이터 생성 함수 (최종 튜닝: R2 0.9 목표)
@@ -85,14 +87,26 @@ def generate_realistic_data(n_samples=5000):
 # ==========================================
 # 2. 실행 및 학습 로직
 # ==========================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='XGBoost 예산 최적화 모델 학습')
+    parser.add_argument('--n_samples', type=int, default=5000, help='생성할 학습 데이터 행 수')
+    parser.add_argument('--out_dir', default=None, help='모델 저장 폴더 (기본: 이 파일이 있는 폴더)')
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    phases = PhaseRecorder()
+
     # 1. 데이터 생성
-    df = generate_realistic_data(5000)
+    phases.start('data')
+    df = generate_realistic_data(args.n_samples)
     
     X = df.drop(['Target_ROAS'], axis=1)
     y = df['Target_ROAS']
 
     # 2. 데이터 분리
+    phases.start('split')
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
@@ -108,9 +122,11 @@ if __name__ == "__main__":
     )
     
     # 4. 학습 (★ train 데이터만 사용)
+    phases.start('fit')
     model.fit(X_train, y_train)
     
     # 5. 평가 (Train/Test 비교)
+    phases.start('evaluate')
     y_pred_train = model.predict(X_train)
     y_pred_test = model.predict(X_test)
     
@@ -119,6 +135,7 @@ if __name__ == "__main__":
     
     test_rmse = np.sqrt(mean_squared_error(y_test, y_pred_test))
     test_r2 = r2_score(y_test, y_pred_test)
+    phases.metrics(train_rmse=train_rmse, train_r2=train_r2, test_rmse=test_rmse, test_r2=test_r2)
     
     print(f"\n" + "="*50)
     print(f"📊 모델 성능 (Train vs Test)")
@@ -165,7 +182,10 @@ if __name__ == "__main__":
         print("🙂 종합 판정: [A급] 준수한 성능입니다.")
     
     # 8. 저장
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    phases.start('save')
+    current_dir = args.out_dir or os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(current_dir, exist_ok=True)
     model_path = os.path.join(current_dir, 'optimal_budget_xgb_model.json')
     model.save_model(model_path)
-    print(f"✅ 모델 저장 완료: {model_path}")
\ No newline at end of file
+    print(f"✅ 모델 저장 완료: {model_path}")
+    phases.stop()
\ No newline at end of file
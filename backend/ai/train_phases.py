@@ -0,0 +1,68 @@
+# train_phases.py
+
+# ============================================================
+# [학습 단계별 소요 시간 기록]
+# ============================================================
+# 학습 스크립트가 단계(데이터 생성 / 스케일링 / 탐색 / 학습 / 평가 / 저장)를 시작할 때마다
+# phases.start('<단계 이름>')을 호출하면, 직전 단계의 벽시계 시간 / CPU 시간 / 최대 RSS를 기록한다.
+#
+# 환경 변수 TRAIN_PHASES_FILE 이 지정된 경우에만 JSON Lines로 파일에 추가 기록하고
+# (train_benchmark.py가 지정), 없으면 아무것도 쓰지 않는다 → 평소 학습 실행에는 영향 없음.
+#
+#   {"phase": "data", "wallSec": 0.41, "cpuSec": 0.40, "peakRssMb": 180.2}
+#   {"metrics": {"test_rmse": 29.1, "test_r2": 0.83}}
+import os
+import json
+import time
+import atexit
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PHASES_ENV = 'TRAIN_PHASES_FILE'
+
+
+def peak_rss_mb():
+    """현재 프로세스의 최대 RSS (MB, 측정 불가 환경이면 None)"""
+    if resource is None:
+        return None
+    # Linux: KB 단위 / macOS: byte 단위
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if os.uname().sysname == 'Darwin' else 1024), 1)
+
+
+class PhaseRecorder:
+    """start()로 단계를 넘길 때마다 직전 단계를 닫아 기록 (프로세스 종료 시 마지막 단계도 기록)"""
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else os.environ.get(PHASES_ENV)
+        self._current = None
+        atexit.register(self.stop)
+
+    def _write(self, entry):
+        if not self.path:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def start(self, name):
+        self.stop()
+        self._current = (name, time.perf_counter(), time.process_time())
+
+    def stop(self):
+        if self._current is None:
+            return
+        name, wall_started, cpu_started = self._current
+        self._current = None
+        self._write({
+            'phase': name,
+            'wallSec': round(time.perf_counter() - wall_started, 4),
+            'cpuSec': round(time.process_time() - cpu_started, 4),
+            'peakRssMb': peak_rss_mb(),
+        })
+
+    def metrics(self, **values):
+        """최종 성능 지표 기록 (numpy 스칼라는 float으로)"""
+        self._write({'metrics': {key: round(float(value), 6) for key, value in values.items()}})
@@ -0,0 +1,250 @@
+# warm_start.py
+
+# ============================================================
+# [XGBoost ROAS 모델 warm-start 갱신]
+# ============================================================
+# 기존 학습 스크립트는 매번 트리 0개부터 다시 학습(+ GridSearch)한다.
+# 이 스크립트는 현재 배포된 모델을 불러와 최근 데이터로 트리 몇 개만 이어서 학습한다.
+# (XGBoost xgb_model 이어 학습 - 기존 트리는 그대로, 새 트리가 남은 오차를 보정)
+#
+# 1. 최근 데이터(--rows)를 시간 순서대로 앞부분(학습) / 뒷부분(holdout)으로 분리
+# 2. 기존 모델에 새 트리 --trees 개(최대 MAX_NEW_TREES)를 이어 학습
+# 3. holdout RMSE가 기존 모델보다 나빠지면(허용 비율 --tolerance 초과) 갱신 거부
+#    --reference_rows 를 주면 고정 기준 셋에서도 같은 조건을 확인
+# 4. 통과한 경우에만 임시 파일에 저장 후 os.replace로 교체 (읽는 쪽은 항상 완전한 파일만 봄)
+#    직전 버전은 <파일명>.prev 로 남겨 롤백 가능
+#
+# 대상 모델:
+#   --model=optimal_budget_xgb_model.json   train_model_v2.py / train_model_ridge.py 의 XGBoost (원본 Feature)
+#   --model=ensemble_roas_model.pkl         ensemble_model.py 의 Ridge + XGBoost 앙상블 (roas_scaler.pkl로 스케일링)
+#                                           → XGBoost만 이어 학습, Ridge / 앙상블 가중치는 유지
+#
+# 사용 방법:
+#   python warm_start.py --model=ensemble_roas_model.pkl --rows=recent.parquet \
+#     [--reference_rows=ref.parquet] [--target=target_roas] [--trees=20] [--holdout_frac=0.2] \
+#     [--tolerance=0.0] [--dry_run]
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import xgboost as xgb
+import joblib
+
+DEFAULT_NEW_TREES = 20
+MAX_NEW_TREES = 200           # 한 번의 갱신에서 추가할 수 있는 최대 트리 수
+DEFAULT_HOLDOUT_FRAC = 0.2
+
+# JSON 모델 파일에는 학습 파라미터가 저장되지 않으므로 train_model_v2.py와 같은 값으로 이어 학습
+JSON_MODEL_PARAMS = {
+    'objective': 'reg:squarederror',
+    'learning_rate': 0.05,
+    'max_depth': 4,
+    'seed': 42,
+}
+
+SCALER_FILENAME = 'roas_scaler.pkl'
+
+
+def rmse(y_true, y_pred):
+    return float(np.sqrt(np.mean((np.asarray(y_true) - np.asarray(y_pred)) ** 2)))
+
+
+def split_recent(df, holdout_frac):
+    """시간 순서 데이터 → (학습, holdout) - 가장 최근 holdout_frac 만큼을 holdout으로"""
+    n_holdout = max(1, int(round(len(df) * holdout_frac)))
+    if n_holdout >= len(df):
+        raise ValueError(f"holdout을 나누기에 행이 부족합니다: {len(df)}행")
+    return df.iloc[:-n_holdout], df.iloc[-n_holdout:]
+
+
+def read_rows(path, date_column=None):
+    """Parquet / CSV → DataFrame (date_column이 있으면 날짜 순 정렬)"""
+    import pandas as pd
+
+    df = pd.read_parquet(path) if str(path).endswith('.parquet') else pd.read_csv(path)
+    if date_column and date_column in df.columns:
+        df = df.sort_values(date_column, kind='stable')
+    return df.reset_index(drop=True)
+
+
+def select(df, columns, target):
+    missing = [c for c in list(columns) + [target] if c not in df.columns]
+    if missing:
+        raise ValueError(f"컬럼이 없습니다: {', '.join(missing)}")
+    return df[list(columns)], df[target].to_numpy(np.float64)
+
+
+# ============================================================
+# 1) 모델별 이어 학습
+# ============================================================
+def refresh_booster(booster, fit, target, n_trees, params=None):
+    """
+    JSON Booster 이어 학습 → 새 Booster
+    Feature 이름/순서는 Booster에 저장된 것을 그대로 사용
+    """
+    if not booster.feature_names:
+        raise ValueError("모델에 Feature 이름이 없습니다 (DataFrame으로 학습한 모델만 지원)")
+    X_fit, y_fit = select(fit, booster.feature_names, target)
+    # xgb.train(xgb_model=...)은 기존 Booster를 복사해 이어 학습 (원본은 변경되지 않음)
+    return xgb.train({**JSON_MODEL_PARAMS, **(params or {})}, xgb.DMatrix(X_fit, label=y_fit),
+                     num_boost_round=n_trees, xgb_model=booster)
+
+
+def evaluate_booster(booster, df, target):
+    X, y = select(df, booster.feature_names, target)
+    return rmse(y, booster.predict(xgb.DMatrix(X)))
+
+
+def refresh_ensemble(ensemble, scaler, fit, target, n_trees):
+    """
+    Ridge + XGBoost VotingRegressor의 XGBoost만 이어 학습 → 새 앙상블
+    scaler(roas_scaler.pkl)는 다시 fit 하지 않고 그대로 적용한다.
+    """
+    from ensemble_model import assemble_voting_regressor
+
+    X_fit, y_fit = select(fit, scaler.feature_names_in_, target)
+
+    named = dict(ensemble.named_estimators_)
+    old_xgb = named['xgb']
+    # 학습 당시 파라미터(learning_rate, max_depth 등)를 유지하고 트리 개수만 새로 추가할 만큼으로
+    new_xgb = xgb.XGBRegressor(**{**old_xgb.get_params(), 'n_estimators': n_trees})
+    new_xgb.fit(scaler.transform(X_fit), y_fit, xgb_model=old_xgb.get_booster())
+    # 이어 학습 후 n_estimators가 전체 트리 수를 나타내도록 (clone / 재학습 시 같은 크기의 모델)
+    new_xgb.set_params(n_estimators=new_xgb.get_booster().num_boosted_rounds())
+
+    named['xgb'] = new_xgb
+    return assemble_voting_regressor(
+        [(name, named[name]) for name, _ in ensemble.estimators], ensemble.weights)
+
+
+def evaluate_ensemble(ensemble, scaler, df, target):
+    X, y = select(df, scaler.feature_names_in_, target)
+    return rmse(y, ensemble.predict(scaler.transform(X)))
+
+
+# ============================================================
+# 2) 원자적 배포
+# ============================================================
+def publish(path, save):
+    """
+    save(임시 경로)로 새 버전을 쓴 뒤 os.replace로 교체 (같은 폴더 → 원자적)
+    기존 파일은 <path>.prev 로 보관
+    """
+    path = os.path.abspath(path)
+    root, ext = os.path.splitext(path)
+    tmp = f"{root}.tmp-{os.getpid()}{ext}"
+    try:
+        save(tmp)
+        if os.path.exists(path):
+            prev = f"{path}.prev"
+            # 하드 링크로 직전 버전 보관 → 교체 순간에도 path는 항상 존재
+            if os.path.exists(prev):
+                os.remove(prev)
+            try:
+                os.link(path, prev)
+            except OSError:
+                import shutil
+                shutil.copy2(path, prev)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# ============================================================
+# 3) 실행
+# ============================================================
+def run(args):
+    if not 1 <= args.trees <= MAX_NEW_TREES:
+        raise ValueError(f"--trees는 1 ~ {MAX_NEW_TREES} 사이여야 합니다: {args.trees}")
+
+    started = time.perf_counter()
+    df = read_rows(args.rows, args.date_column)
+    fit, holdout = split_recent(df, args.holdout_frac)
+    # 검증 셋: 최근 holdout + (선택) 고정 기준 셋 - 최근 데이터 자체가 이상할 때도 회귀를 잡기 위함
+    guards = {'holdout': holdout}
+    if args.reference_rows:
+        guards['reference'] = read_rows(args.reference_rows, args.date_column)
+
+    if args.model.endswith('.json'):
+        current = xgb.Booster()
+        current.load_model(args.model)
+        trees_before = current.num_boosted_rounds()
+        updated = refresh_booster(current, fit, args.target, args.trees)
+        trees_after = updated.num_boosted_rounds()
+
+        def evaluate(model, rows):
+            return evaluate_booster(model, rows, args.target)
+
+        def save(tmp):
+            updated.save_model(tmp)
+    else:
+        current = joblib.load(args.model)
+        scaler_path = args.scaler or os.path.join(os.path.dirname(os.path.abspath(args.model)), SCALER_FILENAME)
+        scaler = joblib.load(scaler_path)
+        trees_before = current.named_estimators_['xgb'].get_booster().num_boosted_rounds()
+        updated = refresh_ensemble(current, scaler, fit, args.target, args.trees)
+        trees_after = updated.named_estimators_['xgb'].get_booster().num_boosted_rounds()
+
+        def evaluate(model, rows):
+            return evaluate_ensemble(model, scaler, rows, args.target)
+
+        def save(tmp):
+            joblib.dump(updated, tmp)
+
+    # holdout guard: 어느 검증 셋이든 기존 대비 RMSE 증가가 허용 비율을 넘으면 거부
+    scores = {}
+    for name, rows in guards.items():
+        before, after = evaluate(current, rows), evaluate(updated, rows)
+        scores[name] = {"before": round(before, 4), "after": round(after, 4),
+                        "ok": after <= before * (1.0 + args.tolerance)}
+    accepted = all(score["ok"] for score in scores.values())
+    published = accepted and not args.dry_run
+    if published:
+        publish(args.model, save)
+
+    return {
+        "model": os.path.abspath(args.model),
+        "rows": {"fit": int(len(fit)), "holdout": int(len(holdout))},
+        "trees": {"before": trees_before, "added": trees_after - trees_before, "after": trees_after},
+        "rmse": scores,
+        "accepted": bool(accepted),
+        "published": bool(published),
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='XGBoost ROAS 모델 warm-start 갱신')
+    parser.add_argument('--model', required=True, help='optimal_budget_xgb_model.json 또는 ensemble_roas_model.pkl')
+    parser.add_argument('--scaler', default=None, help='앙상블용 스케일러 (기본: 모델과 같은 폴더의 roas_scaler.pkl)')
+    parser.add_argument('--rows', required=True, help='최근 학습 행 (Parquet 또는 CSV, 시간 순서)')
+    parser.add_argument('--reference_rows', default=None,
+                        help='고정 기준 검증 셋 (Parquet 또는 CSV, 이 셋에서도 RMSE가 나빠지면 거부)')
+    parser.add_argument('--target', default='target_roas')
+    parser.add_argument('--date_column', default=None, help='정렬 기준 날짜 컬럼 (없으면 파일 순서)')
+    parser.add_argument('--trees', type=int, default=DEFAULT_NEW_TREES)
+    parser.add_argument('--holdout_frac', type=float, default=DEFAULT_HOLDOUT_FRAC)
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='허용 holdout RMSE 증가 비율 (0.01 = 1%%까지 허용)')
+    parser.add_argument('--dry_run', action='store_true', help='검증만 하고 배포하지 않음')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        report = run(args)
+    except (OSError, KeyError, ValueError) as e:
+        print(json.dumps({"error": f"warm-start 갱신 실패: {str(e)}"}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(report, ensure_ascii=False))
+    # 거부된 갱신은 실패 코드로 알림 (cron 등에서 감지)
+    sys.exit(0 if report["accepted"] else 2)
+
+
+if __name__ == '__main__':
+    main()
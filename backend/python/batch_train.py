@@ -0,0 +1,282 @@
+"""
+batch_train.py
+--------------
+전체 사용자 XGBoost(전환 수) / RandomForest(최적 매체) 모델 야간 일괄 학습 스크립트.
+
+요청 시점에 모델을 학습하지 않도록, 매일 밤 모든 사용자의 모델을 미리 학습해
+ml_predict.py와 같은 모델 저장소(model_store.py)에 저장한다.
+ml_predict.py는 워터마크가 같으면 저장된 결과를 그대로 반환하므로 (재학습 없음)
+다음 날 대화형 요청은 저장소만 읽고 끝난다.
+
+처리 흐름:
+  1. 사용자별 워터마크(max(updated_at) + 행 수)와 매출 합계를 GROUP BY 1회로 조회
+  2. campaign_metrics 전체를 user_id 순 정렬 스캔 1회로 스트리밍 (메모리에는 사용자 1명분만)
+     - 저장소 워터마크가 같은 사용자는 건너뜀 (--force 제외)
+  3. 사용자별 학습을 프로세스 풀에서 실행 (ml_predict.train_all 그대로 사용)
+     - 모델 + 평가 결과 → 모델 저장소 (기간 전체 키, ml_predict.py 기간 미지정 호출과 동일)
+     - 평가 요약 → ml_batch_history 테이블 (--no_history 로 끄기)
+       (ai_history는 사용자에게 보이는 예산 분석 이력이므로 사용하지 않음)
+  4. 전체 소요 시간, 사용자별 학습 시간, 실패 목록을 JSON으로 stdout 출력
+
+사용 방법 (cron 등에서 호출):
+  python batch_train.py \
+    --host=<DB_HOST> --port=<DB_PORT> \
+    --db=<DB_NAME> --user=<DB_USER> --password=<DB_PASSWORD> \
+    [--workers=N] [--threads_per_worker=N] [--user_ids=1,2,3] [--force] [--no_history]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+warnings.filterwarnings('ignore')
+
+import db
+import ml_predict
+from model_store import ModelStore, make_watermark
+from metrics_stream import stream_groups, peak_rss_mb
+
+# 사용자별 워터마크 (ml_predict.fetch_watermark와 같은 조건) + 기간 매출 합계
+USER_STATE_QUERY = """
+    SELECT
+        ma.user_id,
+        MAX(cm.updated_at),
+        COUNT(*),
+        COALESCE(SUM(cm.revenue), 0)
+    FROM campaign_metrics cm
+    JOIN campaigns c           ON cm.campaign_id = c.id
+    JOIN marketing_accounts ma ON c.marketing_account_id = ma.id
+    WHERE 1 = 1 {user_filter}
+    GROUP BY ma.user_id
+"""
+
+# 전체 사용자 학습 데이터 (ml_predict.load_metrics_direct와 같은 컬럼/정렬, 앞에 user_id)
+ALL_METRICS_QUERY = """
+    SELECT
+        ma.user_id        AS user_id,
+        ma.channel_code   AS platform,
+        cm.metric_date    AS date,
+        cm.impressions,
+        cm.clicks,
+        cm.cost,
+        cm.conversions    AS installs
+    FROM campaign_metrics cm
+    JOIN campaigns c           ON cm.campaign_id = c.id
+    JOIN marketing_accounts ma ON c.marketing_account_id = ma.id
+    WHERE cm.impressions IS NOT NULL AND cm.clicks IS NOT NULL
+      AND cm.cost IS NOT NULL AND cm.conversions IS NOT NULL {user_filter}
+    ORDER BY ma.user_id, cm.metric_date, cm.id
+"""
+
+# 평가 요약 테이블 (database/create_ml_batch_history.sql과 동일, 없으면 실행 시 생성)
+HISTORY_DDL = """
+    CREATE TABLE IF NOT EXISTS ml_batch_history (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        watermark VARCHAR(100) DEFAULT NULL,
+        row_count INT NOT NULL,
+        duration INT NOT NULL,
+        budget BIGINT NOT NULL,
+        best_channel VARCHAR(50) NOT NULL,
+        expected_revenue BIGINT NOT NULL,
+        train_ms INT DEFAULT NULL,
+        report JSON DEFAULT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_ml_batch_user (user_id, created_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+HISTORY_INSERT = """
+    INSERT INTO ml_batch_history
+        (user_id, watermark, row_count, duration, budget, best_channel, expected_revenue, train_ms, report)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# best_channel 표기 (app.ts 예산 추천 이력과 같은 한글 매체명)
+CHANNEL_NAMES = {'naver': '네이버', 'meta': '메타', 'google': '구글', 'karrot': '당근'}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host',     required=True)
+    parser.add_argument('--port',     type=int, default=3306)
+    parser.add_argument('--db',       required=True)
+    parser.add_argument('--user',     required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--workers',  type=int, default=0)            # 학습 프로세스 수 (0: CPU 코어 수)
+    parser.add_argument('--threads_per_worker', type=int, default=1)  # 프로세스당 학습 스레드 수
+    parser.add_argument('--user_ids', default=None)                   # 일부 사용자만 (쉼표 구분)
+    parser.add_argument('--max_train_rows', type=int, default=ml_predict.DEFAULT_MAX_TRAIN_ROWS)
+    parser.add_argument('--force',    action='store_true')            # 워터마크가 같아도 재학습
+    parser.add_argument('--no_history', action='store_true')          # ml_batch_history 기록 안 함
+    return parser.parse_args(argv)
+
+
+def build_user_filter(args):
+    """--user_ids → (SQL 조건, 파라미터)"""
+    if not args.user_ids:
+        return "", []
+    user_ids = [int(u) for u in args.user_ids.split(',') if u.strip()]
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    return f"AND ma.user_id IN ({placeholders})", user_ids
+
+
+def fetch_user_states(conn, args):
+    """사용자별 (워터마크, 행 수, 매출 합계) dict"""
+    user_filter, params = build_user_filter(args)
+    with conn.cursor() as cursor:
+        cursor.execute(USER_STATE_QUERY.format(user_filter=user_filter), params)
+        rows = cursor.fetchall()
+    states = {}
+    for user_id, max_updated_at, row_count, revenue in rows:
+        watermark = ml_predict.training_watermark(
+            make_watermark(max_updated_at, row_count), int(row_count), args.max_train_rows)
+        states[int(user_id)] = (watermark, int(row_count), float(revenue))
+    return states
+
+
+def summarize(df):
+    """평가 요약 컬럼 (기간 일수, 총 비용, 최적 매체)"""
+    days = int(df['date'].nunique())
+    budget = int(round(float(df['cost'].sum())))
+    # 날짜별 최고 효율 매체 중 가장 자주 1등을 한 매체
+    best_channel = ''
+    daily = ml_predict.build_rf_daily(df)
+    if not daily.empty:
+        best_channel = str(daily['best_platform'].value_counts().idxmax())
+    return days, budget, CHANNEL_NAMES.get(best_channel, best_channel)
+
+
+def train_user(user_id, df, watermark, revenue, threads, max_train_rows, store_root):
+    """
+    프로세스 풀 작업: 사용자 1명 학습 + 저장소 저장 → 요약 dict
+    모델 객체는 작업 프로세스에서 바로 저장하고, 부모에는 평가 결과만 돌려준다.
+    """
+    started = time.perf_counter()
+    result, xgb_artifacts, rf_model = ml_predict.train_all(
+        df, threads=threads, max_train_rows=max_train_rows)
+    train_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    ModelStore(store_root).save(user_id, None, None, watermark, result,
+                                xgb_artifacts, rf_model, train_ms=train_ms)
+    days, budget, best_channel = summarize(df)
+    return {
+        'userId': user_id,
+        'rows': len(df),
+        'trainMs': train_ms,
+        'result': result,
+        'history': (user_id, watermark, len(df), days, budget, best_channel, int(round(revenue)),
+                    int(round(train_ms))),
+    }
+
+
+def ensure_history_table(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(HISTORY_DDL)
+    conn.commit()
+
+
+def write_history(conn, summary):
+    """평가 요약을 ml_batch_history에 1행 기록 (report: 모델 평가 결과 JSON)"""
+    with conn.cursor() as cursor:
+        cursor.execute(HISTORY_INSERT,
+                       summary['history'] + (json.dumps(summary['result'], ensure_ascii=False),))
+    conn.commit()
+
+
+def run(args, store=None):
+    """전체 사용자 일괄 학습 → 실행 보고서 dict"""
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+    store = store or ModelStore()
+    started = time.perf_counter()
+    workers = args.workers or os.cpu_count() or 1
+
+    conn = ml_predict.connect(args)
+    # 학습 데이터 스트리밍(서버 측 커서)과 평가 요약 기록은 같은 연결을 동시에 쓸 수 없으므로 분리
+    history_conn = None if args.no_history else ml_predict.connect(args)
+
+    report = {'users': 0, 'trained': 0, 'skipped': 0, 'failed': [], 'perUser': []}
+
+    def collect(done):
+        for future in done:
+            user_id = pending.pop(future)
+            try:
+                summary = future.result()
+            except Exception as e:
+                report['failed'].append({'userId': user_id, 'stage': 'train', 'error': str(e)})
+                print(f"[batch_train] user {user_id} 학습 실패: {e}", file=sys.stderr)
+                continue
+            report['trained'] += 1
+            report['perUser'].append({'userId': user_id, 'rows': summary['rows'],
+                                      'trainMs': summary['trainMs']})
+            print(f"[batch_train] user {user_id} 학습 완료: {summary['rows']}행, "
+                  f"{summary['trainMs']}ms", file=sys.stderr)
+            if history_conn is not None:
+                try:
+                    write_history(history_conn, summary)
+                except Exception as e:
+                    report['failed'].append({'userId': user_id, 'stage': 'history', 'error': str(e)})
+                    print(f"[batch_train] user {user_id} 평가 요약 기록 실패: {e}", file=sys.stderr)
+
+    pending = {}
+    try:
+        if history_conn is not None:
+            ensure_history_table(history_conn)
+        states = fetch_user_states(conn, args)
+        report['users'] = len(states)
+        user_filter, params = build_user_filter(args)
+        query = ALL_METRICS_QUERY.format(user_filter=user_filter)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for user_id, df in stream_groups(conn, query, params, key='user_id'):
+                user_id = int(user_id)
+                watermark, _, revenue = states.get(user_id, (None, 0, 0.0))
+                if not args.force and store.load_result(user_id, None, None, watermark) is not None:
+                    report['skipped'] += 1
+                    continue
+
+                # 읽기 속도가 학습보다 빠르면 대기 작업이 쌓여 메모리가 늘어나므로 작업 수를 제한
+                while len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+                future = pool.submit(train_user, user_id, df, watermark, revenue,
+                                     args.threads_per_worker, args.max_train_rows, str(store.root))
+                pending[future] = user_id
+                del df
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+    finally:
+        conn.close()
+        if history_conn is not None:
+            history_conn.close()
+
+    train_ms = [u['trainMs'] for u in report['perUser']]
+    report['elapsedMs'] = round((time.perf_counter() - started) * 1000, 1)
+    report['avgTrainMs'] = round(sum(train_ms) / len(train_ms), 1) if train_ms else None
+    report['maxTrainMs'] = max(train_ms) if train_ms else None
+    report['workers'] = workers
+    report['peakRssMb'] = peak_rss_mb()
+    report['db'] = db.get_pool(db.config_from_args(args)).stats()
+    return report
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        report = run(args)
+    except Exception as e:
+        print(json.dumps({"error": f"일괄 학습 실패: {str(e)}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    print(json.dumps(report, ensure_ascii=False))
+    sys.exit(1 if report['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+db.py
+-----
+Python 스크립트 공용 MySQL 접근 모듈 (pymysql 연결 풀 + 쿼리 시간 측정).
+
+ml_predict.py / batch_train.py / build_similar_index.py / database/*.py 가 모두 이 모듈로 연결한다.
+
+- 접속 정보: 명령행 인수(config_from_args) 또는 환경변수(config_from_env)
+  환경변수 이름은 Node.js 백엔드(.env)와 같음: DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+  (backend/.env 파일이 있으면 설정되지 않은 값만 읽어 옴)
+- 연결 풀: 프로세스(워커)당 접속 정보별 풀 1개 (get_pool)
+  장기 실행 워커는 연결/TLS 핸드셰이크를 한 번만 하고 요청마다 풀에서 빌려 씀
+  - 빌릴 때 health_check_sec 이상 쉬었던 연결은 ping으로 확인, 끊겼으면 재연결
+  - conn.close()는 실제로 닫지 않고 풀에 반납 (기존 코드 수정 없이 사용 가능)
+- 쿼리: 항상 파라미터 바인딩 (%s) 사용, 문자열로 값을 이어 붙이지 않는다
+  pymysql은 서버 측 prepared statement를 지원하지 않으므로 클라이언트 측 이스케이프로 바인딩된다.
+- 쿼리별 실행 시간: pool.stats() / DB_SLOW_QUERY_MS 이상이면 stderr 경고
+
+사용 예:
+  from db import get_pool, config_from_args
+  with get_pool(config_from_args(args)).connection() as conn:
+      with conn.cursor() as cursor:
+          cursor.execute("SELECT ... WHERE user_id = %s", [user_id])
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from collections import deque
+from pathlib import Path
+
+DEFAULT_ENV_FILE = Path(__file__).resolve().parent.parent / '.env'
+
+DEFAULT_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+# 이 시간(초) 이상 쉬었던 연결은 빌려줄 때 ping으로 살아 있는지 확인
+DEFAULT_HEALTH_CHECK_SEC = 30
+# 이 시간(ms) 이상 걸린 쿼리는 stderr에 기록 (0: 기록 안 함)
+SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 0))
+
+
+# ============================================================
+# 접속 정보
+# ============================================================
+def _read_env_file(path):
+    """KEY=VALUE 형식 .env 파일 → dict (주석/빈 줄 무시)"""
+    values = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or '=' not in line:
+                    continue
+                key, value = line.split('=', 1)
+                values[key.strip()] = value.strip().strip('"').strip("'")
+    except OSError:
+        pass
+    return values
+
+
+def config_from_env(env_file=DEFAULT_ENV_FILE):
+    """환경변수(없으면 backend/.env) → 접속 정보 dict"""
+    file_values = _read_env_file(env_file) if env_file else {}
+
+    def get(key, default=None):
+        return os.environ.get(key) or file_values.get(key) or default
+
+    missing = [key for key in ('DB_HOST', 'DB_NAME', 'DB_USER') if not get(key)]
+    if missing:
+        raise RuntimeError(f"DB 접속 환경변수가 없습니다: {', '.join(missing)}")
+    return {
+        'host': get('DB_HOST'),
+        'port': int(get('DB_PORT', 3306)),
+        'database': get('DB_NAME'),
+        'user': get('DB_USER'),
+        'password': get('DB_PASSWORD', ''),
+    }
+
+
+def config_from_args(args):
+    """argparse 인수(--host/--port/--db/--user/--password) → 접속 정보 dict"""
+    return {
+        'host': args.host,
+        'port': int(args.port),
+        'database': args.db,
+        'user': args.user,
+        'password': args.password,
+    }
+
+
+# ============================================================
+# 쿼리 시간 측정
+# ============================================================
+_WHITESPACE = re.compile(r'\s+')
+
+
+def query_label(sql, length=80):
+    """통계 키: 공백을 정리한 SQL 앞부분 (파라미터 값은 포함되지 않음)"""
+    return _WHITESPACE.sub(' ', sql).strip()[:length]
+
+
+class QueryStats:
+    """SQL별 실행 횟수 / 총 시간 / 최대 시간 (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, sql, elapsed_ms):
+        label = query_label(sql)
+        with self._lock:
+            entry = self._stats.setdefault(label, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        if SLOW_QUERY_MS and elapsed_ms >= SLOW_QUERY_MS:
+            print(f"[db] 느린 쿼리 {elapsed_ms:.1f}ms: {label}", file=sys.stderr)
+
+    def snapshot(self):
+        """총 시간 내림차순 목록"""
+        with self._lock:
+            items = [
+                {'query': label, 'count': s['count'], 'totalMs': round(s['total_ms'], 1),
+                 'avgMs': round(s['total_ms'] / s['count'], 2), 'maxMs': round(s['max_ms'], 1)}
+                for label, s in self._stats.items()
+            ]
+        return sorted(items, key=lambda s: -s['totalMs'])
+
+
+class TimedCursor:
+    """execute/executemany 시간을 QueryStats에 기록하는 커서 래퍼 (그 외 속성은 원래 커서로 위임)"""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def execute(self, sql, params=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params)
+        finally:
+            self._stats.record(sql, (time.perf_counter() - started) * 1000)
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_of_params)
+        finally:
+            self._stats.record(sql, (time.perf_counter() - started) * 1000)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+# ============================================================
+# 연결 풀
+# ============================================================
+class PooledConnection:
+    """
+    풀에서 빌린 연결 (pymysql Connection 래퍼)
+    cursor()는 시간 측정 커서를 반환하고, close()는 풀에 반납한다.
+    원래 연결이 필요하면 .raw (예: pymysql SSCursor 타입 확인)
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self.raw = raw
+        self._closed = False
+
+    def cursor(self, cursor_class=None):
+        cursor = self.raw.cursor(cursor_class) if cursor_class else self.raw.cursor()
+        return TimedCursor(cursor, self._pool.query_stats)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._pool.release(self.raw)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            try:
+                self.raw.rollback()
+            except Exception:
+                pass
+        self.close()
+
+
+class ConnectionPool:
+    """접속 정보 1개에 대한 pymysql 연결 풀 (스레드 안전, 최대 size개 유휴 연결 보관)"""
+
+    def __init__(self, config, size=DEFAULT_POOL_SIZE, health_check_sec=DEFAULT_HEALTH_CHECK_SEC,
+                 connect_timeout=10):
+        self.config = dict(config)
+        self.size = size
+        self.health_check_sec = health_check_sec
+        self.connect_timeout = connect_timeout
+        self.query_stats = QueryStats()
+        self._idle = deque()   # (연결, 반납 시각)
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+        self.reconnected = 0
+        self.connect_ms = 0.0
+
+    def _open(self):
+        import pymysql
+
+        started = time.perf_counter()
+        conn = pymysql.connect(
+            host=self.config['host'],
+            port=self.config['port'],
+            database=self.config['database'],
+            user=self.config['user'],
+            password=self.config['password'],
+            connect_timeout=self.connect_timeout,
+            charset='utf8mb4',
+            autocommit=False,
+        )
+        with self._lock:
+            self.opened += 1
+            self.connect_ms += (time.perf_counter() - started) * 1000
+        return conn
+
+    def acquire(self):
+        """유휴 연결 재사용(필요 시 ping 확인), 없으면 새로 연결 → PooledConnection"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                raw, returned_at = self._idle.pop()
+            if time.monotonic() - returned_at < self.health_check_sec:
+                with self._lock:
+                    self.reused += 1
+                return PooledConnection(self, raw)
+            try:
+                raw.ping(reconnect=True)
+                with self._lock:
+                    self.reused += 1
+                return PooledConnection(self, raw)
+            except Exception:
+                # 끊긴 연결은 버리고 다음 유휴 연결 또는 새 연결로
+                with self._lock:
+                    self.reconnected += 1
+                self._discard(raw)
+        return PooledConnection(self, self._open())
+
+    def release(self, raw):
+        """반납: 진행 중 트랜잭션은 롤백하고, 풀이 가득 차면 실제로 닫음"""
+        try:
+            if raw.open:
+                raw.rollback()
+            else:
+                return
+        except Exception:
+            self._discard(raw)
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((raw, time.monotonic()))
+                return
+        self._discard(raw)
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def connection(self):
+        """with 문용: with pool.connection() as conn: ... (끝나면 반납, 예외 시 롤백)"""
+        return self.acquire()
+
+    # ------------------------------------------------------------------
+    # 파라미터 바인딩 쿼리 헬퍼
+    # ------------------------------------------------------------------
+    def query(self, sql, params=None):
+        """SELECT → 행 튜플 목록"""
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+
+    def execute(self, sql, params=None):
+        """INSERT/UPDATE/DELETE 1건 + commit → 영향받은 행 수"""
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                affected = cursor.execute(sql, params)
+            conn.commit()
+            return affected
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._lock:
+            pool = {
+                'opened': self.opened,
+                'reused': self.reused,
+                'reconnected': self.reconnected,
+                'idle': len(self._idle),
+                'connectMs': round(self.connect_ms, 1),
+            }
+        return {'pool': pool, 'queries': self.query_stats.snapshot()}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(config=None, **kwargs):
+    """
+    프로세스 내 공유 풀 (접속 정보별 1개)
+    fork된 자식 프로세스는 부모 소켓을 공유하면 안 되므로 프로세스 ID도 키에 포함한다.
+    """
+    config = config or config_from_env()
+    key = (os.getpid(), config['host'], config['port'], config['database'], config['user'])
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(config, **kwargs)
+        return pool
+
+
+def connect(config=None):
+    """풀에서 연결 1개 빌리기 (close() 시 반납) - 기존 pymysql.connect 대체용"""
+    return get_pool(config).acquire()
@@ -0,0 +1,244 @@
+"""
+metrics_cache.py
+----------------
+사용자별 campaign_metrics 로컬 컬럼형 캐시 (Parquet, 월 단위 파티션).
+
+ml_predict.py 등 Python ML 스크립트는 매번 3-way JOIN 전체 이력을 다시 받는 대신
+이 캐시에서 데이터를 읽는다. 캐시는 campaign_metrics.updated_at 워터마크로 증분 갱신되어
+새로 추가/변경된 행만 네트워크를 탄다.
+
+디렉터리 구조 (기본: backend/ml_models/metrics_cache, ML_METRICS_CACHE_DIR로 변경 가능):
+  user_<id>/
+    _state.json          마지막 동기화 워터마크(updated_at), 캐시 행 수
+    month=YYYY-MM.parquet
+
+지표가 NULL인 행은 학습에 쓰지 않으므로 캐시에 넣지 않는다 (행 수 비교도 같은 조건).
+조회는 metrics_stream의 서버 측 커서 스트리밍으로 압축 dtype 그대로 받아 Parquet에 쓴다.
+
+갱신 규칙:
+  - updated_at >= 워터마크 인 행만 조회 → 해당 월 파티션에 id 기준 upsert
+    (같은 초에 변경된 행을 놓치지 않도록 >= 사용, 중복은 id로 제거)
+  - DB 행 수와 캐시 행 수가 다르면(행 삭제 발생) 해당 사용자 캐시 전체 재구축
+
+동시 실행:
+  동기화 + 읽기는 사용자별 잠금 파일(user_<id>.lock)로 직렬화한다.
+  (두 요청이 같은 사용자 폴더를 동시에 지우고 쓰거나, 재구축 중인 폴더를 읽지 않도록)
+"""
+
+import os
+import json
+import time
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / 'ml_models' / 'metrics_cache'
+
+# 캐시에 저장하는 컬럼 (ml_predict.py의 분석 컬럼 + 갱신용 id/updated_at)
+METRICS_QUERY = """
+    SELECT
+        cm.id             AS id,
+        ma.channel_code   AS platform,
+        cm.metric_date    AS date,
+        cm.impressions,
+        cm.clicks,
+        cm.cost,
+        cm.conversions    AS installs,
+        cm.updated_at
+    FROM campaign_metrics cm
+    JOIN campaigns c           ON cm.campaign_id = c.id
+    JOIN marketing_accounts ma ON c.marketing_account_id = ma.id
+    WHERE ma.user_id = %s {since_filter}
+      AND cm.impressions IS NOT NULL AND cm.clicks IS NOT NULL
+      AND cm.cost IS NOT NULL AND cm.conversions IS NOT NULL
+"""
+
+STATE_QUERY = """
+    SELECT MAX(cm.updated_at), COUNT(*)
+    FROM campaign_metrics cm
+    JOIN campaigns c           ON cm.campaign_id = c.id
+    JOIN marketing_accounts ma ON c.marketing_account_id = ma.id
+    WHERE ma.user_id = %s
+      AND cm.impressions IS NOT NULL AND cm.clicks IS NOT NULL
+      AND cm.cost IS NOT NULL AND cm.conversions IS NOT NULL
+"""
+
+NUMERIC_COLUMNS = ['impressions', 'clicks', 'cost', 'installs']
+
+
+class MetricsCache:
+    """사용자별 campaign_metrics 증분 캐시"""
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.environ.get('ML_METRICS_CACHE_DIR') or DEFAULT_CACHE_DIR)
+
+    def user_dir(self, user_id):
+        return self.root / f"user_{int(user_id)}"
+
+    @contextmanager
+    def _user_lock(self, user_id):
+        """사용자별 프로세스 간 배타 잠금 (잠금 파일은 재구축 때 지워지지 않도록 사용자 폴더 밖에 둔다)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / f"user_{int(user_id)}.lock", 'a+b') as f:
+            if os.name == 'nt':
+                import msvcrt
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue  # LK_LOCK은 약 10초 후 실패하므로 잠금을 얻을 때까지 재시도
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # 상태
+    # ------------------------------------------------------------------
+    def _load_state(self, user_id):
+        try:
+            with open(self.user_dir(user_id) / '_state.json', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self, user_id, state):
+        path = self.user_dir(user_id) / '_state.json'
+        tmp = path.with_name(f"_state.{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    # ------------------------------------------------------------------
+    # 동기화
+    # ------------------------------------------------------------------
+    def sync(self, conn, user_id):
+        """
+        DB와 캐시 동기화 → 통계 dict
+        mode: 'cold'(전체 적재) / 'incremental'(변경분만) / 'rebuild'(삭제 감지 후 재적재)
+        """
+        with self._user_lock(user_id):
+            return self._sync(conn, user_id)
+
+    def _sync(self, conn, user_id):
+        """sync 본체 (호출 전에 _user_lock을 잡고 있어야 함)"""
+        started = time.perf_counter()
+        with conn.cursor() as cursor:
+            cursor.execute(STATE_QUERY, [user_id])
+            db_max_updated, db_rows = cursor.fetchone()
+        db_max_updated = str(db_max_updated) if db_max_updated is not None else None
+        db_rows = int(db_rows)
+
+        state = self._load_state(user_id)
+        if state is None:
+            mode, since = 'cold', None
+        elif state.get('watermark') == db_max_updated and state.get('rows') == db_rows:
+            return {'mode': 'warm', 'fetched_rows': 0, 'rows': db_rows,
+                    'sync_ms': round((time.perf_counter() - started) * 1000, 1)}
+        elif state.get('rows', 0) > db_rows:
+            # 행이 줄었으면 삭제가 있었던 것 → updated_at 만으로는 알 수 없으므로 재구축
+            mode, since = 'rebuild', None
+        else:
+            mode, since = 'incremental', state.get('watermark')
+
+        if since is None:
+            shutil.rmtree(self.user_dir(user_id), ignore_errors=True)
+        fetched = self._fetch(conn, user_id, since, expected_rows=db_rows if since is None else None)
+        self.user_dir(user_id).mkdir(parents=True, exist_ok=True)
+        cached_rows = self._merge(user_id, fetched)
+
+        # 갱신 후에도 행 수가 맞지 않으면 (삭제 + 추가가 겹친 경우) 재구축
+        if cached_rows != db_rows and mode == 'incremental':
+            shutil.rmtree(self.user_dir(user_id), ignore_errors=True)
+            fetched = self._fetch(conn, user_id, None, expected_rows=db_rows)
+            self.user_dir(user_id).mkdir(parents=True, exist_ok=True)
+            cached_rows = self._merge(user_id, fetched)
+            mode = 'rebuild'
+
+        self._save_state(user_id, {'watermark': db_max_updated, 'rows': cached_rows})
+        return {'mode': mode, 'fetched_rows': len(fetched), 'rows': cached_rows,
+                'sync_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+    def _fetch(self, conn, user_id, since, expected_rows=None):
+        from metrics_stream import stream_query
+
+        params = [user_id]
+        since_filter = ""
+        if since is not None:
+            since_filter = "AND cm.updated_at >= %s"
+            params.append(since)
+
+        return stream_query(conn, METRICS_QUERY.format(since_filter=since_filter), params,
+                            expected_rows=expected_rows)
+
+    def _merge(self, user_id, fetched):
+        """변경 행을 월 파티션별로 id 기준 upsert → 캐시 전체 행 수"""
+        import pandas as pd
+
+        user_dir = self.user_dir(user_id)
+        if not fetched.empty:
+            months = fetched['date'].dt.strftime('%Y-%m')
+            for month, part in fetched.groupby(months, sort=False):
+                path = user_dir / f"month={month}.parquet"
+                if path.exists():
+                    part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+                    part = part.drop_duplicates('id', keep='last')
+                tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+                part.sort_values(['date', 'id']).to_parquet(tmp, index=False)
+                os.replace(tmp, path)
+
+        return self._count_rows(user_id)
+
+    def _count_rows(self, user_id):
+        import pyarrow.parquet as pq
+        return sum(pq.ParquetFile(p).metadata.num_rows
+                   for p in self.user_dir(user_id).glob('month=*.parquet'))
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def read(self, user_id, start=None, end=None, columns=None):
+        """
+        캐시에서 기간 데이터 읽기 (해당 월 파티션만 읽고, 기간 밖 행은 Parquet 읽기 단계에서 제외)
+        반환 컬럼: platform, date, impressions, clicks, cost, installs (+ columns로 추가 지정)
+        dtype은 저장된 압축 dtype 그대로 (platform은 category, date는 datetime64)
+        """
+        import pandas as pd
+
+        paths = sorted(self.user_dir(user_id).glob('month=*.parquet'))
+        if start and end:
+            first, last = str(start)[:7], str(end)[:7]
+            paths = [p for p in paths if first <= p.stem.split('=')[1] <= last]
+
+        read_columns = ['platform', 'date'] + NUMERIC_COLUMNS + list(columns or [])
+        if not paths:
+            return pd.DataFrame(columns=read_columns)
+
+        filters = None
+        if start and end:
+            filters = [('date', '>=', pd.Timestamp(start)), ('date', '<=', pd.Timestamp(end))]
+        df = pd.concat([pd.read_parquet(p, columns=read_columns, filters=filters) for p in paths],
+                       ignore_index=True)
+        # 파티션마다 카테고리 구성이 다를 수 있으므로 합친 뒤 정렬된 category로 통일
+        df['platform'] = df['platform'].astype(str).astype('category')
+        return df
+
+    def load(self, conn, user_id, start=None, end=None):
+        """동기화 후 기간 데이터 반환 → (DataFrame, 통계)"""
+        # 동기화와 읽기 사이에 다른 프로세스가 재구축하지 않도록 같은 잠금 안에서 읽는다
+        with self._user_lock(user_id):
+            stats = self._sync(conn, user_id)
+            read_started = time.perf_counter()
+            df = self.read(user_id, start, end)
+        stats['read_ms'] = round((time.perf_counter() - read_started) * 1000, 1)
+        return df, stats
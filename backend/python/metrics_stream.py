@@ -0,0 +1,194 @@
+"""
+metrics_stream.py
+-----------------
+campaign_metrics 대용량 조회를 메모리 일정하게 읽는 스트리밍 로더.
+
+pd.read_sql은 결과 전체를 Python 튜플로 받은 뒤 object/float64 컬럼으로 만들기 때문에
+수년치 시간 단위 지표(수백만~수천만 행)를 가진 대행사 계정에서는 메모리가 크게 늘어난다.
+
+- 서버 측 커서(pymysql SSCursor)로 chunk_rows 단위로 받아 바로 압축 dtype 배열에 채움
+  (platform → category(int16 코드), 노출/클릭/설치 → int32, 날짜 → datetime64)
+- 예상 행 수(워터마크 COUNT)를 알면 배열을 한 번만 할당, 모르면 2배씩 늘림
+- 비용은 DECIMAL(12,2) 금액이라 일별 합계가 SQL 집계와 일치하도록 float64 유지
+- 분석 컬럼 기준 행 1개당 30바이트 → 1,000만 행 ≈ 300MB + chunk 1개
+
+numpy는 실제로 조회할 때만 import 한다. (ml_predict.py가 이 모듈을 import 하므로
+저장소 적중(warm) 경로에서 numpy 로드 시간이 더해지지 않도록)
+"""
+
+import sys
+
+DEFAULT_CHUNK_ROWS = 50000
+
+# 컬럼별 저장 dtype ('category'는 문자열 → int16 코드, numpy import 없이 이름으로 지정)
+# 정수 컬럼은 int32로 저장하고, 범위를 넘는 값이 들어오면 그 컬럼만 int64로 확장
+COMPACT_DTYPES = {
+    'id': 'int64',
+    'user_id': 'int64',
+    'platform': 'category',
+    'date': 'datetime64[s]',
+    'impressions': 'int32',
+    'clicks': 'int32',
+    'cost': 'float64',
+    'installs': 'int32',
+    'updated_at': 'datetime64[s]',
+}
+
+
+def peak_rss_mb():
+    """현재 프로세스 최대 RSS (MB), 측정 불가 환경(Windows 등)이면 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _server_side_cursor(conn):
+    """pymysql 연결(db.py 풀 연결 포함)이면 SSCursor, 그 외 DB-API 연결은 기본 커서"""
+    try:
+        import pymysql.cursors
+        if isinstance(getattr(conn, 'raw', conn), pymysql.connections.Connection):
+            return conn.cursor(pymysql.cursors.SSCursor)
+    except ImportError:
+        pass
+    return conn.cursor()
+
+
+class _ColumnBuffer:
+    """dtype이 고정된 1차원 배열 + 채워진 길이 (필요 시 2배씩 확장)"""
+
+    def __init__(self, dtype, capacity):
+        import numpy as np
+
+        self.array = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        import numpy as np
+
+        values = np.asarray(values)
+        if self.array.dtype == np.int32 and len(values) and values.max() > np.iinfo(np.int32).max:
+            self.array = self.array.astype(np.int64)
+        n = len(values)
+        if self.size + n > len(self.array):
+            grown = np.empty(max(self.size + n, 2 * len(self.array)), dtype=self.array.dtype)
+            grown[:self.size] = self.array[:self.size]
+            self.array = grown
+        self.array[self.size:self.size + n] = values
+        self.size += n
+
+    def view(self):
+        return self.array[:self.size]
+
+
+def _convert(values, dtype):
+    """chunk의 한 컬럼(Python 값 튜플) → numpy 배열"""
+    import numpy as np
+
+    if dtype.startswith('datetime64'):
+        return np.asarray(values, dtype=dtype)
+    if np.issubdtype(dtype, np.integer):
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+    # DECIMAL(Decimal 객체) 포함 실수 컬럼
+    return np.fromiter(values, dtype=np.float64, count=len(values))
+
+
+class _FrameBuilder:
+    """fetchmany 결과(튜플 목록)를 컬럼별 압축 배열에 누적 → DataFrame"""
+
+    def __init__(self, names, capacity):
+        self.names = names
+        self.dtypes = {name: COMPACT_DTYPES.get(name, 'float64') for name in names}
+        self.buffers = {
+            name: _ColumnBuffer('int16' if dtype == 'category' else dtype, capacity)
+            for name, dtype in self.dtypes.items()
+        }
+        self.category_codes = {name: {} for name, dtype in self.dtypes.items() if dtype == 'category'}
+
+    def extend(self, rows):
+        if not rows:
+            return
+        for name, values in zip(self.names, zip(*rows)):
+            if name in self.category_codes:
+                codes = self.category_codes[name]
+                self.buffers[name].extend([codes.setdefault(v, len(codes)) for v in values])
+            else:
+                self.buffers[name].extend(_convert(values, self.dtypes[name]))
+
+    def frame(self):
+        import pandas as pd
+
+        data = {}
+        for name in self.names:
+            values = self.buffers[name].view()
+            if name in self.category_codes:
+                categories = list(self.category_codes[name])
+                data[name] = pd.Categorical.from_codes(values, categories=categories) \
+                    .reorder_categories(sorted(categories))
+            else:
+                data[name] = values
+        return pd.DataFrame(data, copy=False)
+
+
+def stream_query(conn, query, params=None, expected_rows=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    쿼리 결과를 chunk 단위로 읽어 압축 dtype DataFrame으로 반환
+
+    컬럼 이름은 쿼리의 별칭을 그대로 쓰고, COMPACT_DTYPES에 없는 컬럼은 float64로 저장한다.
+    NULL이 있으면 안 되므로 쿼리에서 IS NOT NULL 조건으로 걸러야 한다.
+    """
+    capacity = max(int(expected_rows or 0), chunk_rows)
+    cursor = _server_side_cursor(conn)
+    try:
+        cursor.execute(query, params or ())
+        builder = _FrameBuilder([d[0] for d in cursor.description], capacity)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            builder.extend(rows)
+            del rows
+    finally:
+        cursor.close()
+    return builder.frame()
+
+
+def stream_groups(conn, query, params=None, key='user_id', chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    key 컬럼으로 정렬된 쿼리 결과를 key별 DataFrame으로 차례로 반환 (제너레이터)
+    → (key 값, key 컬럼을 뺀 DataFrame)
+
+    전체 사용자를 한 번의 정렬 스캔으로 읽으면서 메모리에는 현재 사용자 1명분 + chunk 1개만 둔다.
+    쿼리는 반드시 ORDER BY key 로 시작해야 한다.
+    """
+    cursor = _server_side_cursor(conn)
+    try:
+        cursor.execute(query, params or ())
+        names = [d[0] for d in cursor.description]
+        key_index = names.index(key)
+        value_names = [name for name in names if name != key]
+
+        def strip(rows):
+            return [row[:key_index] + row[key_index + 1:] for row in rows]
+
+        current, builder = None, None
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            start = 0
+            for i, row in enumerate(rows):
+                if row[key_index] != current:
+                    if builder is not None:
+                        builder.extend(strip(rows[start:i]))
+                        yield current, builder.frame()
+                    current, builder, start = row[key_index], _FrameBuilder(value_names, chunk_rows), i
+            builder.extend(strip(rows[start:]))
+            del rows
+        if builder is not None:
+            yield current, builder.frame()
+    finally:
+        cursor.close()
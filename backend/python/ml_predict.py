@@ -5,73 +5,175 @@ Node.js 백엔드에서 child_process.spawn 으로 호출되는 실시간 ML 예
 
 처리 흐름:
   1. 커맨드라인 인수로 DB 접속 정보 및 날짜 필터를 받음
-  2. MySQL에서 campaign_metrics 데이터를 로드
-  3. XGBoost 회귀 모델로 '전환(설치) 수' 예측
-  4. RandomForest 분류 모델로 '최적 광고 매체' 예측
+  2. 데이터 워터마크(max(updated_at) + 행 수) 조회
+  3. 모델 저장소(model_store.py)에 같은 워터마크의 결과가 있으면 그대로 출력 (재학습 없음)
+     (batch_train.py 야간 일괄 학습이 기간 미지정 결과를 미리 채워 둠)
+  4. 없으면 campaign_metrics 데이터를 로드
+     (metrics_cache.py 월 단위 Parquet 캐시를 updated_at 기준 증분 갱신 후 읽음)
+     - XGBoost 회귀 모델로 '전환(설치) 수' 예측
+     - RandomForest 분류 모델로 '최적 광고 매체' 예측
+       (두 모델은 스레드를 나눠 동시에 학습)
+     - 행 수가 --max_train_rows를 넘으면 XGBoost는 매체×날짜 층화 표본으로 학습 (학습 시간 상한)
+     - 모델과 평가 결과를 저장소에 저장
   5. 결과를 JSON으로 stdout에 출력 (Node.js가 파싱)
+     --stream 이면 NDJSON으로 모델 섹션이 끝나는 대로 한 줄씩 출력:
+       {"section": "xgboost", "data": {...}}
+       {"section": "randomforest", "data": {...}}
+       {"section": "done", "data": {"cache": {...}}}
+     에러는 {"error": "..."} 한 줄
+  --windows 로 여러 기간을 한 번에 비교 (예: 이번 기간 vs 이전 기간)
+     - DB 연결 1개, 전체 구간 데이터 1회 로드 → 기간별로 복사 없이 잘라 동시에 학습
+     - 결과: {"windows": {"<start>_<end>": {xgboost, randomforest, cache}, ...}, "cache": {...}}
+     - --stream 이면 각 줄에 "window" 키 추가, 데이터 없는 기간은 {"window": ..., "section": "error", ...}
+
+warm 호출(저장소 적중)은 pandas/sklearn/xgboost를 import 하지 않으므로 수십 ms 안에 끝난다.
 
 사용 방법 (Node.js에서 호출):
   python ml_predict.py \
     --host=<DB_HOST> --port=<DB_PORT> \
     --db=<DB_NAME> --user=<DB_USER> --password=<DB_PASSWORD> \
-    [--start=YYYY-MM-DD] [--end=YYYY-MM-DD]
+    [--start=YYYY-MM-DD] [--end=YYYY-MM-DD] [--threads=N] [--stream]
+    [--max_train_rows=N] [--sampling_eval]
+    [--windows=YYYY-MM-DD:YYYY-MM-DD,YYYY-MM-DD:YYYY-MM-DD,...]
 """
 
+import os
 import sys
 import io
+import copy
 import json
+import time
 import argparse
+import threading
 import warnings
 warnings.filterwarnings('ignore')
 
+import db
+from model_store import ModelStore, make_watermark
+from metrics_cache import MetricsCache
+from metrics_stream import stream_query, peak_rss_mb
+
 # Windows 환경에서 Python stdout이 cp949로 출력되는 문제 해결
 # Node.js가 UTF-8로 읽으므로 stdout을 UTF-8로 강제 설정
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
+
+# XGBoost 학습 행 상한 기본값 (이 정도면 단일 코어에서도 1~2초 안에 학습)
+DEFAULT_MAX_TRAIN_ROWS = 200000
+
+
 # ---------- 커맨드라인 인수 파싱 ----------
-parser = argparse.ArgumentParser()
-parser.add_argument('--host',     required=True)
-parser.add_argument('--port',     type=int, default=3306)
-parser.add_argument('--db',       required=True)
-parser.add_argument('--user',     required=True)
-parser.add_argument('--password', required=True)
-parser.add_argument('--start',    default=None)  # 시작일 필터 (선택)
-parser.add_argument('--end',      default=None)  # 종료일 필터 (선택)
-parser.add_argument('--user_id',  type=int, required=True)  # 사용자 ID (필수)
-args = parser.parse_args()
-
-try:
-    import pandas as pd
-    import pymysql
-    from sklearn.ensemble import RandomForestClassifier
-    from sklearn.model_selection import train_test_split
-    from sklearn.metrics import mean_absolute_error, accuracy_score
-    import xgboost as xgb
-except ImportError as e:
-    # 패키지 누락 시 에러 JSON 출력 후 종료
-    print(json.dumps({"error": f"필수 패키지 누락: {str(e)}"}))
-    sys.exit(1)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host',     required=True)
+    parser.add_argument('--port',     type=int, default=3306)
+    parser.add_argument('--db',       required=True)
+    parser.add_argument('--user',     required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--start',    default=None)  # 시작일 필터 (선택)
+    parser.add_argument('--end',      default=None)  # 종료일 필터 (선택)
+    parser.add_argument('--user_id',  type=int, required=True)  # 사용자 ID (필수)
+    parser.add_argument('--retrain',  action='store_true')  # 저장소 무시하고 강제 재학습
+    parser.add_argument('--no_metrics_cache', action='store_true')  # 로컬 캐시 없이 DB에서 직접 로드
+    # RandomForest 일별 학습 데이터 추출 방식
+    #   local : 로드한 행 데이터를 pandas로 일별 집계 (기본)
+    #   sql   : MySQL에서 일별 집계 + 최고 효율 매체 계산 (하루 1행만 전송)
+    #   verify: 두 방식을 모두 계산해 결과가 같은지 stderr로 보고 (sql 결과 사용)
+    parser.add_argument('--rf_source', choices=['local', 'sql', 'verify'], default='local')
+    parser.add_argument('--threads',  type=int, default=0)   # 학습 전체 스레드 수 (0: CPU 코어 수)
+    parser.add_argument('--stream',   action='store_true')   # 섹션별 NDJSON 출력
+    # XGBoost 학습 행 상한 (0: 제한 없음), 넘으면 매체×날짜 층화 표본으로 학습
+    parser.add_argument('--max_train_rows', type=int, default=DEFAULT_MAX_TRAIN_ROWS)
+    # 오프라인 검증용: 전체 데이터로도 학습해 표본 학습과의 MAE 차이를 함께 보고
+    parser.add_argument('--sampling_eval', action='store_true')
+    # 여러 기간 비교: 시작:종료 를 쉼표로 구분 (--start/--end 대신 사용)
+    parser.add_argument('--windows',  default=None)
+    return parser.parse_args(argv)
+
 
 # ---------- DB 연결 및 데이터 로딩 ----------
-try:
-    conn = pymysql.connect(
-        host=args.host,
-        port=args.port,
-        database=args.db,
-        user=args.user,
-        password=args.password,
-        connect_timeout=10,   # 연결 최대 대기 시간 10초
-        charset='utf8mb4'
-    )
+def connect(args):
+    """공용 연결 풀(db.py)에서 연결 빌리기 - close() 시 풀에 반납 (연결 최대 대기 10초)"""
+    return db.connect(db.config_from_args(args))
 
-    # 날짜 필터 조건 동적 구성 (없으면 전체 기간)
-    # 보안: f-string 직접 삽입 대신 pymysql 파라미터 바인딩 사용 → SQL Injection 방지
+
+def log_db_stats(args):
+    """연결 풀 통계와 쿼리별 실행 시간을 stderr로 출력"""
+    stats = db.get_pool(db.config_from_args(args)).stats()
+    if stats['pool']['opened'] or stats['queries']:
+        print(f"[ml_predict] DB: {json.dumps(stats, ensure_ascii=False)}", file=sys.stderr)
+
+
+def build_filter(args):
+    """
+    사용자 + 날짜 필터 조건 동적 구성 (날짜가 없으면 전체 기간)
+    보안: f-string 직접 삽입 대신 pymysql 파라미터 바인딩 사용 → SQL Injection 방지
+    """
     date_params = []
     date_filter = ""
     if args.start and args.end:
         date_filter = "AND cm.metric_date >= %s AND cm.metric_date <= %s"
         date_params = [args.start, args.end]
+    return date_filter, [args.user_id] + date_params
+
 
+def fetch_watermark(conn, args):
+    """데이터 워터마크 조회 (집계 1행만 전송) → (워터마크, 행 수)"""
+    date_filter, params = build_filter(args)
+    query = f"""
+        SELECT MAX(cm.updated_at), COUNT(*)
+        FROM campaign_metrics cm
+        JOIN campaigns c           ON cm.campaign_id = c.id
+        JOIN marketing_accounts ma ON c.marketing_account_id = ma.id
+        WHERE ma.user_id = %s {date_filter}
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, params)
+        max_updated_at, row_count = cursor.fetchone()
+    return make_watermark(max_updated_at, row_count), int(row_count)
+
+
+def training_watermark(watermark, row_count, max_train_rows):
+    """표본 학습 대상이면 상한값도 저장소 키에 포함 (상한을 바꾸면 다시 학습)"""
+    if max_train_rows and row_count > max_train_rows:
+        return f"{watermark}|sample={max_train_rows}"
+    return watermark
+
+
+def load_metrics(conn, args, expected_rows=None):
+    """
+    분석 데이터 로드 → (DataFrame, 로드 통계)
+    로컬 캐시를 증분 갱신 후 읽고, 캐시를 쓸 수 없으면 (pyarrow 없음, 파일 손상, 입출력 오류 등)
+    DB에서 직접 조회한다.
+    컬럼 dtype: platform=category, date=datetime64, impressions/clicks/installs=int32, cost=float64
+    """
+    started = time.perf_counter()
+    df = None
+    if not args.no_metrics_cache:
+        try:
+            df, stats = MetricsCache().load(conn, args.user_id, args.start, args.end)
+            stats['source'] = 'metrics_cache'
+        except Exception as e:
+            print(f"[ml_predict] 캐시 사용 불가 (DB 직접 조회): {type(e).__name__}: {e}", file=sys.stderr)
+            df = None
+
+    if df is None:
+        df = load_metrics_direct(conn, args, expected_rows)
+        stats = {'source': 'db', 'rows': len(df)}
+
+    stats['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    stats['memory_mb'] = round(float(df.memory_usage(deep=False).sum()) / (1024 * 1024), 2)
+    stats['peak_rss_mb'] = peak_rss_mb()
+    return df, stats
+
+
+def load_metrics_direct(conn, args, expected_rows=None):
+    """
+    DB에서 직접 조회 (서버 측 커서로 chunk 단위 스트리밍 → 압축 dtype)
+    NULL 지표 행은 학습에서 제외되므로 SQL에서 미리 걸러 전송량도 줄인다.
+    정렬은 캐시(날짜, id 순)와 같게 맞춰 어느 경로든 같은 학습/평가 분할이 나오도록 한다.
+    """
+    date_filter, params = build_filter(args)
     query = f"""
         SELECT
             ma.channel_code   AS platform,
@@ -84,165 +186,692 @@ try:
         JOIN campaigns c           ON cm.campaign_id = c.id
         JOIN marketing_accounts ma ON c.marketing_account_id = ma.id
         WHERE ma.user_id = %s {date_filter}
+          AND cm.impressions IS NOT NULL AND cm.clicks IS NOT NULL
+          AND cm.cost IS NOT NULL AND cm.conversions IS NOT NULL
+        ORDER BY cm.metric_date, cm.id
+    """
+    return stream_query(conn, query, params, expected_rows=expected_rows)
+
+
+# ============================================================
+# 학습 행 상한 - 매체×날짜 층화 표본
+# ============================================================
+def stratified_sample(df, max_rows, seed=42):
+    """
+    (매체, 날짜) 층별로 같은 비율의 행을 무작위 추출 → (표본 DataFrame, 표본 정보)
+    층마다 행에 난수 키를 붙여 키가 작은 순으로 할당량만큼 남기는 방식 (층별 reservoir 표본과 동일한 분포)
+    할당량 = 층 크기 × 전체 비율 (반올림, 최소 1행) → 작은 매체/날짜도 빠지지 않음
+    원래 행 순서는 유지한다.
     """
-    params = [args.user_id] + date_params
-    df = pd.read_sql(query, conn, params=params if params else None)
-    conn.close()
-except Exception as e:
-    print(json.dumps({"error": f"DB 연결 실패: {str(e)}"}))
-    sys.exit(1)
+    import numpy as np
+    import pandas as pd
+
+    n = len(df)
+    if not max_rows or n <= max_rows:
+        return df, None
 
-# 데이터가 없는 경우
-if df.empty:
-    print(json.dumps({"error": "해당 기간에 분석할 데이터가 없습니다."}))
-    sys.exit(0)
+    rate = max_rows / n
+    platform_codes = df['platform'].astype('category').cat.codes.to_numpy(np.int64)
+    date_codes = pd.factorize(df['date'])[0].astype(np.int64)
+    strata = platform_codes * (date_codes.max() + 1) + date_codes
+    strata = pd.factorize(strata)[0]
 
-# 숫자형 변환 및 결측치 제거
-for col in ['impressions', 'clicks', 'cost', 'installs']:
-    df[col] = pd.to_numeric(df[col], errors='coerce')
-df = df.dropna()
+    sizes = np.bincount(strata)
+    quota = np.maximum(1, np.rint(sizes * rate).astype(np.int64))
+
+    # 층 → 난수 키 순 정렬 후 층 안에서의 순위 계산
+    keys = np.random.default_rng(seed).random(n)
+    order = np.lexsort((keys, strata))
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - starts[strata[order]]
+
+    keep = np.flatnonzero(rank < quota[strata])
+    info = {
+        "totalRows": n,
+        "sampledRows": len(keep),
+        "rate": round(len(keep) / n, 4),
+        "strata": len(sizes),
+    }
+    return df.iloc[keep], info
+
+
+def _train_labels(frame):
+    """train_xgboost와 같은 80/20 분할의 학습 행 인덱스 (같은 행 수 + random_state → 같은 분할)"""
+    from sklearn.model_selection import train_test_split
+    return train_test_split(frame.index, test_size=0.2, random_state=42)[0]
+
+
+def _holdout_mae(artifacts, holdout):
+    """XGBoost 아티팩트(모델, 매체 클래스)로 holdout 행 평가 → (MAE, 매체별 MAE dict)"""
+    import numpy as np
+    import pandas as pd
+
+    model, classes = artifacts
+    platform_enc = pd.Categorical(holdout['platform'].astype(str), categories=classes).codes
+    known = platform_enc >= 0   # 모델이 학습하지 않은 매체 행은 제외
+    X = holdout[['impressions', 'cost', 'clicks']][known].assign(platform_enc=platform_enc[known])
+    X = X[['platform_enc', 'impressions', 'cost', 'clicks']]
+    abs_err = np.abs(holdout['installs'].to_numpy()[known] - model.predict(X))
+    platform_mae = pd.Series(abs_err).groupby(np.asarray(classes)[platform_enc[known]]).mean()
+    return float(abs_err.mean()), platform_mae.round(2).to_dict()
+
+
+def compare_sampling(df, train_df, full_artifacts, sampled_artifacts):
+    """
+    전체 학습 vs 표본 학습 XGBoost 모델 비교 → MAE 차이 (표본 - 전체)
+    두 모델 모두 같은 holdout으로 평가한다:
+      전체 데이터 분할의 test 행 중 표본 모델 학습에도 쓰이지 않은 행
+    (각자의 test 분할로 평가하면 모델 차이와 평가 셋 차이가 섞임)
+    """
+    holdout_labels = df.index.difference(_train_labels(df)).difference(_train_labels(train_df))
+    holdout = df.loc[holdout_labels]
+    mae_full, platform_full = _holdout_mae(full_artifacts, holdout)
+    mae_sampled, platform_sampled = _holdout_mae(sampled_artifacts, holdout)
+    return {
+        "holdoutRows": len(holdout),
+        "maeFull": round(mae_full, 2),
+        "maeSampled": round(mae_sampled, 2),
+        "maeDelta": round(mae_sampled - mae_full, 2),
+        "platformMaeDelta": [
+            {"name": name, "full": platform_full.get(name), "sampled": error,
+             "delta": round(error - platform_full[name], 2) if name in platform_full else None}
+            for name, error in platform_sampled.items()
+        ],
+    }
 
-result = {}
 
 # ============================================================
 # [1] XGBoost 회귀 모델 - 전환(설치) 수 예측
 # ============================================================
-try:
+def train_xgboost(df, n_jobs=None):
+    """→ (결과 섹션, (모델, 매체 클래스) 또는 None)"""
+    import numpy as np
+    import pandas as pd
     from sklearn.preprocessing import LabelEncoder
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_absolute_error
+    import xgboost as xgb
 
-    df_xgb = df.copy()
     # 매체명(문자열)을 숫자로 인코딩
-    le = LabelEncoder()
-    df_xgb['platform_enc'] = le.fit_transform(df_xgb['platform'])
+    # category 컬럼이면 정렬된 카테고리 코드 = LabelEncoder 결과이므로 코드를 그대로 사용 (복사 없음)
+    if isinstance(df['platform'].dtype, pd.CategoricalDtype):
+        platform = df['platform'].cat.remove_unused_categories()
+        platform_enc = platform.cat.codes
+        classes = list(platform.cat.categories)
+    else:
+        le = LabelEncoder()
+        platform_enc = le.fit_transform(df['platform'])
+        classes = list(le.classes_)
 
     # 피처: 매체 코드, 노출, 비용, 클릭 / 타겟: 설치 수
+    # df 전체를 복사하지 않고 필요한 컬럼만 참조 (Copy-on-Write: 쓰기 전까지 원본 공유)
     features = ['platform_enc', 'impressions', 'cost', 'clicks']
     target   = 'installs'
 
-    X = df_xgb[features]
-    y = df_xgb[target]
-
-    if len(df_xgb) >= 10:
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
-        # XGBoost 회귀 모델 학습
-        model = xgb.XGBRegressor(
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=5,
-            random_state=42
-        )
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
-        mae = mean_absolute_error(y_test, y_pred)
-
-        # 샘플 예측 (테스트셋 첫 번째 데이터)
-        sample_idx    = 0
-        sample_feat   = X_test.iloc[sample_idx]
-        platform_name = le.inverse_transform([int(sample_feat['platform_enc'])])[0]
-
-        # 매체별 MAE 계산
-        df_xgb_test = X_test.copy()
-        df_xgb_test['y_true'] = y_test.values
-        df_xgb_test['y_pred'] = y_pred
-        df_xgb_test['platform_name'] = le.inverse_transform(df_xgb_test['platform_enc'].astype(int))
-        df_xgb_test['abs_err'] = abs(df_xgb_test['y_true'] - df_xgb_test['y_pred'])
-        platform_mae = df_xgb_test.groupby('platform_name')['abs_err'].mean().round(2).to_dict()
-
-        result['xgboost'] = {
-            "status":   "success",
-            "mae":      round(float(mae), 2),         # 전체 평균 절대 오차
-            "dataSize": len(df_xgb),                  # 학습에 사용된 데이터 수
-            "platformMae": [                           # 매체별 오차 리스트
-                {"name": k, "error": v}
-                for k, v in platform_mae.items()
-            ],
-            "sample": {                               # 샘플 예측 결과
-                "platform":   platform_name,
-                "cost":       round(float(sample_feat['cost']), 0),
-                "impressions": round(float(sample_feat['impressions']), 0),
-                "clicks":     round(float(sample_feat['clicks']), 0),
-                "predicted":  round(float(y_pred[sample_idx]), 1),
-                "actual":     int(y_test.iloc[sample_idx])
-            }
+    X = df[['impressions', 'cost', 'clicks']].assign(platform_enc=platform_enc)[features]
+    y = df[target]
+    df_xgb = X
+
+    if len(df_xgb) < 10:
+        return {"status": "insufficient", "message": f"데이터 부족 ({len(df_xgb)}건, 최소 10건 필요)"}, None
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+    # XGBoost 회귀 모델 학습
+    model = xgb.XGBRegressor(
+        n_estimators=100,
+        learning_rate=0.1,
+        max_depth=5,
+        random_state=42,
+        n_jobs=n_jobs
+    )
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    mae = mean_absolute_error(y_test, y_pred)
+
+    # 샘플 예측 (테스트셋 첫 번째 데이터)
+    sample_idx    = 0
+    sample_feat   = X_test.iloc[sample_idx]
+    platform_name = classes[int(sample_feat['platform_enc'])]
+
+    # 매체별 MAE 계산
+    df_xgb_test = X_test.copy()
+    df_xgb_test['y_true'] = y_test.values
+    df_xgb_test['y_pred'] = y_pred
+    df_xgb_test['platform_name'] = np.asarray(classes)[df_xgb_test['platform_enc'].astype(int)]
+    df_xgb_test['abs_err'] = abs(df_xgb_test['y_true'] - df_xgb_test['y_pred'])
+    platform_mae = df_xgb_test.groupby('platform_name')['abs_err'].mean().round(2).to_dict()
+
+    section = {
+        "status":   "success",
+        "mae":      round(float(mae), 2),         # 전체 평균 절대 오차
+        "dataSize": len(df_xgb),                  # 학습에 사용된 데이터 수
+        "platformMae": [                           # 매체별 오차 리스트
+            {"name": k, "error": v}
+            for k, v in platform_mae.items()
+        ],
+        "sample": {                               # 샘플 예측 결과
+            "platform":   platform_name,
+            "cost":       round(float(sample_feat['cost']), 0),
+            "impressions": round(float(sample_feat['impressions']), 0),
+            "clicks":     round(float(sample_feat['clicks']), 0),
+            "predicted":  round(float(y_pred[sample_idx]), 1),
+            "actual":     int(y_test.iloc[sample_idx])
         }
-    else:
-        result['xgboost'] = {"status": "insufficient", "message": f"데이터 부족 ({len(df_xgb)}건, 최소 10건 필요)"}
-except Exception as e:
-    result['xgboost'] = {"status": "error", "message": str(e)}
+    }
+    return section, (model, classes)
+
 
 # ============================================================
 # [2] RandomForest 분류 모델 - 최적 광고 매체 추천
 # ============================================================
-try:
-    df_rf = df.copy()
-    # 1원 당 설치 수(효율) 계산
-    df_rf['efficiency'] = df_rf['installs'] / (df_rf['cost'] + 1)
+# 날짜별 총 노출/비용/클릭 + 1원 당 설치 수(효율)가 가장 높았던 매체를 MySQL에서 계산
+# 효율 동률은 id가 작은 행(먼저 적재된 행)을 선택 → pandas idxmax(첫 번째 최댓값)와 동일
+# 1e0을 곱해 DECIMAL 나눗셈(소수 4자리 반올림) 대신 DOUBLE 나눗셈으로 계산
+RF_DAILY_QUERY = """
+    SELECT
+        t.date,
+        SUM(t.impressions)                      AS impressions,
+        SUM(t.cost)                             AS cost,
+        SUM(t.clicks)                           AS clicks,
+        MAX(CASE WHEN t.rn = 1 THEN t.platform END) AS best_platform
+    FROM (
+        SELECT
+            cm.metric_date  AS date,
+            ma.channel_code AS platform,
+            cm.impressions,
+            cm.cost,
+            cm.clicks,
+            ROW_NUMBER() OVER (
+                PARTITION BY cm.metric_date
+                ORDER BY (cm.conversions * 1e0) / (cm.cost + 1e0) DESC, cm.id
+            ) AS rn
+        FROM campaign_metrics cm
+        JOIN campaigns c           ON cm.campaign_id = c.id
+        JOIN marketing_accounts ma ON c.marketing_account_id = ma.id
+        WHERE ma.user_id = %s {date_filter}
+          AND cm.impressions IS NOT NULL AND cm.clicks IS NOT NULL
+          AND cm.cost IS NOT NULL AND cm.conversions IS NOT NULL
+    ) t
+    GROUP BY t.date
+    ORDER BY t.date
+"""
+
+
+def fetch_rf_daily(conn, args):
+    """RandomForest 학습용 일별 데이터를 SQL로 집계해 조회 (하루 1행)"""
+    import pandas as pd
+
+    date_filter, params = build_filter(args)
+    rf_data = pd.read_sql(RF_DAILY_QUERY.format(date_filter=date_filter), conn, params=params)
+    for col in ['impressions', 'cost', 'clicks']:
+        rf_data[col] = pd.to_numeric(rf_data[col], errors='coerce')
+    rf_data['date'] = pd.to_datetime(rf_data['date'])
+    return rf_data
+
+
+def build_rf_daily(df):
+    """RandomForest 학습용 일별 데이터를 행 데이터에서 pandas로 집계"""
+    import pandas as pd
+
+    # 1원 당 설치 수(효율) 계산 - df를 복사하지 않고 별도 Series로 계산
+    efficiency = df['installs'] / (df['cost'] + 1)
 
     # 날짜별로 효율이 가장 높았던 매체(1등) 추출
-    best_idx   = df_rf.groupby('date')['efficiency'].idxmax()
-    best_daily = df_rf.loc[best_idx, ['date', 'platform']].rename(
+    best_idx   = efficiency.groupby(df['date']).idxmax()
+    best_daily = df.loc[best_idx, ['date', 'platform']].rename(
         columns={'platform': 'best_platform'}
     )
+    best_daily['best_platform'] = best_daily['best_platform'].astype(str)
 
     # 날짜별 전체 광고 환경 집계 (총 노출, 총 비용, 총 클릭)
-    daily_agg = df_rf.groupby('date').agg(
+    daily_agg = df.groupby('date').agg(
         impressions=('impressions', 'sum'),
         cost=('cost', 'sum'),
         clicks=('clicks', 'sum')
     ).reset_index()
 
-    rf_data = pd.merge(daily_agg, best_daily, on='date')
-
-    if len(rf_data) >= 5:
-        X_rf = rf_data[['impressions', 'cost', 'clicks']]
-        y_rf = rf_data['best_platform']
-
-        X_train_rf, X_test_rf, y_train_rf, y_test_rf = train_test_split(
-            X_rf, y_rf, test_size=0.2, random_state=42
-        )
-        # RandomForest 분류 모델 학습
-        rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
-        rf_model.fit(X_train_rf, y_train_rf)
-
-        y_pred_rf = rf_model.predict(X_test_rf)
-        acc       = accuracy_score(y_test_rf, y_pred_rf)
-
-        # 클래스별 정밀도/재현율 계산
-        from sklearn.metrics import classification_report as cr
-        report = cr(y_test_rf, y_pred_rf, output_dict=True, zero_division=0)
-        platform_metrics = [
-            {
-                "name":      k,
-                "precision": round(v['precision'], 2),
-                "recall":    round(v['recall'], 2)
-            }
-            for k, v in report.items()
-            if k not in ('accuracy', 'macro avg', 'weighted avg')
-        ]
-
-        # 샘플 추천 결과
-        sample_rf     = X_test_rf.iloc[0]
-        pred_platform = rf_model.predict(sample_rf.to_frame().T)[0]
-        actual_best   = y_test_rf.iloc[0]
-
-        result['randomforest'] = {
-            "status":          "success",
-            "accuracy":        round(float(acc), 2),  # 전체 정확도
-            "dataSize":        len(rf_data),           # 사용된 날짜 수
-            "platformMetrics": platform_metrics,       # 매체별 추천 정밀도/재현율
-            "sample": {                                # 샘플 추천 결과
-                "totalImpressions": round(float(sample_rf['impressions']), 0),
-                "totalCost":        round(float(sample_rf['cost']), 0),
-                "predicted":        pred_platform,
-                "actual":           actual_best
-            }
+    return pd.merge(daily_agg, best_daily, on='date')
+
+
+def compare_rf_daily(local, pushed):
+    """두 추출 경로의 일별 데이터 비교 → 불일치 설명 목록 (같으면 빈 목록)"""
+    import numpy as np
+
+    problems = []
+    if len(local) != len(pushed):
+        return [f"일수 불일치: local={len(local)}, sql={len(pushed)}"]
+    if list(local['date']) != list(pushed['date']):
+        problems.append("날짜 순서/값 불일치")
+    for col in ['impressions', 'cost', 'clicks']:
+        if not np.allclose(local[col].to_numpy(float), pushed[col].to_numpy(float), rtol=1e-9, atol=1e-6):
+            problems.append(f"{col} 합계 불일치")
+    mismatched = int((local['best_platform'].to_numpy() != pushed['best_platform'].to_numpy()).sum())
+    if mismatched:
+        problems.append(f"최고 효율 매체 불일치 {mismatched}일")
+    return problems
+
+
+def train_randomforest(rf_data, n_jobs=None):
+    """일별 데이터 → (결과 섹션, 모델 또는 None)"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score
+
+    if len(rf_data) < 5:
+        return {"status": "insufficient", "message": f"날짜 데이터 부족 ({len(rf_data)}일치, 최소 5일 필요)"}, None
+
+    X_rf = rf_data[['impressions', 'cost', 'clicks']]
+    y_rf = rf_data['best_platform']
+
+    X_train_rf, X_test_rf, y_train_rf, y_test_rf = train_test_split(
+        X_rf, y_rf, test_size=0.2, random_state=42
+    )
+    # RandomForest 분류 모델 학습
+    rf_model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    rf_model.fit(X_train_rf, y_train_rf)
+
+    y_pred_rf = rf_model.predict(X_test_rf)
+    acc       = accuracy_score(y_test_rf, y_pred_rf)
+
+    # 클래스별 정밀도/재현율 계산
+    from sklearn.metrics import classification_report as cr
+    report = cr(y_test_rf, y_pred_rf, output_dict=True, zero_division=0)
+    platform_metrics = [
+        {
+            "name":      k,
+            "precision": round(v['precision'], 2),
+            "recall":    round(v['recall'], 2)
+        }
+        for k, v in report.items()
+        if k not in ('accuracy', 'macro avg', 'weighted avg')
+    ]
+
+    # 샘플 추천 결과
+    sample_rf     = X_test_rf.iloc[0]
+    pred_platform = rf_model.predict(sample_rf.to_frame().T)[0]
+    actual_best   = y_test_rf.iloc[0]
+
+    section = {
+        "status":          "success",
+        "accuracy":        round(float(acc), 2),  # 전체 정확도
+        "dataSize":        len(rf_data),           # 사용된 날짜 수
+        "platformMetrics": platform_metrics,       # 매체별 추천 정밀도/재현율
+        "sample": {                                # 샘플 추천 결과
+            "totalImpressions": round(float(sample_rf['impressions']), 0),
+            "totalCost":        round(float(sample_rf['cost']), 0),
+            "predicted":        pred_platform,
+            "actual":           actual_best
         }
+    }
+    return section, rf_model
+
+
+def thread_budget(total=0):
+    """
+    전체 스레드 수 → (XGBoost 스레드, RandomForest 스레드)
+    XGBoost(행 데이터)가 RandomForest(하루 1행)보다 학습량이 훨씬 많으므로 2/3를 배정.
+    두 모델 합이 전체를 넘지 않게 해 OpenMP/joblib 스레드 과다 생성을 막는다.
+    """
+    total = total or os.cpu_count() or 1
+    if total < 2:
+        return 1, 1
+    rf_threads = max(1, total // 3)
+    return total - rf_threads, rf_threads
+
+
+def train_all(df, rf_data=None, threads=0, on_section=None, max_train_rows=0, sampling_eval=False):
+    """
+    두 모델 동시 학습 → (결과, XGBoost 아티팩트, RandomForest 모델)
+    rf_data: SQL로 미리 집계한 일별 데이터 (없으면 df에서 집계)
+    threads: 두 모델이 나눠 쓸 전체 스레드 수 (0: CPU 코어 수)
+    max_train_rows: XGBoost 학습 행 상한 (넘으면 층화 표본, 섹션에 sampling 정보 추가)
+      RandomForest는 일별 합계를 쓰므로 항상 전체 행으로 집계한다.
+    sampling_eval: 표본 학습 시 전체 데이터로도 학습해 MAE 차이를 sampling.eval에 기록 (오프라인 검증용)
+    on_section: 섹션 학습이 끝날 때마다 호출 on_section(이름, 섹션) - 끝난 순서대로
+    (XGBoost 학습과 sklearn 트리 생성은 GIL을 놓으므로 스레드로 충분히 병렬 실행된다)
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    xgb_threads, rf_threads = thread_budget(threads)
+
+    def run_xgboost():
+        train_df, sampling = stratified_sample(df, max_train_rows)
+        section, artifacts = train_xgboost(train_df, n_jobs=xgb_threads)
+        if sampling is not None and section.get('status') == 'success':
+            if sampling_eval:
+                _, full_artifacts = train_xgboost(df, n_jobs=xgb_threads)
+                sampling['eval'] = compare_sampling(df, train_df, full_artifacts, artifacts)
+            section['sampling'] = sampling
+        return section, artifacts
+
+    def run_randomforest():
+        daily = build_rf_daily(df) if rf_data is None else rf_data
+        return train_randomforest(daily, n_jobs=rf_threads)
+
+    result = {}
+    models = {'xgboost': None, 'randomforest': None}
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = {pool.submit(run_xgboost): 'xgboost',
+                   pool.submit(run_randomforest): 'randomforest'}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result[name], models[name] = future.result()
+            except Exception as e:
+                result[name] = {"status": "error", "message": str(e)}
+            if on_section is not None:
+                on_section(name, result[name])
+
+    # 출력 키 순서는 기존과 동일하게 유지
+    result = {name: result[name] for name in ('xgboost', 'randomforest')}
+    return result, models['xgboost'], models['randomforest']
+
+
+def run(args, store=None, on_section=None):
+    """
+    저장소 적중 시 저장된 결과, 아니면 학습 후 저장한 결과 반환
+    에러는 {"error": ...} 형태로 반환 (exit code는 main에서 결정)
+    on_section: 모델 섹션이 준비될 때마다 호출 (--stream 출력용)
+    """
+    store = store or ModelStore()
+    started = time.perf_counter()
+
+    try:
+        conn = connect(args)
+    except Exception as e:
+        return {"error": f"DB 연결 실패: {str(e)}"}, 1
+
+    try:
+        try:
+            watermark, row_count = fetch_watermark(conn, args)
+        except Exception as e:
+            return {"error": f"DB 연결 실패: {str(e)}"}, 1
+        watermark = training_watermark(watermark, row_count, args.max_train_rows)
+
+        # 데이터가 없는 경우
+        if row_count == 0:
+            return {"error": "해당 기간에 분석할 데이터가 없습니다."}, 0
+
+        # 같은 워터마크로 학습한 결과가 있으면 재사용
+        if not args.retrain:
+            meta = store.load_result(args.user_id, args.start, args.end, watermark)
+            if meta is not None:
+                result = dict(meta['result'])
+                if on_section is not None:
+                    for name in ('xgboost', 'randomforest'):
+                        if name in result:
+                            on_section(name, result[name])
+                result['cache'] = {
+                    "hit": True,
+                    "trainedAt": meta.get('trained_at'),
+                    "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+                }
+                return result, 0
+
+        try:
+            import pandas  # noqa: F401
+            import sklearn  # noqa: F401
+            import xgboost  # noqa: F401
+        except ImportError as e:
+            # 패키지 누락 시 에러 JSON 출력 후 종료
+            return {"error": f"필수 패키지 누락: {str(e)}"}, 1
+
+        try:
+            df, load_stats = load_metrics(conn, args, expected_rows=row_count)
+            print(f"[ml_predict] 데이터 로드: {load_stats}", file=sys.stderr)
+            rf_data = fetch_rf_daily(conn, args) if args.rf_source != 'local' else None
+        except Exception as e:
+            return {"error": f"DB 연결 실패: {str(e)}"}, 1
+    finally:
+        conn.close()
+
+    if df.empty:
+        return {"error": "해당 기간에 분석할 데이터가 없습니다."}, 0
+
+    if args.rf_source == 'verify':
+        problems = compare_rf_daily(build_rf_daily(df), rf_data)
+        print(f"[ml_predict] RF 일별 데이터 검증: 행 {len(df)}건 → {len(rf_data)}일, "
+              f"{'일치' if not problems else problems}", file=sys.stderr)
+
+    train_started = time.perf_counter()
+    result, xgb_artifacts, rf_model = train_all(df, rf_data, threads=args.threads,
+                                                on_section=on_section,
+                                                max_train_rows=args.max_train_rows,
+                                                sampling_eval=args.sampling_eval)
+    train_ms = round((time.perf_counter() - train_started) * 1000, 1)
+
+    try:
+        store.save(args.user_id, args.start, args.end, watermark, result,
+                   xgb_artifacts, rf_model, train_ms=train_ms)
+    except Exception as e:
+        # 저장 실패는 응답에 영향 없음 (다음 호출에서 다시 학습)
+        print(f"[ml_predict] 모델 저장 실패: {e}", file=sys.stderr)
+
+    result = dict(result)
+    result['cache'] = {
+        "hit": False,
+        "dataLoad": load_stats,
+        "trainMs": train_ms,
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+    }
+    return result, 0
+
+
+# ============================================================
+# 여러 기간 비교 (--windows)
+# ============================================================
+def parse_windows(value):
+    """'시작:종료,시작:종료' → [(시작, 종료), ...] (형식 오류 시 ValueError)"""
+    import datetime
+
+    windows = []
+    for part in value.split(','):
+        if not part.strip():
+            continue
+        start, sep, end = part.strip().partition(':')
+        if not sep:
+            raise ValueError(f"기간 형식이 올바르지 않습니다: {part} (YYYY-MM-DD:YYYY-MM-DD)")
+        if datetime.date.fromisoformat(start) > datetime.date.fromisoformat(end):
+            raise ValueError(f"시작일이 종료일보다 늦을 수 없습니다: {part}")
+        if (start, end) not in windows:
+            windows.append((start, end))
+    if not windows:
+        raise ValueError("비교할 기간이 없습니다.")
+    return windows
+
+
+def window_args(args, start, end):
+    """기간만 바꾼 인수 복사본 (fetch_watermark/load_metrics 등 기존 함수 재사용)"""
+    scoped = copy.copy(args)
+    scoped.start, scoped.end = start, end
+    return scoped
+
+
+def slice_window(df, start, end):
+    """
+    날짜순 정렬된 데이터에서 기간 행만 잘라냄
+    연속 구간이므로 위치 슬라이스(iloc) → 복사 없이 원본 배열을 공유하는 view
+    """
+    import numpy as np
+
+    dates = df['date'].to_numpy()
+    lo = np.searchsorted(dates, np.datetime64(start), side='left')
+    hi = np.searchsorted(dates, np.datetime64(end) + np.timedelta64(1, 'D'), side='left')
+    return df.iloc[lo:hi]
+
+
+def run_windows(args, store=None, on_section=None):
+    """
+    여러 기간을 한 번에 분석 → ({"windows": {키: 결과}, "cache": ...}, exit code)
+    기간별 저장소 적중은 그대로 재사용하고, 학습이 필요한 기간만 전체 구간을 1회 로드해 나눠 학습한다.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    store = store or ModelStore()
+    started = time.perf_counter()
+    try:
+        windows = parse_windows(args.windows)
+    except ValueError as e:
+        return {"error": str(e)}, 1
+
+    def window_key(start, end):
+        return f"{start}_{end}"
+
+    def emit(key, name, section):
+        if on_section is not None:
+            on_section(name, section, window=key)
+
+    try:
+        conn = connect(args)
+    except Exception as e:
+        return {"error": f"DB 연결 실패: {str(e)}"}, 1
+
+    results, todo = {}, []
+    load_stats = None
+    try:
+        try:
+            for start, end in windows:
+                watermark, row_count = fetch_watermark(conn, window_args(args, start, end))
+                todo.append((start, end, training_watermark(watermark, row_count, args.max_train_rows),
+                             row_count))
+        except Exception as e:
+            return {"error": f"DB 연결 실패: {str(e)}"}, 1
+
+        # 저장소 적중 / 데이터 없음 기간은 바로 결과 확정
+        pending = []
+        for start, end, watermark, row_count in todo:
+            key = window_key(start, end)
+            if row_count == 0:
+                results[key] = {"error": "해당 기간에 분석할 데이터가 없습니다."}
+                emit(key, 'error', results[key]['error'])
+                continue
+            meta = None if args.retrain else store.load_result(args.user_id, start, end, watermark)
+            if meta is not None:
+                results[key] = dict(meta['result'])
+                for name in ('xgboost', 'randomforest'):
+                    if name in results[key]:
+                        emit(key, name, results[key][name])
+                results[key]['cache'] = {"hit": True, "trainedAt": meta.get('trained_at')}
+            else:
+                pending.append((start, end, watermark, row_count))
+
+        if pending:
+            try:
+                import pandas  # noqa: F401
+                import sklearn  # noqa: F401
+                import xgboost  # noqa: F401
+            except ImportError as e:
+                return {"error": f"필수 패키지 누락: {str(e)}"}, 1
+
+            # 학습할 기간 전체를 덮는 구간을 한 번만 로드
+            union = window_args(args, min(w[0] for w in pending), max(w[1] for w in pending))
+            try:
+                df, load_stats = load_metrics(conn, union)
+                print(f"[ml_predict] 데이터 로드 (기간 {len(pending)}개 통합): {load_stats}", file=sys.stderr)
+                rf_union = fetch_rf_daily(conn, union) if args.rf_source != 'local' else None
+            except Exception as e:
+                return {"error": f"DB 연결 실패: {str(e)}"}, 1
+    finally:
+        conn.close()
+
+    if pending:
+        if not df['date'].is_monotonic_increasing:
+            df = df.sort_values('date', kind='stable')
+        # 스레드 예산을 기간 수로 나눠 동시에 학습 (기간당 최소 1스레드)
+        total_threads = args.threads or os.cpu_count() or 1
+        threads_per_window = max(1, total_threads // len(pending))
+
+        def train_window(window):
+            start, end, watermark, _ = window
+            key = window_key(start, end)
+            part = slice_window(df, start, end)
+            if part.empty:
+                emit(key, 'error', "해당 기간에 분석할 데이터가 없습니다.")
+                return key, {"error": "해당 기간에 분석할 데이터가 없습니다."}
+            rf_data = None
+            if rf_union is not None:
+                rf_data = slice_window(rf_union, start, end).reset_index(drop=True)
+            if args.rf_source == 'verify':
+                problems = compare_rf_daily(build_rf_daily(part), rf_data)
+                print(f"[ml_predict] RF 일별 데이터 검증 ({key}): "
+                      f"{'일치' if not problems else problems}", file=sys.stderr)
+
+            train_started = time.perf_counter()
+            result, xgb_artifacts, rf_model = train_all(
+                part, rf_data, threads=threads_per_window,
+                on_section=lambda name, section: emit(key, name, section),
+                max_train_rows=args.max_train_rows, sampling_eval=args.sampling_eval)
+            train_ms = round((time.perf_counter() - train_started) * 1000, 1)
+            try:
+                store.save(args.user_id, start, end, watermark, result,
+                           xgb_artifacts, rf_model, train_ms=train_ms)
+            except Exception as e:
+                print(f"[ml_predict] 모델 저장 실패 ({key}): {e}", file=sys.stderr)
+            result = dict(result)
+            result['cache'] = {"hit": False, "trainMs": train_ms}
+            return key, result
+
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            for key, result in pool.map(train_window, pending):
+                results[key] = result
+
+    return {
+        # 입력 순서대로
+        "windows": {window_key(start, end): results[window_key(start, end)] for start, end in windows},
+        "cache": {
+            "dataLoad": load_stats,
+            "trained": len(pending),
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+        },
+    }, 0
+
+
+# --windows --stream 에서는 기간별 학습 스레드가 동시에 섹션을 출력하므로 한 줄 단위로 직렬화
+_EMIT_LOCK = threading.Lock()
+
+
+def emit_line(payload):
+    """NDJSON 한 줄 출력 (Node.js가 줄 단위로 바로 읽도록 flush)"""
+    # print는 본문과 줄바꿈을 따로 쓰므로 다른 스레드 출력과 섞일 수 있음 → 한 번의 write
+    line = json.dumps(payload, ensure_ascii=False) + "\n"
+    with _EMIT_LOCK:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    execute = run_windows if args.windows else run
+
+    if args.stream:
+        def on_section(name, section, window=None):
+            payload = {"section": name, "data": section}
+            if window is not None:
+                payload = {"window": window, **payload}
+            emit_line(payload)
+
+        result, exit_code = execute(args, on_section=on_section)
+        log_db_stats(args)
+        if 'error' in result:
+            emit_line({"error": result['error']})
+        else:
+            emit_line({"section": "done", "data": {"cache": result.get('cache')}})
+        sys.exit(exit_code)
+
+    result, exit_code = execute(args)
+    log_db_stats(args)
+
+    # ---------- 결과를 JSON으로 stdout 출력 (Node.js가 파싱) ----------
+    if 'error' in result:
+        print(json.dumps(result))
     else:
-        result['randomforest'] = {"status": "insufficient", "message": f"날짜 데이터 부족 ({len(rf_data)}일치, 최소 5일 필요)"}
-except Exception as e:
-    result['randomforest'] = {"status": "error", "message": str(e)}
+        print(json.dumps(result, ensure_ascii=False))
+    sys.exit(exit_code)
+
 
-# ---------- 결과를 JSON으로 stdout 출력 (Node.js가 파싱) ----------
-print(json.dumps(result, ensure_ascii=False))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+model_store.py
+--------------
+ml_predict.py 학습 결과(모델 + 평가 결과) 영구 저장소.
+
+키: (user_id, 날짜 범위, 데이터 워터마크)
+  - 워터마크 = campaign_metrics의 max(updated_at) + 행 수
+  - 워터마크가 같으면 저장된 평가 결과를 그대로 반환 → 재학습 없음
+  - 워터마크가 바뀌면 재학습 후 같은 (user_id, 날짜 범위) 항목을 교체
+
+디렉터리 구조 (기본: backend/ml_models/predict_store, ML_PREDICT_STORE_DIR로 변경 가능):
+  user_<id>/<start>_<end>/
+    meta.json            워터마크, 평가 결과(JSON), 학습 시각/소요 시간
+    xgboost.ubj          설치 수 회귀 모델
+    xgboost_classes.json 매체 LabelEncoder 클래스
+    randomforest.joblib  최적 매체 분류 모델
+
+warm 호출이 수십 ms 안에 끝나도록 이 모듈은 표준 라이브러리만 import 한다.
+(모델 파일은 필요할 때만 load_* 함수에서 xgboost/joblib을 import)
+"""
+
+import os
+import json
+import time
+import shutil
+from pathlib import Path
+
+DEFAULT_STORE_DIR = Path(__file__).resolve().parent.parent / 'ml_models' / 'predict_store'
+
+
+def make_watermark(max_updated_at, row_count):
+    """max(updated_at) + 행 수 → 워터마크 문자열"""
+    return f"{max_updated_at}|{int(row_count)}"
+
+
+class ModelStore:
+    """(user_id, 날짜 범위)별 최신 워터마크의 모델/평가 결과 보관"""
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.environ.get('ML_PREDICT_STORE_DIR') or DEFAULT_STORE_DIR)
+
+    def entry_dir(self, user_id, start=None, end=None):
+        return self.root / f"user_{int(user_id)}" / f"{start or 'all'}_{end or 'all'}"
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def load_meta(self, user_id, start=None, end=None):
+        path = self.entry_dir(user_id, start, end) / 'meta.json'
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_result(self, user_id, start, end, watermark):
+        """워터마크가 일치하는 저장 결과 (없으면 None)"""
+        meta = self.load_meta(user_id, start, end)
+        if meta is None or meta.get('watermark') != watermark:
+            return None
+        return meta
+
+    def load_xgboost(self, user_id, start=None, end=None):
+        """저장된 설치 수 회귀 모델 → (XGBRegressor, 매체 클래스 목록) 또는 None"""
+        entry = self.entry_dir(user_id, start, end)
+        model_path = entry / 'xgboost.ubj'
+        if not model_path.exists():
+            return None
+        import xgboost as xgb
+        model = xgb.XGBRegressor()
+        model.load_model(str(model_path))
+        with open(entry / 'xgboost_classes.json', encoding='utf-8') as f:
+            classes = json.load(f)
+        return model, classes
+
+    def load_randomforest(self, user_id, start=None, end=None):
+        path = self.entry_dir(user_id, start, end) / 'randomforest.joblib'
+        if not path.exists():
+            return None
+        import joblib
+        return joblib.load(path)
+
+    # ------------------------------------------------------------------
+    # 저장
+    # ------------------------------------------------------------------
+    def save(self, user_id, start, end, watermark, result, xgb_artifacts=None, rf_model=None,
+             train_ms=None):
+        """
+        평가 결과와 모델 저장 (임시 디렉터리에 모두 쓴 뒤 교체 → 반쯤 쓴 항목을 읽지 않음)
+
+        xgb_artifacts: (XGBRegressor, 매체 클래스 목록)
+        """
+        entry = self.entry_dir(user_id, start, end)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_name(f"{entry.name}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+
+        if xgb_artifacts is not None:
+            model, classes = xgb_artifacts
+            model.save_model(str(tmp / 'xgboost.ubj'))
+            with open(tmp / 'xgboost_classes.json', 'w', encoding='utf-8') as f:
+                json.dump([str(c) for c in classes], f, ensure_ascii=False)
+
+        if rf_model is not None:
+            import joblib
+            joblib.dump(rf_model, tmp / 'randomforest.joblib')
+
+        meta = {
+            'watermark': watermark,
+            'result': result,
+            'trained_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'train_ms': train_ms,
+        }
+        with open(tmp / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        old = entry.with_name(f"{entry.name}.old-{os.getpid()}")
+        if entry.exists():
+            os.replace(entry, old)
+        os.replace(tmp, entry)
+        shutil.rmtree(old, ignore_errors=True)
+        return meta
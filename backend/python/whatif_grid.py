@@ -0,0 +1,226 @@
+"""
+whatif_grid.py
+--------------
+설치 수 회귀 모델(XGBoost) What-if 응답 곡면 계산 스크립트.
+
+ml_predict.py가 학습해 모델 저장소(model_store.py)에 저장한 모델을 그대로 불러와
+매체별 비용 × 노출 × 클릭 격자의 모든 점을 한 번의 inplace_predict 호출로 예측한다.
+(행마다 DMatrix를 만들지 않음 → 100만 점을 약 1초 안에 계산)
+
+격자 지정 (--grid JSON, 매체별 [최솟값, 최댓값, 점 개수]):
+  {"naver":  {"cost": [100000, 5000000, 100], "impressions": [10000, 500000, 100], "clicks": [100, 20000, 100]},
+   "meta":   {...}}
+  - 모델이 학습하지 않은 매체는 결과의 skipped에 표시
+  - 한 축만 보고 싶으면 점 개수를 1로 (최솟값으로 고정)
+
+출력 (stdout JSON):
+  platforms.<매체>:
+    axes       각 축 격자 값
+    shape      [비용, 노출, 클릭] 점 개수
+    marginal   축별 평균 예측 설치 수 (나머지 축 평균) → 축별 응답 곡선
+    best       예측 설치 수 최대 지점, costPerInstall 최소 지점
+    values     --full 일 때만: 예측 설치 수 전체 (비용, 노출, 클릭 순 C-order 1차원 배열)
+  points, predictMs
+
+사용 방법:
+  python whatif_grid.py --user_id=<ID> [--start=YYYY-MM-DD --end=YYYY-MM-DD] \
+    --grid='<JSON>' [--full] [--threads=N]
+"""
+
+import sys
+import io
+import json
+import time
+import argparse
+import warnings
+warnings.filterwarnings('ignore')
+
+from model_store import ModelStore
+
+# Windows 환경에서 Python stdout이 cp949로 출력되는 문제 해결
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+
+# ml_predict.train_xgboost 학습 Feature 순서
+FEATURES = ['platform_enc', 'impressions', 'cost', 'clicks']
+AXES = ['cost', 'impressions', 'clicks']
+
+# 한 번의 요청에서 허용하는 최대 격자 점 수 (메모리: 점당 4 x float32 = 16바이트)
+MAX_POINTS = 5_000_000
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--user_id', type=int, required=True)
+    parser.add_argument('--start',   default=None)   # 모델 저장소 키 (ml_predict.py 호출 기간과 동일)
+    parser.add_argument('--end',     default=None)
+    parser.add_argument('--grid',    required=True)  # 매체별 축 범위 JSON
+    parser.add_argument('--full',    action='store_true')  # 전체 예측값 포함
+    parser.add_argument('--threads', type=int, default=0)  # 예측 스레드 수 (0: 모델 기본값)
+    return parser.parse_args(argv)
+
+
+def axis_steps(spec):
+    """[최솟값, 최댓값, 점 개수] → 점 개수 (배열을 만들기 전에 격자 크기 확인용)"""
+    _, _, steps = spec
+    steps = int(steps)
+    if steps < 1:
+        raise ValueError(f"점 개수는 1 이상이어야 합니다: {spec}")
+    return steps
+
+
+def axis_values(spec):
+    """[최솟값, 최댓값, 점 개수] → float32 격자 값"""
+    import numpy as np
+
+    low, high, _ = spec
+    steps = axis_steps(spec)
+    if steps == 1:
+        return np.array([low], dtype=np.float32)
+    return np.linspace(low, high, steps, dtype=np.float32)
+
+
+def build_grid(grid, classes):
+    """
+    격자 정의 → (Feature 행렬, 매체별 (이름, 축 값, 시작 위치)) / 모델에 없는 매체 목록
+    모든 매체의 격자를 하나의 (점 수, 4) float32 행렬에 이어 붙여 예측을 한 번만 호출한다.
+    """
+    import numpy as np
+
+    index_of = {name: i for i, name in enumerate(classes)}
+    sizes, skipped = [], []
+    total = 0
+    if not isinstance(grid, dict):
+        raise TypeError(f"격자는 매체별 객체여야 합니다: {type(grid).__name__}")
+    # 축 배열을 만들기 전에 원본 점 개수만으로 전체 크기를 먼저 확인 (큰 값이면 메모리 할당 없이 거부)
+    for platform, spec in grid.items():
+        if not isinstance(spec, dict):
+            raise TypeError(f"{platform}: 축 정의는 객체여야 합니다 ({', '.join(AXES)})")
+        if platform not in index_of:
+            skipped.append(platform)
+            continue
+        size = 1
+        for axis in AXES:
+            size *= axis_steps(spec[axis])
+        sizes.append((platform, size))
+        total += size
+
+    if total > MAX_POINTS:
+        raise ValueError(f"격자 점 수가 너무 많습니다: {total} (최대 {MAX_POINTS})")
+
+    blocks = []
+    offset = 0
+    for platform, size in sizes:
+        axes = {axis: axis_values(grid[platform][axis]) for axis in AXES}
+        blocks.append((platform, axes, offset, size))
+        offset += size
+
+    X = np.empty((total, len(FEATURES)), dtype=np.float32)
+    for platform, axes, offset, size in blocks:
+        # 축 순서(비용, 노출, 클릭)로 펼친 C-order 격자
+        cost, impressions, clicks = np.meshgrid(axes['cost'], axes['impressions'], axes['clicks'],
+                                                indexing='ij', copy=False)
+        block = X[offset:offset + size]
+        block[:, FEATURES.index('platform_enc')] = index_of[platform]
+        block[:, FEATURES.index('cost')] = cost.ravel()
+        block[:, FEATURES.index('impressions')] = impressions.ravel()
+        block[:, FEATURES.index('clicks')] = clicks.ravel()
+    return X, blocks, skipped
+
+
+def summarize_surface(axes, values, full=False):
+    """매체 1개 응답 곡면 요약 (축별 평균 곡선, 최대 설치/최소 설치당 비용 지점)"""
+    import numpy as np
+
+    shape = [len(axes[axis]) for axis in AXES]
+    # float32 예측값을 그대로 반올림하면 JSON에 1.9500000476... 처럼 출력되므로 float64로 변환
+    values = values.astype(np.float64)
+    surface = values.reshape(shape)
+    marginal = {
+        axis: np.round(surface.mean(axis=tuple(j for j in range(3) if j != i)), 2).tolist()
+        for i, axis in enumerate(AXES)
+    }
+
+    def point(flat_index):
+        idx = np.unravel_index(flat_index, shape)
+        p = {axis: round(float(axes[axis][idx[i]]), 0) for i, axis in enumerate(AXES)}
+        p['predicted'] = round(float(surface[idx]), 1)
+        return p
+
+    cost_grid = np.broadcast_to(axes['cost'][:, None, None], shape)
+    cost_per_install = cost_grid / np.maximum(surface, 1e-6)
+
+    section = {
+        "axes": {axis: np.round(axes[axis].astype(np.float64), 2).tolist() for axis in AXES},
+        "shape": shape,
+        "marginal": marginal,
+        "best": {
+            "maxInstalls": point(int(surface.argmax())),
+            "minCostPerInstall": point(int(cost_per_install.argmin())),
+        },
+    }
+    if full:
+        section["values"] = np.round(values, 2).tolist()
+    return section
+
+
+def score_grid(model, classes, grid, full=False, threads=0):
+    """저장된 XGBRegressor + 매체 클래스로 격자 전체 예측 → 결과 dict"""
+    X, blocks, skipped = build_grid(grid, classes)
+
+    booster = model.get_booster()
+    if threads:
+        booster.set_param({'nthread': threads})
+    started = time.perf_counter()
+    # DMatrix 없이 numpy 배열을 바로 예측 (행렬 1개 → 호출 1번)
+    predictions = booster.inplace_predict(X, validate_features=False) if len(X) else X[:, 0]
+    predict_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    platforms = {
+        platform: summarize_surface(axes, predictions[offset:offset + size], full)
+        for platform, axes, offset, size in blocks
+    }
+    return {
+        "platforms": platforms,
+        "skipped": skipped,
+        "points": int(len(X)),
+        "predictMs": predict_ms,
+    }
+
+
+def run(args, store=None):
+    store = store or ModelStore()
+    try:
+        grid = json.loads(args.grid)
+    except ValueError as e:
+        return {"error": f"격자 JSON 형식 오류: {str(e)}"}, 1
+    # 모델을 불러오기 전에 구조부터 확인 (리스트 / 숫자 등이면 JSON 오류로 응답)
+    if not isinstance(grid, dict) or not all(isinstance(spec, dict) for spec in grid.values()):
+        return {"error": "격자 정의 오류: 매체별 {\"cost\": [...], \"impressions\": [...], \"clicks\": [...]} 객체가 필요합니다."}, 1
+
+    try:
+        loaded = store.load_xgboost(args.user_id, args.start, args.end)
+    except ImportError as e:
+        return {"error": f"필수 패키지 누락: {str(e)}"}, 1
+    if loaded is None:
+        return {"error": "학습된 모델이 없습니다. 먼저 ML 분석(ml_predict.py)을 실행해주세요."}, 0
+
+    model, classes = loaded
+    try:
+        result = score_grid(model, classes, grid, full=args.full, threads=args.threads)
+    except (KeyError, TypeError, ValueError) as e:
+        return {"error": f"격자 정의 오류: {str(e)}"}, 1
+
+    meta = store.load_meta(args.user_id, args.start, args.end) or {}
+    result["model"] = {"trainedAt": meta.get('trained_at'), "platforms": classes}
+    return result, 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result, exit_code = run(args)
+    print(json.dumps(result, ensure_ascii=False))
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI 일괄(카탈로그) 추론 스크립트
+고객이 업로드한 제품 카탈로그(수천~수십만 건)에 대해 제품별 추천 결과를 생성한다.
+
+처리 흐름:
+  1. NDJSON / CSV / Parquet 입력을 shard 단위로 스트리밍 읽기 (전체를 메모리에 올리지 않음)
+  2. 부모 프로세스에서 모델을 1회 로드한 뒤 fork → 워커들이 모델을 copy-on-write로 공유
+  3. 각 shard는 recommend_for_products 로 묶어서 추론 (모델 호출 2회/shard)
+  4. 결과를 입력 순서대로 NDJSON / Parquet 으로 스트리밍 저장
+  5. 진행률 · shard별 소요 시간은 stderr, 최종 요약 JSON은 stdout으로 출력
+
+사용 방법:
+  python ai_bulk_inference.py --input=catalog.csv --output=result.ndjson [--workers=4] [--shard_size=1000]
+  python ai_inference.py --bulk --input=catalog.parquet --output=result.parquet
+"""
+
+import sys
+import os
+import gc
+import json
+import math
+import time
+import argparse
+import warnings
+import multiprocessing
+from collections import deque, namedtuple
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+warnings.filterwarnings('ignore')
+
+# 프로젝트 루트를 Python 경로에 추가
+current_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(current_dir))
+
+from src.services.ml.aiRecommendationService import get_ai_engine
+
+
+# Parquet 출력 시 요약 컬럼으로 펼칠 플랫폼 목록 (엔진의 self.platforms와 동일)
+PLATFORMS = ['google', 'meta', 'naver', 'karrot']
+
+# 엔진이 숫자로 사용하는 입력 필드 (CSV 컬럼에 문자열이 섞이면 컬럼 전체가 문자열로 읽히므로 행 단위로 복원)
+NUMERIC_FIELDS = ('daily_budget', 'total_budget', 'campaign_duration', 'target_audience_size')
+
+# 파싱에 실패한 NDJSON 줄 (행 번호를 유지한 채 해당 행만 error로 기록)
+MalformedLine = namedtuple('MalformedLine', ['line_no', 'error'])
+
+# 워커 프로세스 안의 엔진 (fork 시 부모에서 로드한 인스턴스를 그대로 상속)
+_worker_engine = None
+
+
+def log(*args):
+    """stdout은 최종 요약 JSON 전용이므로 로그는 stderr로 출력"""
+    print(*args, file=sys.stderr, flush=True)
+
+
+def detect_format(path: str, explicit: str = None) -> str:
+    if explicit:
+        return explicit
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.ndjson', '.jsonl', '.json'):
+        return 'ndjson'
+    if suffix == '.csv':
+        return 'csv'
+    if suffix in ('.parquet', '.pq'):
+        return 'parquet'
+    raise ValueError(f"파일 형식을 알 수 없습니다: {path} (--input_format/--output_format 지정 필요)")
+
+
+def _clean_record(record: dict) -> dict:
+    """CSV/Parquet의 빈 값(NaN/None)은 제거해 엔진 기본값이 적용되도록 함"""
+    cleaned = {}
+    for key, value in record.items():
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        if hasattr(value, 'item'):
+            value = value.item()  # numpy 스칼라 → Python 기본형
+        if key in NUMERIC_FIELDS and isinstance(value, str):
+            try:
+                number = float(value)
+                value = int(number) if number.is_integer() else number
+            except ValueError:
+                pass  # 잘못된 값은 그대로 두어 해당 행만 error로 기록
+        cleaned[key] = value
+    return cleaned
+
+
+def iter_shards(path: str, fmt: str, shard_size: int):
+    """입력 파일을 shard_size 단위 제품 목록으로 나눠 순차 반환"""
+    if fmt == 'ndjson':
+        shard = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    shard.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    log(f"[bulk] {line_no}번째 줄 JSON 파싱 실패: {e}")
+                    shard.append(MalformedLine(line_no, str(e)))
+                if len(shard) >= shard_size:
+                    yield shard
+                    shard = []
+        if shard:
+            yield shard
+
+    elif fmt == 'csv':
+        import pandas as pd
+        for chunk in pd.read_csv(path, chunksize=shard_size):
+            yield [_clean_record(r) for r in chunk.to_dict('records')]
+
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=shard_size):
+            yield [_clean_record(r) for r in batch.to_pylist()]
+
+    else:
+        raise ValueError(f"지원하지 않는 입력 형식: {fmt}")
+
+
+def count_rows(path: str, fmt: str):
+    """진행률 표시용 전체 행 수 (Parquet만 메타데이터로 바로 확인, 나머지는 None)"""
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    return None
+
+
+def _init_worker(model_dir):
+    """spawn 방식(Windows 등)에서는 워커마다 모델을 직접 로드"""
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = get_ai_engine(model_dir)
+
+
+def _score_products(engine, start_row: int, products: list) -> list:
+    """
+    제품 묶음을 한 번에 추론
+    묶음 추론이 실패하면 절반씩 나눠 다시 시도해 잘못된 행만 error로 기록한다. (실패 행 수 x log(shard) 호출)
+    """
+    try:
+        results = engine.recommend_for_products(products)
+        return [{'row': start_row + i, **result} for i, result in enumerate(results)]
+    except Exception as e:
+        if len(products) == 1:
+            product = products[0]
+            return [{
+                'row': start_row,
+                'product_name': product.get('name') if isinstance(product, dict) else None,
+                'error': str(e),
+                'type': type(e).__name__
+            }]
+
+    half = len(products) // 2
+    return (_score_products(engine, start_row, products[:half])
+            + _score_products(engine, start_row + half, products[half:]))
+
+
+def _score_shard_products(engine, start_row: int, products: list) -> list:
+    """파싱 실패 줄은 error 행으로 남기고, 그 사이의 정상 제품 구간만 묶어서 추론"""
+    records = []
+    i = 0
+    while i < len(products):
+        if isinstance(products[i], MalformedLine):
+            bad = products[i]
+            records.append({
+                'row': start_row + i,
+                'line': bad.line_no,
+                'product_name': None,
+                'error': bad.error,
+                'type': 'JSONDecodeError'
+            })
+            i += 1
+            continue
+        j = i
+        while j < len(products) and not isinstance(products[j], MalformedLine):
+            j += 1
+        records += _score_products(engine, start_row + i, products[i:j])
+        i = j
+    return records
+
+
+def score_shard(shard_id: int, start_row: int, products: list):
+    """shard 하나를 추론 (워커 프로세스에서 실행)"""
+    started = time.perf_counter()
+    records = _score_shard_products(_worker_engine, start_row, products)
+
+    return {
+        'shard_id': shard_id,
+        'records': records,
+        'elapsed_ms': (time.perf_counter() - started) * 1000,
+        'pid': os.getpid(),
+    }
+
+
+class NdjsonWriter:
+    def __init__(self, path: str):
+        self._f = open(path, 'w', encoding='utf-8')
+
+    def write(self, records: list):
+        self._f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+
+    def close(self):
+        self._f.close()
+
+
+class ParquetResultWriter:
+    """
+    shard마다 row group 하나씩 추가하는 Parquet 출력
+    주요 지표는 컬럼으로 펼치고, 전체 결과는 result_json 컬럼에 보관한다.
+    """
+
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        fields = [
+            ('row', pa.int64()),
+            ('product_name', pa.string()),
+            ('primary_platform', pa.string()),
+            ('primary_score', pa.float64()),
+            ('confidence_level', pa.string()),
+        ]
+        fields += [(f'roas_{p}', pa.float64()) for p in PLATFORMS]
+        fields += [(f'budget_{p}', pa.float64()) for p in PLATFORMS]
+        fields += [('expected_total_return', pa.float64()), ('error', pa.string()), ('result_json', pa.string())]
+        self._schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(path, self._schema, compression='zstd')
+
+    def write(self, records: list):
+        columns = {name: [] for name in self._schema.names}
+        for r in records:
+            ok = 'error' not in r
+            forecast = r.get('performance_forecast', {})
+            allocation = r.get('budget_allocation', {}).get('recommended_allocation', {})
+            columns['row'].append(r['row'])
+            columns['product_name'].append(r.get('product_name'))
+            columns['primary_platform'].append(r['recommended_platforms']['primary']['platform'] if ok else None)
+            columns['primary_score'].append(r['recommended_platforms']['primary']['score'] if ok else None)
+            columns['confidence_level'].append(r['confidence']['level'] if ok else None)
+            for p in PLATFORMS:
+                columns[f'roas_{p}'].append(forecast.get(p, {}).get('roas'))
+                columns[f'budget_{p}'].append(allocation.get(p, {}).get('budget'))
+            columns['expected_total_return'].append(r.get('budget_allocation', {}).get('expected_total_return'))
+            columns['error'].append(r.get('error'))
+            columns['result_json'].append(json.dumps(r, ensure_ascii=False) if ok else None)
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='제품 카탈로그 일괄 추천')
+    parser.add_argument('--input', required=True)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--input_format', choices=['ndjson', 'csv', 'parquet'], default=None)
+    parser.add_argument('--output_format', choices=['ndjson', 'parquet'], default=None)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shard_size', type=int, default=1000)
+    parser.add_argument('--model_dir', default=None)
+    args = parser.parse_args(argv)
+
+    global _worker_engine
+
+    in_fmt = detect_format(args.input, args.input_format)
+    out_fmt = detect_format(args.output, args.output_format)
+    total_rows = count_rows(args.input, in_fmt)
+
+    # 부모에서 모델을 먼저 로드 → fork된 워커는 같은 메모리 페이지를 copy-on-write로 공유
+    # 워커는 shard 단위 병렬이므로 모델 내부 스레드는 1개로 제한 (과구독 방지)
+    load_start = time.perf_counter()
+    _worker_engine = get_ai_engine(args.model_dir)
+    for attr in ('roas_predictor', 'platform_recommender'):
+        model = getattr(_worker_engine, attr, None)
+        if model is not None and hasattr(model, 'set_params'):
+            model.set_params(n_jobs=1)
+    log(f"[bulk] 모델 로드 완료 ({(time.perf_counter() - load_start) * 1000:.0f}ms)")
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('fork')
+        initializer, initargs = None, ()
+        # 로드된 모델 객체를 GC 추적 대상에서 제외 → 워커에서 GC가 페이지를 건드려 복사되는 것을 방지
+        gc.freeze()
+    else:
+        ctx = multiprocessing.get_context('spawn')
+        initializer, initargs = _init_worker, (args.model_dir,)
+
+    writer = ParquetResultWriter(args.output) if out_fmt == 'parquet' else NdjsonWriter(args.output)
+
+    # 입력 순서대로 쓰기 위해 제출 순서를 유지하고, 미완료 shard는 workers*2개까지만 유지 (메모리 상한)
+    max_pending = max(1, args.workers * 2)
+    pending = deque()
+    shard_times = []
+    done_rows = 0
+    error_rows = 0
+    started = time.perf_counter()
+
+    def drain_one():
+        nonlocal done_rows, error_rows
+        shard = pending.popleft().result()
+        writer.write(shard['records'])
+        n = len(shard['records'])
+        done_rows += n
+        error_rows += sum(1 for r in shard['records'] if 'error' in r)
+        shard_times.append(shard['elapsed_ms'])
+
+        elapsed = time.perf_counter() - started
+        progress = f"{done_rows:,}/{total_rows:,}" if total_rows else f"{done_rows:,}"
+        log(f"[bulk] shard {shard['shard_id']:>5} | {n:>6}건 | {shard['elapsed_ms']:8.1f}ms "
+            f"(pid {shard['pid']}) | 누적 {progress} | {done_rows / max(elapsed, 1e-9):,.0f}건/s")
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx,
+                                 initializer=initializer, initargs=initargs) as pool:
+            start_row = 0
+            for shard_id, products in enumerate(iter_shards(args.input, in_fmt, args.shard_size)):
+                if len(pending) >= max_pending:
+                    drain_one()
+                pending.append(pool.submit(score_shard, shard_id, start_row, products))
+                start_row += len(products)
+            while pending:
+                drain_one()
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    shard_times.sort()
+    summary = {
+        'status': 'success',
+        'input': args.input,
+        'output': args.output,
+        'rows': done_rows,
+        'errors': error_rows,
+        'shards': len(shard_times),
+        'workers': args.workers,
+        'elapsed_sec': round(elapsed, 2),
+        'rows_per_sec': round(done_rows / elapsed, 1) if elapsed > 0 else None,
+        'shard_ms': {
+            'p50': round(shard_times[len(shard_times) // 2], 1) if shard_times else None,
+            'max': round(shard_times[-1], 1) if shard_times else None,
+        },
+    }
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
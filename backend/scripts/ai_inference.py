@@ -3,6 +3,9 @@
 """
 AI 추론 스크립트
 Node.js에서 호출되어 사전학습된 모델로 추론 수행
+
+  python ai_inference.py '<product_info JSON>'
+  python ai_inference.py --bulk --input=catalog.csv --output=result.ndjson  (ai_bulk_inference.py 참고)
 """
 
 import sys
@@ -25,6 +28,12 @@ from src.services.ml.aiRecommendationService import get_ai_engine
 
 
 def main():
+    # 카탈로그 일괄 추론 모드: python ai_inference.py --bulk --input=... --output=...
+    if len(sys.argv) > 1 and sys.argv[1] == '--bulk':
+        from ai_bulk_inference import main as bulk_main
+        bulk_main(sys.argv[2:])
+        sys.exit(0)
+
     try:
         # Node.js로부터 JSON 입력 받기
         if len(sys.argv) < 2:
@@ -35,13 +44,24 @@ def main():
             sys.exit(1)
         
         input_json = sys.argv[1]
-        product_info = json.loads(input_json)
+        payload = json.loads(input_json)
+        
+        # {"product_info": ..., "user_campaigns": [...], "user_id": ...} 형태면 사용자 데이터도 함께 사용
+        if 'product_info' in payload:
+            product_info = payload['product_info']
+            user_campaigns = payload.get('user_campaigns')
+            user_id = payload.get('user_id')
+        else:
+            product_info = payload
+            user_campaigns = None
+            user_id = None
         
         # AI 엔진 로드
         engine = get_ai_engine()
         
         # 추론 수행
-        result = engine.recommend_for_product(product_info)
+        # (사용자 모델이 없으면 학습이 백그라운드로 예약되고, 프로세스 종료 전에 디스크에 저장됨)
+        result = engine.recommend_for_product(product_info, user_campaigns, user_id)
         
         # JSON 출력 (stdout)
         print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI 추론 서버
+ai_inference.py를 요청마다 spawn하면 매번 모델(.pkl)을 다시 unpickle 하므로,
+AIRecommendationEngine 하나를 프로세스에 상주시키고 HTTP로 추론을 제공한다.
+
+- 고정 크기 스레드 풀에서 recommend_for_product 동시 처리 (XGBoost 예측은 GIL 해제)
+- 실행 중 + 대기 슬롯이 가득 차면 즉시 503 + Retry-After 응답 (backpressure)
+- localhost TCP 또는 Unix 소켓 중 선택
+
+사용 방법:
+  python ai_inference_server.py [--host=127.0.0.1] [--port=8765] [--workers=4] [--queue=8]
+  python ai_inference_server.py --socket=/tmp/ai_inference.sock
+
+엔드포인트:
+  POST /recommend  body: product_info JSON
+                   (또는 {"product_info": {...}, "user_campaigns": [...], "user_id": 1})
+  GET  /health     상태/동시 처리 현황
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+import warnings
+import socketserver
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+warnings.filterwarnings('ignore')
+
+# 프로젝트 루트를 Python 경로에 추가
+current_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(current_dir))
+
+from src.services.ml.aiRecommendationService import get_ai_engine
+
+
+# 최대 요청 본문 크기 (product_info + user_campaigns 기준 충분한 값)
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def log(*args):
+    """stdout은 사용하지 않고 stderr로만 로그 출력"""
+    print(*args, file=sys.stderr, flush=True)
+
+
+def limit_model_threads(engine, n_threads: int):
+    """
+    모델 내부 스레드 수 제한
+    요청 단위 병렬화를 스레드 풀이 담당하므로, 단건 예측이 코어 전체를 쓰면 과구독이 된다.
+    """
+    for attr in ('roas_predictor', 'platform_recommender'):
+        model = getattr(engine, attr, None)
+        if model is not None and hasattr(model, 'set_params'):
+            try:
+                model.set_params(n_jobs=n_threads)
+            except ValueError:
+                pass
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    """추론 요청 처리 핸들러 (스레드 풀 워커에서 실행)"""
+
+    # HTTP/1.0: 응답 후 연결을 닫아 keep-alive 연결이 워커를 점유하지 않도록 함
+    protocol_version = 'HTTP/1.0'
+
+    def log_message(self, format, *args):
+        # 요청별 access log는 남기지 않음 (필요 시 --verbose)
+        if self.server.verbose:
+            log(f"[ai_inference_server] {format % args}")
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._send_json(404, {'error': 'Not found'})
+
+        server = self.server
+        return self._send_json(200, {
+            'status': 'ok',
+            'workers': server.workers,
+            'capacity': server.capacity,
+            'in_flight': server.in_flight,
+            'served': server.served,
+            'rejected': server.rejected,
+            'uptime_sec': round(time.time() - server.started_at, 1),
+            'explain_cache': server.engine.explainer.stats(),
+        })
+
+    def do_POST(self):
+        if self.path != '/recommend':
+            return self._send_json(404, {'error': 'Not found'})
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length <= 0 or length > MAX_BODY_BYTES:
+                return self._send_json(400, {'error': 'Invalid body size'})
+
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+            if 'product_info' in payload:
+                product_info = payload['product_info']
+                user_campaigns = payload.get('user_campaigns')
+                user_id = payload.get('user_id')
+            else:
+                product_info = payload
+                user_campaigns = None
+                user_id = None
+        except (ValueError, UnicodeDecodeError) as e:
+            return self._send_json(400, {'error': 'Invalid JSON', 'message': str(e)})
+
+        try:
+            result = self.server.engine.recommend_for_product(product_info, user_campaigns, user_id)
+            status = 200
+        except Exception as e:
+            result = {
+                'error': 'Inference failed',
+                'message': str(e),
+                'type': type(e).__name__
+            }
+            status = 500
+
+        # 추론이 끝나면 응답 전송 전에 슬롯 반환
+        # (응답을 받은 클라이언트의 다음 요청이 아직 반환되지 않은 슬롯 때문에 503을 받지 않도록)
+        self.server.release_slot()
+        return self._send_json(status, result)
+
+
+class BoundedPoolMixIn:
+    """
+    요청을 고정 크기 스레드 풀로 넘기는 서버 믹스인
+    (workers + queue)개를 넘는 연결은 처리하지 않고 바로 503으로 돌려보낸다.
+    """
+
+    def init_pool(self, engine, workers: int, queue: int, verbose: bool = False):
+        self.engine = engine
+        self.workers = workers
+        self.capacity = workers + queue
+        self.verbose = verbose
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.served = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-infer')
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            self._reject(request)
+            return
+
+        with self._stats_lock:
+            self.in_flight += 1
+        self._executor.submit(self._process_in_pool, request, client_address)
+
+    def release_slot(self):
+        """현재 워커 스레드가 점유한 슬롯 반환 (요청당 1회만 반영)"""
+        if not getattr(self._local, 'holding', False):
+            return
+        self._local.holding = False
+        with self._stats_lock:
+            self.in_flight -= 1
+            self.served += 1
+        self._slots.release()
+
+    def _process_in_pool(self, request, client_address):
+        self._local.holding = True
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.release_slot()
+            self.shutdown_request(request)
+
+    def _reject(self, request):
+        body = json.dumps({'error': 'Server busy', 'retry_after': 1}).encode('utf-8')
+        head = (
+            'HTTP/1.0 503 Service Unavailable\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            'Retry-After: 1\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Connection: close\r\n\r\n'
+        ).encode('ascii')
+        try:
+            # 읽지 않은 요청 바이트가 남은 채로 닫으면 RST가 나가 클라이언트가 503을 못 받으므로 먼저 비움
+            request.settimeout(0.05)
+            try:
+                request.recv(MAX_BODY_BYTES)
+            except OSError:
+                pass
+            request.sendall(head + body)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False)
+
+
+class TCPInferenceServer(BoundedPoolMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class UnixInferenceServer(BoundedPoolMixIn, socketserver.UnixStreamServer):
+        request_queue_size = 128
+
+        def finish_request(self, request, client_address):
+            # Unix 소켓은 client_address가 문자열이므로 HTTP 핸들러용 튜플로 맞춤
+            self.RequestHandlerClass(request, ('unix', 0), self)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AIRecommendationEngine 상주 추론 서버')
+    parser.add_argument('--host', default=os.environ.get('AI_INFERENCE_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('AI_INFERENCE_PORT', 8765)))
+    parser.add_argument('--socket', default=None, help='Unix 소켓 경로 (지정 시 TCP 대신 사용)')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--queue', type=int, default=None, help='대기 슬롯 수 (기본: workers*2)')
+    parser.add_argument('--model_threads', type=int, default=1, help='단건 예측당 모델 내부 스레드 수')
+    parser.add_argument('--model_dir', default=None)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    queue = args.queue if args.queue is not None else args.workers * 2
+
+    load_start = time.perf_counter()
+    engine = get_ai_engine(args.model_dir)
+    limit_model_threads(engine, args.model_threads)
+    log(f"[ai_inference_server] 모델 로드 완료 ({(time.perf_counter() - load_start) * 1000:.0f}ms)")
+
+    if args.socket:
+        if not hasattr(socketserver, 'UnixStreamServer'):
+            log("[ai_inference_server] 이 OS는 Unix 소켓을 지원하지 않습니다. --port를 사용하세요.")
+            sys.exit(1)
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = UnixInferenceServer(args.socket, InferenceHandler)
+        address = f"unix:{args.socket}"
+    else:
+        server = TCPInferenceServer((args.host, args.port), InferenceHandler)
+        address = f"http://{args.host}:{args.port}"
+
+    server.init_pool(engine, args.workers, queue, verbose=args.verbose)
+    log(f"[ai_inference_server] {address} 대기 중 (workers={args.workers}, queue={queue})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+유사 광고주 인덱스 생성/갱신 스크립트
+campaign_metrics에서 캠페인별 실제 ROAS(SUM(revenue)/SUM(cost))를 집계해
+ml_models/similar_advertisers.npz에 저장한다. AIRecommendationEngine이 시작 시 로드한다.
+
+- 증분 갱신: 기존 인덱스의 워터마크(updated_at) 이후 바뀐 캠페인만 다시 집계해 upsert
+- 타게팅 속성: campaigns 테이블에는 업종/지역/연령/성별 컬럼이 없으므로
+  --profiles(CSV 또는 NDJSON: campaign_id, industry, region, age_group, gender)로 보충한다.
+  속성이 없는 캠페인은 예산만으로 색인된다.
+
+사용 방법:
+  python build_similar_index.py --host=<DB_HOST> --db=<DB_NAME> --user=<DB_USER> --password=<DB_PASSWORD>
+  python build_similar_index.py ... --profiles=campaign_profiles.csv --full
+"""
+
+import sys
+import os
+import csv
+import json
+import time
+import argparse
+from pathlib import Path
+
+# 프로젝트 루트를 Python 경로에 추가
+current_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(current_dir))
+# 공용 DB 모듈 (backend/python/db.py)
+sys.path.insert(0, str(current_dir / 'python'))
+
+from src.services.ml.similarAdvertiserIndex import SimilarAdvertiserIndex
+
+
+CAMPAIGN_ROAS_QUERY = """
+    SELECT
+        c.id              AS campaign_id,
+        ma.user_id        AS user_id,
+        ma.channel_code   AS platform,
+        c.daily_budget,
+        c.total_budget,
+        SUM(cm.cost)      AS cost,
+        SUM(cm.revenue)   AS revenue,
+        GREATEST(MAX(cm.updated_at), MAX(c.updated_at)) AS updated_at
+    FROM campaigns c
+    JOIN marketing_accounts ma ON c.marketing_account_id = ma.id
+    JOIN campaign_metrics cm   ON cm.campaign_id = c.id
+    {where}
+    GROUP BY c.id, ma.user_id, ma.channel_code, c.daily_budget, c.total_budget
+    HAVING SUM(cm.cost) > 0
+"""
+
+# 워터마크 이후 지표나 캠페인 정보가 바뀐 캠페인만 (집계는 해당 캠페인 전체 기간으로 다시 계산)
+# updated_at은 초 단위 → 워터마크와 같은 초에 나중에 바뀐 행도 잡도록 >= (upsert라 중복 반영해도 무방)
+# 지표 서브쿼리는 idx_metrics_updated (updated_at, campaign_id) 범위 스캔으로 처리
+INCREMENTAL_WHERE = """
+    WHERE c.updated_at >= %s
+       OR c.id IN (SELECT DISTINCT campaign_id FROM campaign_metrics WHERE updated_at >= %s)
+"""
+
+
+def log(*args):
+    print(*args, file=sys.stderr, flush=True)
+
+
+def load_profiles(path):
+    """campaign_id → 타게팅 속성 (CSV 또는 NDJSON)"""
+    if not path:
+        return {}
+    profiles = {}
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            profiles[int(row['campaign_id'])] = {
+                key: row.get(key) for key in ('industry', 'region', 'age_group', 'gender')
+                if row.get(key)
+            }
+    return profiles
+
+
+def fetch_campaigns(conn, watermark=None):
+    where, params = '', []
+    if watermark:
+        where, params = INCREMENTAL_WHERE, [watermark, watermark]
+
+    with conn.cursor() as cursor:
+        cursor.execute(CAMPAIGN_ROAS_QUERY.format(where=where), params)
+        columns = [d[0] for d in cursor.description]
+        for row in cursor.fetchall():
+            yield dict(zip(columns, row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='유사 광고주 인덱스 생성/갱신')
+    parser.add_argument('--host',     required=True)
+    parser.add_argument('--port',     type=int, default=3306)
+    parser.add_argument('--db',       required=True)
+    parser.add_argument('--user',     required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--profiles', default=None, help='캠페인 타게팅 속성 파일 (CSV/NDJSON)')
+    parser.add_argument('--model_dir', default=os.environ.get('AI_MODEL_DIR', str(current_dir / 'ml_models')))
+    parser.add_argument('--full', action='store_true', help='기존 인덱스를 무시하고 전체 재생성')
+    args = parser.parse_args()
+
+    path = SimilarAdvertiserIndex.default_path(args.model_dir)
+    index = SimilarAdvertiserIndex()
+    if path.exists() and not args.full:
+        index = SimilarAdvertiserIndex.load(path)
+        log(f"[build_similar_index] 기존 인덱스 로드: {len(index)}건, watermark={index.watermark}")
+
+    profiles = load_profiles(args.profiles)
+
+    start = time.perf_counter()
+    import db
+
+    conn = db.connect(db.config_from_args(args))
+    try:
+        campaigns = []
+        for row in fetch_campaigns(conn, index.watermark):
+            cost = float(row['cost'] or 0)
+            campaigns.append({
+                **profiles.get(int(row['campaign_id']), {}),
+                'campaign_id': row['campaign_id'],
+                'user_id': row['user_id'],
+                'platform': row['platform'],
+                'daily_budget': float(row['daily_budget'] or 0),
+                'total_budget': float(row['total_budget'] or 0),
+                'cost': cost,
+                'roas': float(row['revenue'] or 0) / cost,
+                'updated_at': row['updated_at'],
+            })
+    finally:
+        conn.close()
+
+    index.upsert(campaigns)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    index.save(tmp_path)
+    os.replace(tmp_path, path)
+
+    print(json.dumps({
+        'success': True,
+        'updated_campaigns': len(campaigns),
+        'indexed_campaigns': len(index),
+        'watermark': index.watermark,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+        'path': str(path),
+    }, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI 추론 부하 테스트 스크립트
+상주 추론 서버(ai_inference_server.py)와 요청마다 ai_inference.py를 spawn하는 방식을
+같은 요청 수 / 동시성으로 비교한다.
+
+사용 방법:
+  # 서버를 먼저 띄운 뒤
+  python ai_inference_server.py --port=8765
+  python load_test_inference.py --requests=200 --concurrency=8 --url=http://127.0.0.1:8765
+
+  # spawn 방식은 느리므로 요청 수를 따로 지정 가능
+  python load_test_inference.py --requests=200 --spawn_requests=20 --concurrency=4
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPT_DIR = Path(__file__).parent
+
+INDUSTRIES = ['ecommerce', 'finance', 'education', 'food_delivery',
+              'fashion', 'tech', 'health', 'real_estate']
+REGIONS = ['seoul', 'busan', 'daegu', 'incheon', 'gwangju', 'daejeon', 'ulsan', 'others']
+AGE_GROUPS = ['18-24', '25-34', '35-44', '45-54', '55+']
+GENDERS = ['male', 'female', 'all']
+
+
+def make_payload(rng: random.Random) -> dict:
+    """aiRecommendationController.ts가 만드는 payload와 같은 형태의 임의 입력 생성"""
+    daily_budget = rng.randrange(10000, 500000, 1000)
+    duration = rng.randint(7, 90)
+    return {
+        'name': '부하 테스트 제품',
+        'industry': rng.choice(INDUSTRIES),
+        'region': rng.choice(REGIONS),
+        'age_group': rng.choice(AGE_GROUPS),
+        'gender': rng.choice(GENDERS),
+        'daily_budget': daily_budget,
+        'total_budget': daily_budget * duration,
+        'campaign_duration': duration,
+        'target_audience_size': rng.randint(1000, 1000000),
+    }
+
+
+def call_server(url: str, payload: dict, timeout: float):
+    """서버 방식 1회 호출 → (상태, 지연 ms)"""
+    body = json.dumps(payload).encode('utf-8')
+    req = urllib.request.Request(
+        f"{url.rstrip('/')}/recommend", data=body,
+        headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            json.loads(resp.read().decode('utf-8'))
+            status = 'ok'
+    except urllib.error.HTTPError as e:
+        status = 'rejected' if e.code == 503 else 'error'
+    except Exception:
+        status = 'error'
+    return status, (time.perf_counter() - start) * 1000
+
+
+def call_spawn(python: str, payload: dict, timeout: float):
+    """spawn 방식 1회 호출 → (상태, 지연 ms)"""
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(
+            [python, str(SCRIPT_DIR / 'ai_inference.py'), json.dumps(payload)],
+            capture_output=True, timeout=timeout,
+            env={**os.environ, 'PYTHONIOENCODING': 'utf-8'}
+        )
+        status = 'ok' if proc.returncode == 0 else 'error'
+    except subprocess.TimeoutExpired:
+        status = 'error'
+    return status, (time.perf_counter() - start) * 1000
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run(label, fn, payloads, concurrency):
+    """동일한 payload 목록을 concurrency 만큼 동시에 호출하고 통계 반환"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fn, payloads))
+    elapsed = time.perf_counter() - start
+
+    ok_latencies = sorted(ms for status, ms in results if status == 'ok')
+    return {
+        'mode': label,
+        'requests': len(payloads),
+        'ok': len(ok_latencies),
+        'rejected': sum(1 for status, _ in results if status == 'rejected'),
+        'errors': sum(1 for status, _ in results if status == 'error'),
+        'elapsed_sec': round(elapsed, 2),
+        'throughput_rps': round(len(ok_latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(ok_latencies, 50), 1),
+        'p95_ms': round(percentile(ok_latencies, 95), 1),
+        'p99_ms': round(percentile(ok_latencies, 99), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='상주 추론 서버 vs spawn 부하 테스트')
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--spawn_requests', type=int, default=None, help='spawn 방식 요청 수 (기본: --requests)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--python', default=sys.executable)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--skip_spawn', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payloads = [make_payload(rng) for _ in range(args.requests)]
+
+    reports = [run(
+        'server', lambda p: call_server(args.url, p, args.timeout),
+        payloads, args.concurrency
+    )]
+
+    if not args.skip_spawn:
+        n_spawn = args.spawn_requests or args.requests
+        reports.append(run(
+            'spawn', lambda p: call_spawn(args.python, p, args.timeout),
+            payloads[:n_spawn], args.concurrency
+        ))
+
+    print(f"{'mode':<8} | {'req':>5} | {'ok':>5} | {'503':>4} | {'err':>4} | "
+          f"{'rps':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    print('-' * 82)
+    for r in reports:
+        print(f"{r['mode']:<8} | {r['requests']:>5} | {r['ok']:>5} | {r['rejected']:>4} | {r['errors']:>4} | "
+              f"{r['throughput_rps']:>7} | {r['p50_ms']:>8} | {r['p95_ms']:>8} | {r['p99_ms']:>8}")
+
+    if len(reports) == 2 and reports[0]['p50_ms'] > 0:
+        print(f"\np50 지연 개선: {reports[1]['p50_ms'] / reports[0]['p50_ms']:.1f}x "
+              f"/ 처리량 개선: {reports[0]['throughput_rps'] / max(reports[1]['throughput_rps'], 0.1):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -58,6 +58,7 @@ export const ERROR_CODES = {
     NO_DATA:              { code: 'AI_100', message: '분석할 광고 데이터가 없습니다.' },
     GENERATE_FAILED:      { code: 'AI_500', message: 'AI 분석 생성 중 오류가 발생했습니다.' },
     SERVER_ERROR:         { code: 'AI_501', message: 'AI 처리 중 오류가 발생했습니다.' },
+    SERVER_BUSY:          { code: 'AI_503', message: 'AI 추론 요청이 많습니다. 잠시 후 다시 시도하세요.' },
   },
 
   // ── AI 소재 (CREATIVE) ────────────────────────────────────────────────────
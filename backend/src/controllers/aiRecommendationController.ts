@@ -1,6 +1,9 @@
 import { Request, Response } from 'express';
 import { spawn } from 'child_process';
 import path from 'path';
+import axios from 'axios';
+import pool from '../config/database';
+import { AuthRequest } from '../middlewares/auth';
 import { ERROR_CODES, createErrorResponse } from '../constants/errorCodes';
 
 /**
@@ -8,6 +11,53 @@ import { ERROR_CODES, createErrorResponse } from '../constants/errorCodes';
  * Python ML 서비스를 호출하여 추천 결과 반환
  */
 
+/**
+ * 사용자 캠페인 성과 (캠페인별 합계)
+ * Python 엔진이 5건 이상이면 사용자별 파인튜닝 모델을 학습/사용한다.
+ * updated_at은 데이터 워터마크 계산에 사용 (지표가 갱신되면 모델 교체)
+ */
+const loadUserCampaigns = async (userId: number, productInfo: any) => {
+  let client;
+
+  try {
+    client = await pool.connect();
+    const result = await client.query(
+      `SELECT
+         c.id,
+         ma.channel_code AS platform,
+         c.daily_budget,
+         c.total_budget,
+         DATEDIFF(MAX(cm.metric_date), MIN(cm.metric_date)) + 1 AS campaign_duration,
+         SUM(cm.revenue) / SUM(cm.cost) AS roas,
+         GREATEST(c.updated_at, MAX(cm.updated_at)) AS updated_at
+       FROM campaigns c
+       JOIN marketing_accounts ma ON c.marketing_account_id = ma.id
+       JOIN campaign_metrics cm ON cm.campaign_id = c.id
+       WHERE ma.user_id = ?
+       GROUP BY c.id, ma.channel_code, c.daily_budget, c.total_budget, c.updated_at
+       HAVING SUM(cm.cost) > 0`,
+      [userId]
+    );
+
+    // 캠페인에는 업종/타겟 정보가 없으므로 요청한 제품 정보를 기본값으로 사용
+    return result.rows.map((row: any) => ({
+      industry: productInfo.industry,
+      region: productInfo.region,
+      age_group: productInfo.age_group,
+      gender: productInfo.gender,
+      target_audience_size: productInfo.target_audience_size,
+      platform: row.platform,
+      daily_budget: Number(row.daily_budget) || productInfo.daily_budget,
+      total_budget: Number(row.total_budget) || productInfo.total_budget,
+      campaign_duration: Number(row.campaign_duration),
+      roas: Number(row.roas),
+      updated_at: row.updated_at ? new Date(row.updated_at).toISOString() : null,
+    }));
+  } finally {
+    if (client) client.release();
+  }
+};
+
 export const getAIRecommendation = async (req: Request, res: Response) => {
   try {
     const productInfo = req.body;
@@ -33,13 +83,49 @@ export const getAIRecommendation = async (req: Request, res: Response) => {
       target_audience_size: productInfo.target_audience_size || 50000,
     };
 
+    // 로그인 사용자면 캠페인 성과와 user_id를 함께 전달 (사용자별 파인튜닝 모델 사용)
+    // 조회에 실패해도 추천은 업계 평균 모델로 계속 진행
+    const userId = (req as AuthRequest).user?.id;
+    let requestBody: any = payload;
+    if (userId) {
+      try {
+        const userCampaigns = await loadUserCampaigns(userId, payload);
+        requestBody = { product_info: payload, user_campaigns: userCampaigns, user_id: userId };
+      } catch (error: any) {
+        console.error('사용자 캠페인 조회 실패, 사용자 데이터 없이 추천:', error.message);
+        requestBody = { product_info: payload, user_id: userId };
+      }
+    }
+
+    // 상주 추론 서버(scripts/ai_inference_server.py)가 설정되어 있으면 우선 사용
+    // 서버에 연결할 수 없을 때만 아래 spawn 방식으로 폴백
+    const inferenceUrl = process.env.AI_INFERENCE_URL;
+    if (inferenceUrl) {
+      try {
+        const { data } = await axios.post(`${inferenceUrl}/recommend`, requestBody, { timeout: 30000 });
+        return res.json({
+          success: true,
+          data,
+        });
+      } catch (error: any) {
+        if (error.response?.status === 503) {
+          res.setHeader('Retry-After', error.response.headers['retry-after'] || '1');
+          return res.status(503).json(createErrorResponse(ERROR_CODES.AI.SERVER_BUSY));
+        }
+        if (error.response) {
+          return res.status(500).json(createErrorResponse(ERROR_CODES.AI.SERVER_ERROR, error.response.data?.message));
+        }
+        console.error('AI 추론 서버 연결 실패, spawn 방식으로 폴백:', error.message);
+      }
+    }
+
     // Python 스크립트 실행
     const pythonScriptPath = path.join(__dirname, '../../scripts/ai_inference.py');
     const pythonPath = process.env.PYTHON_PATH || path.join(__dirname, '../../../.venv/Scripts/python.exe');
 
     const pythonProcess = spawn(pythonPath, [
       pythonScriptPath,
-      JSON.stringify(payload),
+      JSON.stringify(requestBody),
     ], {
       env: {
         ...process.env,
@@ -14,20 +14,43 @@ from typing import Dict, List, Any
 import os
 from pathlib import Path
 
+from .userModelCache import UserModelCache
+from .similarAdvertiserIndex import SimilarAdvertiserIndex
+from .contributionExplainer import ContributionExplainer
+
 class AIRecommendationEngine:
     """사전학습된 모델 기반 AI 추천 엔진"""
     
     def __init__(self, model_dir: str = None):
+        if model_dir is None:
+            model_dir = os.environ.get('AI_MODEL_DIR')
         if model_dir is None:
             # backend/src/services/ml -> backend/ml_models
             current_dir = Path(__file__).parent.parent.parent.parent
             model_dir = current_dir / 'ml_models'
         
         self.model_dir = Path(model_dir)
+        self._category_codes = {}
         
         # 모델 로드
         self._load_models()
         
+        # ROAS 예측 + Feature 기여도 (추천 근거, 입력 행 단위 캐시)
+        self.explainer = ContributionExplainer(self.feature_columns)
+        self.explainer.prepare(self.roas_predictor.get_booster())
+        
+        # 사용자별 파인튜닝 ROAS 모델 (백그라운드 학습, LRU + 디스크 캐시)
+        # 사용자 부스터도 캐시에 넣기 전에 기여도 테이블을 만들어 첫 요청 지연 방지
+        self.user_models = UserModelCache(
+            self.roas_predictor,
+            self._user_campaign_features,
+            self.model_dir / 'user_models',
+            prepare_fn=self.explainer.prepare
+        )
+        
+        # 유사 광고주 인덱스 (Cold Start 보강, build_similar_index.py로 생성 - 없으면 사용 안 함)
+        self.similar_index = self._load_similar_index()
+        
         # 카테고리 매핑
         self.industries = ['ecommerce', 'finance', 'education', 'food_delivery', 
                           'fashion', 'tech', 'health', 'real_estate']
@@ -78,8 +101,21 @@ class AIRecommendationEngine:
             print("Please copy .pkl files from Google Colab to backend/ml_models/", file=sys.stderr)
             raise
     
+    def _load_similar_index(self):
+        """유사 광고주 인덱스 로드 (파일이 없거나 손상된 경우 None)"""
+        path = SimilarAdvertiserIndex.default_path(self.model_dir)
+        if not path.exists():
+            return None
+        try:
+            return SimilarAdvertiserIndex.load(path)
+        except Exception as e:
+            import sys
+            print(f"Similar advertiser index load failed: {e}", file=sys.stderr)
+            return None
+    
     def recommend_for_product(self, product_info: Dict[str, Any], 
-                            user_campaigns: List[Dict] = None) -> Dict[str, Any]:
+                            user_campaigns: List[Dict] = None,
+                            user_id: Any = None) -> Dict[str, Any]:
         """
         새로운 제품에 대한 종합 추천
         
@@ -96,49 +132,88 @@ class AIRecommendationEngine:
                 'target_audience_size': 50000
             }
             user_campaigns: 사용자의 과거 캠페인 데이터 (옵션)
+                각 행은 product_info 필드 + 'platform', 실제 'roas' (+ 'updated_at')
+            user_id: 사용자 ID (옵션, 있으면 사용자별 파인튜닝 모델 사용)
         
         Returns:
             종합 추천 결과
         """
         
-        # 1) 신뢰도 계산
-        confidence = self._calculate_confidence(user_campaigns)
+        return self.recommend_for_products([product_info], user_campaigns, user_id)[0]
+    
+    def recommend_for_products(self, product_infos: List[Dict[str, Any]],
+                               user_campaigns: List[Dict] = None,
+                               user_id: Any = None) -> List[Dict[str, Any]]:
+        """
+        여러 제품에 대한 종합 추천 (카탈로그 일괄 추론용)
         
-        # 2) 플랫폼 추천
-        platform_recommendation = self._recommend_platforms(product_info)
+        제품 수와 관계없이 플랫폼 추천 모델 1회, ROAS 모델 1회 호출로 묶어서 예측한다.
+        결과는 제품별 recommend_for_product 결과와 동일하다.
         
-        # 3) 각 플랫폼별 ROAS 예측
-        roas_predictions = self._predict_roas_all_platforms(product_info)
+        Args:
+            product_infos: recommend_for_product의 product_info 목록
+            user_campaigns: 사용자의 과거 캠페인 데이터 (옵션, 모든 제품에 공통 적용)
+            user_id: 사용자 ID (옵션)
         
-        # 4) 최적 예산 배분
-        budget_allocation = self._optimize_budget_allocation(
-            product_info.get('total_budget', 1000000),
-            roas_predictions
-        )
+        Returns:
+            product_infos 순서와 같은 추천 결과 목록
+        """
         
-        # 5) 통합 전략
-        cross_platform_strategy = self._generate_cross_platform_strategy(
-            platform_recommendation,
-            roas_predictions
-        )
+        if not product_infos:
+            return []
         
-        return {
-            'product_name': product_info.get('name', '제품'),
-            'confidence': confidence,
-            'recommended_platforms': platform_recommendation,
-            'performance_forecast': roas_predictions,
-            'budget_allocation': budget_allocation,
-            'cross_platform_strategy': cross_platform_strategy,
-            'industry_benchmark': self.industry_benchmarks.get(
-                product_info.get('industry', 'ecommerce')
+        # 0) 사용자 파인튜닝 모델 (준비 안 됐으면 백그라운드 학습 예약 후 전역 모델 사용)
+        user_model = self.user_models.get(user_id, user_campaigns)
+        
+        # 0-1) 과거 캠페인이 없으면 유사 광고주의 실제 성과로 보강
+        similar_index = self.similar_index if not user_campaigns and self.similar_index else None
+        
+        # 2) 각 플랫폼별 ROAS 예측 (+ Feature 기여도)
+        roas_predictions_list = self._predict_roas_batch(product_infos, user_model, similar_index)
+        
+        # 3) 플랫폼 추천 (추천 근거에 ROAS 모델 기여도 반영)
+        platform_recommendations = self._recommend_platforms_batch(product_infos, roas_predictions_list)
+        
+        results = []
+        for product_info, platform_recommendation, roas_predictions in zip(
+            product_infos, platform_recommendations, roas_predictions_list
+        ):
+            # 4) 최적 예산 배분
+            budget_allocation = self._optimize_budget_allocation(
+                product_info.get('total_budget', 1000000),
+                roas_predictions
             )
-        }
-    
-    def _recommend_platforms(self, product_info: Dict) -> Dict[str, Any]:
-        """플랫폼 추천 (확률 기반)"""
+            
+            # 5) 통합 전략
+            cross_platform_strategy = self._generate_cross_platform_strategy(
+                platform_recommendation,
+                roas_predictions
+            )
+            
+            # 1) 신뢰도 계산
+            similar_count = max(
+                (p.get('similar_advertisers', {}).get('neighbors', 0) for p in roas_predictions.values()),
+                default=0
+            )
+            confidence = self._calculate_confidence(user_campaigns, user_model is not None, similar_count)
+            
+            results.append({
+                'product_name': product_info.get('name', '제품'),
+                'confidence': confidence,
+                'recommended_platforms': platform_recommendation,
+                'performance_forecast': roas_predictions,
+                'budget_allocation': budget_allocation,
+                'cross_platform_strategy': cross_platform_strategy,
+                'industry_benchmark': self.industry_benchmarks.get(
+                    product_info.get('industry', 'ecommerce')
+                )
+            })
         
-        # Feature 준비
-        features = [
+        return results
+    
+    def _platform_features(self, product_info: Dict) -> List:
+        """플랫폼 추천 모델 입력 Feature (platform_feature_columns 순서)"""
+        return [
             self._encode_category('industry', product_info.get('industry', 'ecommerce')),
             self._encode_category('region', product_info.get('region', 'seoul')),
             self._encode_category('age_group', product_info.get('age_group', '25-34')),
@@ -148,57 +223,91 @@ class AIRecommendationEngine:
             product_info.get('campaign_duration', 30),
             product_info.get('target_audience_size', 50000)
         ]
+    
+    def _roas_features(self, product_info: Dict, platform: str) -> List:
+        """ROAS 예측 모델 입력 Feature (feature_columns 순서)"""
+        return [
+            self._encode_category('industry', product_info.get('industry', 'ecommerce')),
+            self._encode_category('platform', platform),
+            self._encode_category('region', product_info.get('region', 'seoul')),
+            self._encode_category('age_group', product_info.get('age_group', '25-34')),
+            self._encode_category('gender', product_info.get('gender', 'all')),
+            product_info.get('daily_budget', 100000),
+            product_info.get('total_budget', 3000000),
+            product_info.get('campaign_duration', 30),
+            product_info.get('target_audience_size', 50000)
+        ]
+    
+    def _recommend_platforms(self, product_info: Dict) -> Dict[str, Any]:
+        """플랫폼 추천 (확률 기반)"""
+        return self._recommend_platforms_batch([product_info])[0]
+    
+    def _recommend_platforms_batch(self, product_infos: List[Dict],
+                                   roas_predictions_list: List[Dict] = None) -> List[Dict[str, Any]]:
+        """
+        여러 제품의 플랫폼 추천을 한 번의 predict_proba로 계산
+        roas_predictions_list가 있으면 플랫폼별 ROAS 주요 요인을 추천 근거에 포함한다.
+        """
         
-        # Scaling
-        features_scaled = self.scaler_platform.transform([features])
-        
-        # 예측
-        probabilities = self.platform_recommender.predict_proba(features_scaled)[0]
-        recommended_platform = self.platform_recommender.predict(features_scaled)[0]
-        
-        # 결과 정리
-        platform_scores = []
-        for platform, prob in zip(self.platform_recommender.classes_, probabilities):
-            platform_scores.append({
-                'platform': platform,
-                'score': float(prob),
-                'reason': self._get_recommendation_reason(platform, product_info, prob)
-            })
+        # Feature 준비 + Scaling
+        features_scaled = self.scaler_platform.transform(
+            [self._platform_features(product_info) for product_info in product_infos]
+        )
         
-        # 점수순 정렬
-        platform_scores.sort(key=lambda x: x['score'], reverse=True)
+        # 예측 (predict는 내부적으로 predict_proba를 다시 계산하므로 확률만 1회 계산)
+        probabilities_all = self.platform_recommender.predict_proba(features_scaled)
         
-        return {
-            'primary': platform_scores[0],
-            'alternatives': platform_scores[1:],
-            'all_scores': platform_scores
-        }
-    
-    def _predict_roas_all_platforms(self, product_info: Dict) -> Dict[str, Any]:
-        """모든 플랫폼에 대한 ROAS 예측"""
-        
-        predictions = {}
-        
-        for platform in self.platforms:
-            # Feature 준비
-            features = [
-                self._encode_category('industry', product_info.get('industry', 'ecommerce')),
-                self._encode_category('platform', platform),
-                self._encode_category('region', product_info.get('region', 'seoul')),
-                self._encode_category('age_group', product_info.get('age_group', '25-34')),
-                self._encode_category('gender', product_info.get('gender', 'all')),
-                product_info.get('daily_budget', 100000),
-                product_info.get('total_budget', 3000000),
-                product_info.get('campaign_duration', 30),
-                product_info.get('target_audience_size', 50000)
-            ]
+        results = []
+        for i, (product_info, probabilities) in enumerate(zip(product_infos, probabilities_all)):
+            roas_predictions = roas_predictions_list[i] if roas_predictions_list else {}
             
-            # Scaling
-            features_scaled = self.scaler.transform([features])
+            # 결과 정리
+            platform_scores = []
+            for platform, prob in zip(self.platform_recommender.classes_, probabilities):
+                drivers = roas_predictions.get(platform, {}).get('top_drivers')
+                platform_scores.append({
+                    'platform': platform,
+                    'score': float(prob),
+                    'reason': self._get_recommendation_reason(platform, product_info, prob, drivers)
+                })
             
-            # ROAS 예측
-            predicted_roas = float(self.roas_predictor.predict(features_scaled)[0])
+            # 점수순 정렬
+            platform_scores.sort(key=lambda x: x['score'], reverse=True)
             
+            results.append({
+                'primary': platform_scores[0],
+                'alternatives': platform_scores[1:],
+                'all_scores': platform_scores
+            })
+        
+        return results
+    
+    def _predict_roas_all_platforms(self, product_info: Dict, user_model=None) -> Dict[str, Any]:
+        """모든 플랫폼에 대한 ROAS 예측 (user_model이 있으면 사용자 파인튜닝 모델 사용)"""
+        return self._predict_roas_batch([product_info], user_model)[0]
+    
+    def _predict_roas_batch(self, product_infos: List[Dict], user_model=None,
+                            similar_index: SimilarAdvertiserIndex = None) -> List[Dict[str, Any]]:
+        """
+        여러 제품 x 모든 플랫폼의 ROAS를 한 번의 predict로 계산
+        similar_index가 있으면 유사 광고주의 실제 ROAS를 유사도 가중으로 혼합한다.
+        """
+        
+        # Feature 준비 (제품 순서 → 플랫폼 순서로 펼친 행렬)
+        features_scaled = self.scaler.transform([
+            self._roas_features(product_info, platform)
+            for product_info in product_infos
+            for platform in self.platforms
+        ])
+        
+        # ROAS 예측 + Feature 기여도 (한 번의 booster 호출, 기여도 합 = 예측값)
+        booster = user_model if user_model is not None else self.roas_predictor.get_booster()
+        predicted_all, contribs_all = self.explainer.predict(booster, features_scaled)
+        predicted_all = predicted_all.reshape(len(product_infos), len(self.platforms))
+        contribs_all = contribs_all.reshape(len(product_infos), len(self.platforms), -1)
+        
+        results = []
+        for product_info, predicted_row, contribs_row in zip(product_infos, predicted_all, contribs_all):
             # 추가 메트릭 추정
             benchmark = self.industry_benchmarks.get(
                 product_info.get('industry', 'ecommerce')
@@ -208,16 +317,36 @@ class AIRecommendationEngine:
             duration = product_info.get('campaign_duration', 30)
             total_cost = daily_budget * duration
             
-            predictions[platform] = {
-                'roas': round(predicted_roas, 2),
-                'estimated_revenue': round(total_cost * predicted_roas, 0),
-                'estimated_cost': total_cost,
-                'estimated_profit': round(total_cost * (predicted_roas - 1), 0),
-                'estimated_ctr': benchmark['avg_ctr'],
-                'estimated_cvr': benchmark['avg_cvr']
-            }
+            blended = None
+            if similar_index is not None:
+                blended = similar_index.blend_forecast(
+                    product_info,
+                    {platform: float(roas) for platform, roas in zip(self.platforms, predicted_row)}
+                )
+            
+            predictions = {}
+            for platform, predicted_roas, contribs in zip(self.platforms, predicted_row, contribs_row):
+                predicted_roas = float(predicted_roas)
+                similar = None
+                if blended is not None and blended[platform]['neighbors'] > 0:
+                    similar = blended[platform]
+                    similar['model_roas'] = round(predicted_roas, 2)
+                    predicted_roas = similar.pop('roas')
+                predictions[platform] = {
+                    'roas': round(predicted_roas, 2),
+                    'estimated_revenue': round(total_cost * predicted_roas, 0),
+                    'estimated_cost': total_cost,
+                    'estimated_profit': round(total_cost * (predicted_roas - 1), 0),
+                    'estimated_ctr': benchmark['avg_ctr'],
+                    'estimated_cvr': benchmark['avg_cvr'],
+                    'top_drivers': self.explainer.top_drivers(contribs)
+                }
+                if similar is not None:
+                    predictions[platform]['similar_advertisers'] = similar
+            
+            results.append(predictions)
         
-        return predictions
+        return results
     
     def _optimize_budget_allocation(self, total_budget: float, 
                                    roas_predictions: Dict) -> Dict[str, Any]:
@@ -331,26 +460,49 @@ class AIRecommendationEngine:
         
         return execution_plan
     
-    def _calculate_confidence(self, user_campaigns: List[Dict] = None) -> Dict[str, Any]:
-        """추천 신뢰도 계산"""
+    def _user_campaign_features(self, user_campaigns: List[Dict]) -> np.ndarray:
+        """사용자 캠페인 행 → ROAS 모델 입력 (파인튜닝 학습용)"""
+        return self.scaler.transform([
+            self._roas_features(campaign, campaign['platform'])
+            for campaign in user_campaigns
+        ])
+    
+    def _calculate_confidence(self, user_campaigns: List[Dict] = None,
+                              fine_tuned: bool = False,
+                              similar_count: int = 0) -> Dict[str, Any]:
+        """
+        추천 신뢰도 계산
+        fine_tuned: 사용자 파인튜닝 모델을 실제로 사용했는지
+        similar_count: 성과 보강에 사용한 유사 광고주 수 (Cold Start)
+        """
         
         if not user_campaigns:
             campaign_count = 0
         else:
             campaign_count = len(user_campaigns)
         
-        if campaign_count == 0:
+        if campaign_count == 0 and similar_count > 0:
+            return {
+                'level': 'low',
+                'score': 0.45,
+                'message': f'비슷한 광고주 {similar_count}곳의 실제 성과를 반영한 추천입니다. 캠페인을 실행하면 정확도가 향상됩니다.',
+                'data_source': 'industry_benchmark + similar_advertisers'
+            }
+        elif campaign_count == 0:
             return {
                 'level': 'low',
                 'score': 0.3,
                 'message': '업계 평균 데이터 기반 추천입니다. 캠페인을 실행하면 정확도가 향상됩니다.',
                 'data_source': 'industry_benchmark'
             }
-        elif campaign_count < 5:
+        elif campaign_count < 5 or not fine_tuned:
+            message = f'{campaign_count}개 캠페인 데이터로 개인화된 추천입니다.'
+            if campaign_count >= 5:
+                message += ' 개인화 모델을 학습 중이며, 완료되면 정확도가 향상됩니다.'
             return {
                 'level': 'medium',
                 'score': 0.6,
-                'message': f'{campaign_count}개 캠페인 데이터로 개인화된 추천입니다.',
+                'message': message,
                 'data_source': 'global_model + user_data'
             }
         else:
@@ -366,7 +518,13 @@ class AIRecommendationEngine:
         
         try:
             if category in self.label_encoders:
-                return self.label_encoders[category].transform([value])[0]
+                # LabelEncoder.transform 단건 호출은 느리므로 classes_ 기준 코드표를 1회 만들어 재사용
+                codes = self._category_codes.get(category)
+                if codes is None:
+                    classes = self.label_encoders[category].classes_
+                    codes = {value: code for code, value in enumerate(classes)}
+                    self._category_codes[category] = codes
+                return codes.get(value, 0)
             
             # Fallback: 매뉴얼 매핑
             mappings = {
@@ -386,8 +544,9 @@ class AIRecommendationEngine:
             return 0
     
     def _get_recommendation_reason(self, platform: str, 
-                                  product_info: Dict, score: float) -> str:
-        """추천 근거 생성"""
+                                  product_info: Dict, score: float,
+                                  drivers: List[Dict] = None) -> str:
+        """추천 근거 생성 (drivers: 해당 플랫폼 ROAS 예측의 주요 기여 Feature)"""
         
         industry = product_info.get('industry', 'ecommerce')
         
@@ -415,19 +574,25 @@ class AIRecommendationEngine:
         }
         
         if platform in reasons and industry in reasons[platform]:
-            return reasons[platform][industry]
+            reason = reasons[platform][industry]
+        else:
+            reason = f'{score:.1%} 적합도 - AI 모델 기반 추천'
+        
+        if drivers:
+            factors = ', '.join(f"{d['label']}({d['contribution']:+.2f})" for d in drivers)
+            reason += f' · ROAS 주요 요인: {factors}'
         
-        return f'{score:.1%} 적합도 - AI 모델 기반 추천'
+        return reason
 
 
 # 싱글톤 인스턴스
 _engine_instance = None
 
-def get_ai_engine() -> AIRecommendationEngine:
-    """AI 엔진 싱글톤 인스턴스 반환"""
+def get_ai_engine(model_dir: str = None) -> AIRecommendationEngine:
+    """AI 엔진 싱글톤 인스턴스 반환 (model_dir은 최초 생성 시에만 반영)"""
     global _engine_instance
     
     if _engine_instance is None:
-        _engine_instance = AIRecommendationEngine()
+        _engine_instance = AIRecommendationEngine(model_dir)
     
     return _engine_instance
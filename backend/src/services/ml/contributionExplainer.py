@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+XGBoost ROAS 모델 Feature 기여도 (추천 근거용)
+
+행별 Feature 기여도를 계산한다. 기여도의 행 합계(+bias)가 곧 예측값이므로,
+예측과 기여도를 한 번의 booster 호출로 얻는다.
+
+- 기본: 경로 기반(Saabas) 기여도 = XGBoost pred_contribs(approx_contribs=True)와 동일한 값
+  리프마다 기여도 벡터가 고정되므로 모델별로 (트리, 리프) → 기여도 테이블을 미리 만들어 두고,
+  pred_leaf 1회 + 테이블 합산으로 계산 → 일반 predict와 비슷한 비용
+- exact=True: pred_contribs TreeSHAP 정확 계산 - 행당 수 ms가 들므로 배치/오프라인 분석용 (AI_EXPLAIN_EXACT=1)
+- 같은 입력 행의 기여도는 모델별 LRU에 캐시 → 반복 요청은 booster 호출 없이 응답
+"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# Feature 이름 → 리포트 표시용 한글 이름
+FEATURE_LABELS = {
+    'industry_encoded': '업종',
+    'platform_encoded': '플랫폼',
+    'region_encoded': '지역',
+    'age_group_encoded': '연령대',
+    'gender_encoded': '성별',
+    'daily_budget': '일 예산',
+    'total_budget': '총 예산',
+    'campaign_duration': '캠페인 기간',
+    'target_audience_size': '타겟 규모',
+}
+
+
+class ContributionExplainer:
+    """예측 + Feature 기여도 동시 계산기 (모델별 LRU 캐시, 스레드 안전)"""
+
+    def __init__(self, feature_names: List[str], max_entries: int = None, exact: bool = None):
+        """
+        Args:
+            feature_names: 모델 입력 Feature 이름 (feature_columns 순서)
+            max_entries: 모델당 캐시할 행 수 (기본 AI_EXPLAIN_CACHE_SIZE 또는 4096)
+            exact: True면 TreeSHAP 정확 계산 (기본 AI_EXPLAIN_EXACT 환경변수)
+        """
+        self.feature_names = list(feature_names)
+        self.max_entries = max_entries or int(os.environ.get('AI_EXPLAIN_CACHE_SIZE', 4096))
+        if exact is None:
+            exact = os.environ.get('AI_EXPLAIN_EXACT', '0') == '1'
+        self.exact = exact
+
+        # booster → OrderedDict(행 bytes → 기여도 행), booster가 사라지면 캐시도 함께 제거
+        self._caches = weakref.WeakKeyDictionary()
+        # booster → (트리, 노드 ID, Feature + bias) 경로 기여도 테이블
+        self._tables = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def predict(self, booster, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        예측값과 기여도 반환
+
+        Returns:
+            (예측값 (n,), 기여도 (n, n_features + 1) - 마지막 열은 bias)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        keys = [row.tobytes() for row in X]
+        contribs = np.empty((len(X), X.shape[1] + 1), dtype=np.float32)
+
+        with self._lock:
+            cache = self._caches.setdefault(booster, OrderedDict())
+            missing = []
+            for i, key in enumerate(keys):
+                cached = cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    cache.move_to_end(key)
+                    contribs[i] = cached
+            self.hits += len(X) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            computed = self._compute(booster, X[missing])
+            contribs[missing] = computed
+
+            with self._lock:
+                for i, row in zip(missing, computed):
+                    cache[keys[i]] = row
+                while len(cache) > self.max_entries:
+                    cache.popitem(last=False)
+
+        return contribs.sum(axis=1), contribs
+
+    def prepare(self, booster):
+        """경로 기여도 테이블을 미리 생성 (첫 요청 지연 방지)"""
+        if not self.exact:
+            self._path_table(booster)
+
+    def _compute(self, booster, X: np.ndarray) -> np.ndarray:
+        import xgboost as xgb
+
+        if self.exact:
+            return booster.predict(xgb.DMatrix(X), pred_contribs=True, validate_features=False)
+
+        table = self._path_table(booster)
+        leaves = booster.predict(xgb.DMatrix(X), pred_leaf=True, validate_features=False)
+        leaves = np.asarray(leaves, dtype=np.int64).reshape(len(X), -1)
+        return table[np.arange(table.shape[0]), leaves].sum(axis=1)
+
+    def _path_table(self, booster) -> np.ndarray:
+        """
+        트리별 리프 경로 기여도 테이블 생성 (모델당 1회)
+        노드 기댓값 E(node) = 하위 리프 값의 cover 가중 평균,
+        분기 Feature의 기여도 = E(자식) - E(부모), bias = Σ E(root) + base_score
+        """
+        with self._lock:
+            table = self._tables.get(booster)
+        if table is not None:
+            return table
+
+        import json
+
+        n_features = len(self.feature_names)
+        trees = json.loads(booster.save_raw(raw_format='json'))['learner']['gradient_booster']['model']['trees']
+        n_trees = len(trees)
+        max_nodes = max(int(tree['tree_param']['num_nodes']) for tree in trees)
+        table = np.zeros((n_trees, max_nodes, n_features + 1), dtype=np.float64)
+
+        for tree_id, tree in enumerate(trees):
+            left = tree['left_children']
+            right = tree['right_children']
+            feature = tree['split_indices']
+            value = tree['split_conditions']      # 리프 노드는 리프 값
+            cover = tree['sum_hessian']
+            n_nodes = len(left)
+
+            # 자식 노드 ID는 항상 부모보다 크므로 역순으로 기댓값, 정순으로 경로 누적
+            expected = [0.0] * n_nodes
+            for node in range(n_nodes - 1, -1, -1):
+                if left[node] == -1:
+                    expected[node] = value[node]
+                else:
+                    l, r = left[node], right[node]
+                    expected[node] = (cover[l] * expected[l] + cover[r] * expected[r]) / (cover[l] + cover[r])
+
+            paths = table[tree_id]
+            paths[0, -1] = expected[0]
+            for node in range(n_nodes):
+                if left[node] == -1:
+                    continue
+                for child in (left[node], right[node]):
+                    paths[child] = paths[node]
+                    paths[child, feature[node]] += expected[child] - expected[node]
+
+        # base_score(margin)는 bias에 포함: 임의 입력 1행의 margin과 테이블 합의 차이
+        import xgboost as xgb
+        probe = np.zeros((1, n_features), dtype=np.float32)
+        margin = float(booster.predict(xgb.DMatrix(probe), output_margin=True, validate_features=False)[0])
+        leaves = np.asarray(booster.predict(xgb.DMatrix(probe), pred_leaf=True, validate_features=False),
+                            dtype=np.int64).reshape(-1)
+        base = margin - table[np.arange(n_trees), leaves].sum()
+        table[0, :, -1] += base
+
+        table = table.astype(np.float32)
+        with self._lock:
+            self._tables[booster] = table
+        return table
+
+    def top_drivers(self, contrib_row: np.ndarray, k: int = 3) -> List[Dict]:
+        """기여도 절댓값 상위 k개 Feature (bias 제외)"""
+        values = contrib_row[:-1]
+        order = np.argsort(-np.abs(values))[:k]
+        return [
+            {
+                'feature': self.feature_names[i],
+                'label': FEATURE_LABELS.get(self.feature_names[i], self.feature_names[i]),
+                'contribution': round(float(values[i]), 3),
+            }
+            for i in order if values[i] != 0
+        ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'cached_rows': sum(len(c) for c in self._caches.values()),
+                'mode': 'tree_shap' if self.exact else 'approx',
+            }
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+유사 광고주 최근접 이웃 인덱스 (Cold Start 보강용)
+
+과거 캠페인을 업종/지역/연령/성별/예산 벡터로 색인하고,
+campaign_metrics에서 집계한 실제 ROAS(매출/비용)를 함께 보관한다.
+신규 사용자의 제품 정보로 가장 비슷한 광고주 k곳을 찾아 그들의 실제 성과를 돌려준다.
+
+- 벡터: 카테고리 one-hot + log 예산(표준화), L2 정규화 → 내적 = 코사인 유사도
+- 검색: 소규모는 NumPy brute force, 행 수가 많아지면 k-means IVF 파티션 중 nprobe개만 탐색
+- 갱신: campaign_id 기준 upsert (변경된 캠페인만 다시 넣으면 됨), 크기가 2배가 되면 파티션 재학습
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+# 엔진(AIRecommendationEngine)과 같은 카테고리 정의
+CATEGORY_VOCAB = {
+    'industry': ['ecommerce', 'finance', 'education', 'food_delivery',
+                 'fashion', 'tech', 'health', 'real_estate'],
+    'region': ['seoul', 'busan', 'daegu', 'incheon', 'gwangju',
+               'daejeon', 'ulsan', 'others'],
+    'age_group': ['18-24', '25-34', '35-44', '45-54', '55+'],
+    'gender': ['male', 'female', 'all'],
+}
+
+# 블록별 가중치 (업종이 성과에 가장 큰 영향)
+BLOCK_WEIGHTS = {'industry': 2.0, 'region': 1.0, 'age_group': 1.0, 'gender': 0.5, 'budget': 1.0}
+
+# log1p(예산) 표준화 기준 (daily 1만~50만, total 30만~1000만 구간 기준)
+BUDGET_STATS = {
+    'daily_budget': (np.log1p(100000), 1.0),
+    'total_budget': (np.log1p(3000000), 1.2),
+}
+
+PLATFORMS = ['google', 'meta', 'naver', 'karrot']
+
+# 이 행 수 이상이면 IVF 파티션 사용
+IVF_MIN_ROWS = 20000
+
+
+def _offsets():
+    offsets, pos = {}, 0
+    for name, vocab in CATEGORY_VOCAB.items():
+        offsets[name] = pos
+        pos += len(vocab)
+    return offsets, pos
+
+
+_CATEGORY_OFFSETS, _CATEGORY_DIM = _offsets()
+VECTOR_DIM = _CATEGORY_DIM + len(BUDGET_STATS)
+
+
+def encode_profiles(profiles: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    광고주/제품 프로필 목록 → 정규화된 벡터 행렬 (n, VECTOR_DIM)
+    알 수 없는 카테고리 값은 해당 블록을 0으로 두어 유사도 계산에서 제외한다.
+    """
+    X = np.zeros((len(profiles), VECTOR_DIM), dtype=np.float32)
+    index_maps = {name: {v: i for i, v in enumerate(vocab)} for name, vocab in CATEGORY_VOCAB.items()}
+
+    for row, profile in enumerate(profiles):
+        for name, mapping in index_maps.items():
+            idx = mapping.get(profile.get(name))
+            if idx is not None:
+                X[row, _CATEGORY_OFFSETS[name] + idx] = BLOCK_WEIGHTS[name]
+        for j, (field, (center, scale)) in enumerate(BUDGET_STATS.items()):
+            value = profile.get(field)
+            if value is None:
+                continue
+            try:
+                X[row, _CATEGORY_DIM + j] = BLOCK_WEIGHTS['budget'] * (np.log1p(max(float(value), 0.0)) - center) / scale
+            except (TypeError, ValueError):
+                pass
+
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    np.divide(X, norms, out=X, where=norms > 0)
+    return X
+
+
+class SimilarAdvertiserIndex:
+    """캠페인 단위 유사 광고주 인덱스 (조회/갱신 스레드 안전)"""
+
+    def __init__(self, nprobe: int = 4):
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._size = 0
+        self._vectors = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+        self._user_ids = np.zeros(0, dtype=np.int64)
+        self._platforms = np.zeros(0, dtype=np.int8)      # PLATFORMS 인덱스, -1 = 알 수 없음
+        self._roas = np.zeros(0, dtype=np.float32)
+        self._cost = np.zeros(0, dtype=np.float64)
+        self._campaign_ids = np.zeros(0, dtype=np.int64)
+        self._row_of_campaign = {}
+        self._rows_of_user = {}                            # user_id → 행 목록 (광고주별 성과 집계용)
+        self.watermark = None                              # 마지막으로 반영한 updated_at
+
+        # IVF 파티션
+        self._centroids = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lists = []                                   # 파티션별 행 목록 (inverted list)
+        self._trained_size = 0
+
+    def __len__(self):
+        return self._size
+
+    # ------------------------------------------------------------------
+    # 갱신
+    # ------------------------------------------------------------------
+    def upsert(self, campaigns: List[Dict[str, Any]]):
+        """
+        캠페인 추가/갱신
+        각 행: campaign_id, user_id, platform, roas(실제), cost(집행비 합계),
+              industry, region, age_group, gender, daily_budget, total_budget, (updated_at)
+        """
+        rows = [c for c in campaigns if c.get('roas') is not None and c.get('campaign_id') is not None]
+        if not rows:
+            return
+
+        vectors = encode_profiles(rows)
+        with self._lock:
+            for i, c in enumerate(rows):
+                campaign_id = int(c['campaign_id'])
+                row = self._row_of_campaign.get(campaign_id)
+                if row is None:
+                    row = self._append_slot()
+                    self._row_of_campaign[campaign_id] = row
+                    self._campaign_ids[row] = campaign_id
+                    new_row = True
+                else:
+                    new_row = False
+
+                user_id = int(c.get('user_id') or 0)
+                if new_row:
+                    self._rows_of_user.setdefault(user_id, []).append(row)
+                elif self._user_ids[row] != user_id:
+                    self._rows_of_user[int(self._user_ids[row])].remove(row)
+                    self._rows_of_user.setdefault(user_id, []).append(row)
+
+                self._vectors[row] = vectors[i]
+                self._user_ids[row] = user_id
+                platform = c.get('platform')
+                self._platforms[row] = PLATFORMS.index(platform) if platform in PLATFORMS else -1
+                self._roas[row] = float(c['roas'])
+                self._cost[row] = float(c.get('cost') or 0.0)
+
+                if self._centroids is not None:
+                    assigned = int(np.argmax(self._centroids @ vectors[i]))
+                    if new_row:
+                        self._assign = np.append(self._assign, assigned)
+                    else:
+                        self._lists[self._assign[row]].remove(row)
+                        self._assign[row] = assigned
+                    self._lists[assigned].append(row)
+
+                updated_at = c.get('updated_at')
+                if updated_at is not None and (self.watermark is None or str(updated_at) > str(self.watermark)):
+                    self.watermark = str(updated_at)
+
+            # 데이터가 충분히 쌓였거나 학습 시점보다 2배 커지면 파티션 재학습
+            if self._size >= IVF_MIN_ROWS and (self._centroids is None or self._size >= 2 * self._trained_size):
+                self._train_partitions()
+
+    def _append_slot(self) -> int:
+        if self._size == len(self._vectors):
+            capacity = max(1024, 2 * len(self._vectors))
+            self._vectors = self._grow(self._vectors, capacity)
+            self._user_ids = self._grow(self._user_ids, capacity)
+            self._platforms = self._grow(self._platforms, capacity)
+            self._roas = self._grow(self._roas, capacity)
+            self._cost = self._grow(self._cost, capacity)
+            self._campaign_ids = self._grow(self._campaign_ids, capacity)
+        self._size += 1
+        return self._size - 1
+
+    @staticmethod
+    def _grow(array, capacity):
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def _train_partitions(self, iterations: int = 10, seed: int = 42):
+        """구형(spherical) k-means로 IVF 파티션 학습 (nlist ≈ sqrt(n))"""
+        X = self._vectors[:self._size]
+        nlist = max(8, int(np.sqrt(self._size)))
+        rng = np.random.default_rng(seed)
+        centroids = X[rng.choice(self._size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = np.argmax(X @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, X)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            centroids = np.where(empty[:, None], centroids, sums / np.where(norms > 0, norms, 1))
+
+        self._centroids = centroids.astype(np.float32)
+        self._assign = np.argmax(X @ self._centroids.T, axis=1).astype(np.int32)
+        self._build_lists()
+        self._trained_size = self._size
+
+    def _build_lists(self):
+        order = np.argsort(self._assign, kind='stable')
+        bounds = np.searchsorted(self._assign[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]].tolist() for i in range(len(self._centroids))]
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def query(self, profile: Dict[str, Any], k: int = 10, exclude_user_id: Any = None) -> List[Dict[str, Any]]:
+        """프로필과 가장 비슷한 광고주 k곳 (광고주당 가장 비슷한 캠페인 기준)"""
+        with self._lock:
+            if self._size == 0:
+                return []
+
+            q = encode_profiles([profile])[0]
+            if self._centroids is not None:
+                probe = np.argsort(-(self._centroids @ q))[:self.nprobe]
+                candidates = np.fromiter(
+                    (row for p in probe for row in self._lists[p]), dtype=np.int64
+                )
+            else:
+                candidates = np.arange(self._size)
+
+            sims = self._vectors[candidates] @ q
+            ranked = np.argsort(-sims)
+
+            neighbours, seen = [], set()
+            for row, sim in zip(candidates[ranked].tolist(), sims[ranked].tolist()):
+                user_id = int(self._user_ids[row])
+                if user_id in seen or (exclude_user_id is not None and user_id == int(exclude_user_id)):
+                    continue
+                seen.add(user_id)
+                neighbours.append(self._advertiser_outcome(user_id, float(sim)))
+                if len(neighbours) >= k:
+                    break
+            return neighbours
+
+    def _advertiser_outcome(self, user_id: int, similarity: float) -> Dict[str, Any]:
+        """광고주의 플랫폼별 실제 ROAS (집행비 가중 평균)"""
+        sums = {}
+        for row in self._rows_of_user.get(user_id, []):
+            p_idx = int(self._platforms[row])
+            if p_idx < 0:
+                continue
+            roas, cost = float(self._roas[row]), float(self._cost[row])
+            weighted, total, plain, count = sums.get(p_idx, (0.0, 0.0, 0.0, 0))
+            sums[p_idx] = (weighted + roas * cost, total + cost, plain + roas, count + 1)
+
+        platform_roas = {
+            PLATFORMS[p_idx]: (weighted / total if total > 0 else plain / count)
+            for p_idx, (weighted, total, plain, count) in sums.items()
+        }
+        return {'user_id': user_id, 'similarity': round(similarity, 4), 'platform_roas': platform_roas}
+
+    def blend_forecast(self, profile: Dict[str, Any], model_roas: Dict[str, float],
+                       k: int = 10, prior_strength: float = 3.0) -> Dict[str, Dict[str, Any]]:
+        """
+        모델 예측 ROAS와 유사 광고주의 실제 ROAS를 플랫폼별로 혼합
+        weight = Σsim / (Σsim + prior_strength) → 비슷한 광고주가 많을수록 실제 성과 비중 증가
+        """
+        neighbours = self.query(profile, k=k)
+        blended = {}
+        for platform, predicted in model_roas.items():
+            pairs = [(n['similarity'], n['platform_roas'][platform])
+                     for n in neighbours if platform in n['platform_roas'] and n['similarity'] > 0]
+            if not pairs:
+                blended[platform] = {'roas': predicted, 'neighbors': 0, 'blend_weight': 0.0}
+                continue
+            sims = np.array([s for s, _ in pairs])
+            observed = float(np.average([r for _, r in pairs], weights=sims))
+            weight = float(sims.sum() / (sims.sum() + prior_strength))
+            blended[platform] = {
+                'roas': (1 - weight) * predicted + weight * observed,
+                'neighbors': len(pairs),
+                'neighbor_roas': round(observed, 2),
+                'blend_weight': round(weight, 2),
+            }
+        return blended
+
+    # ------------------------------------------------------------------
+    # 저장 / 로드
+    # ------------------------------------------------------------------
+    def save(self, path):
+        with self._lock:
+            n = self._size
+            np.savez_compressed(
+                path,
+                vectors=self._vectors[:n], user_ids=self._user_ids[:n],
+                platforms=self._platforms[:n], roas=self._roas[:n], cost=self._cost[:n],
+                campaign_ids=self._campaign_ids[:n],
+                centroids=self._centroids if self._centroids is not None else np.zeros((0, VECTOR_DIM), np.float32),
+                assign=self._assign[:n] if self._centroids is not None else np.zeros(0, np.int32),
+                trained_size=np.array(self._trained_size),
+                watermark=np.array(self.watermark or ''),
+            )
+
+    @classmethod
+    def load(cls, path, nprobe: int = 4) -> 'SimilarAdvertiserIndex':
+        index = cls(nprobe=nprobe)
+        with np.load(path) as data:
+            n = len(data['roas'])
+            index._vectors = data['vectors']
+            index._user_ids = data['user_ids']
+            index._platforms = data['platforms']
+            index._roas = data['roas']
+            index._cost = data['cost']
+            index._campaign_ids = data['campaign_ids']
+            index._size = n
+            index._row_of_campaign = {int(c): i for i, c in enumerate(index._campaign_ids)}
+            for i, user_id in enumerate(index._user_ids.tolist()):
+                index._rows_of_user.setdefault(user_id, []).append(i)
+            if len(data['centroids']):
+                index._centroids = data['centroids']
+                index._assign = data['assign']
+                index._trained_size = int(data['trained_size'])
+                index._build_lists()
+            index.watermark = str(data['watermark']) or None
+        return index
+
+    @staticmethod
+    def default_path(model_dir) -> Path:
+        return Path(model_dir) / 'similar_advertisers.npz'
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+사용자별 파인튜닝 ROAS 모델 캐시
+
+전역 XGBoost ROAS 모델(roas_predictor)에서 출발해 사용자의 캠페인 데이터로
+트리를 추가 학습(continued boosting)한 개인화 모델을 관리한다.
+
+- 키: (user_id, 데이터 워터마크) → 데이터가 바뀌면 새 모델로 교체
+- 메모리: LRU + 전체 바이트 상한, 초과 시 오래 안 쓴 모델부터 제거
+- 디스크: user_models/ 아래 UBJSON으로 저장, 재시작 후에도 재사용
+- 학습: 백그라운드 스레드에서 수행, 요청은 기다리지 않고 준비된 경우에만 사용
+- 준비: 캐시에 넣기 전에 prepare_fn(예: 기여도 경로 테이블 생성)을 호출 → 첫 요청에 준비 비용 없음
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+# 파인튜닝에 필요한 최소 캠페인 수 (_calculate_confidence의 'high' 기준과 동일)
+MIN_CAMPAIGNS_FOR_FINE_TUNING = 5
+
+
+def normalize_user_id(user_id):
+    """
+    파일 이름에 들어가므로 0 이상의 정수(또는 숫자 문자열)만 허용 → 문자열, 그 외는 None
+    ('../x' 같은 경로나 '_'가 섞인 값이 다른 사용자 파일과 겹치지 않도록)
+    """
+    if isinstance(user_id, bool):
+        return None
+    if isinstance(user_id, int):
+        return str(user_id) if user_id >= 0 else None
+    if isinstance(user_id, str) and user_id.isascii() and user_id.isdigit():
+        return str(int(user_id))
+    return None
+
+
+def compute_watermark(user_campaigns: List[Dict]) -> str:
+    """
+    사용자 캠페인 데이터의 워터마크
+    updated_at이 모두 있으면 max(updated_at) + 건수, 없으면 내용 해시를 사용한다.
+    """
+    if user_campaigns and all(c.get('updated_at') for c in user_campaigns):
+        latest = max(str(c['updated_at']) for c in user_campaigns)
+        raw = f"{latest}|{len(user_campaigns)}"
+    else:
+        raw = json.dumps(user_campaigns or [], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class UserModelCache:
+    """사용자별 파인튜닝 모델 LRU 캐시 (스레드 안전)"""
+
+    def __init__(self, base_model, feature_fn: Callable[[List[Dict]], np.ndarray],
+                 cache_dir: Path, max_bytes: int = None, boost_rounds: int = None,
+                 train_workers: int = 1, train_threads: int = 2,
+                 prepare_fn: Callable = None):
+        """
+        Args:
+            base_model: 전역 XGBRegressor (roas_predictor)
+            feature_fn: 캠페인 행 목록 → 스케일링된 Feature 행렬
+            cache_dir: 디스크 저장 경로
+            max_bytes: 메모리에 유지할 모델 총 크기 상한 (기본 USER_MODEL_CACHE_MB 또는 256MB)
+            boost_rounds: 사용자 데이터로 추가할 트리 수
+            train_workers: 동시에 학습할 사용자 수
+            train_threads: 모델 1개 학습에 쓰는 XGBoost 스레드 수
+            prepare_fn: 부스터를 메모리 캐시에 넣기 전에 호출 (예: ContributionExplainer.prepare)
+        """
+        self.base_model = base_model
+        self.feature_fn = feature_fn
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes or int(os.environ.get('USER_MODEL_CACHE_MB', 256)) * 1024 * 1024
+        self.boost_rounds = boost_rounds or int(os.environ.get('USER_MODEL_BOOST_ROUNDS', 20))
+        self.train_threads = train_threads
+        self.prepare_fn = prepare_fn
+
+        self._models = OrderedDict()   # (user_id, watermark) → (booster, nbytes)
+        self._total_bytes = 0
+        self._training = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=train_workers, thread_name_prefix='user-model')
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def get(self, user_id, user_campaigns: List[Dict], wait: bool = False):
+        """
+        사용자 모델 조회
+        메모리 → 디스크 순으로 찾고, 없으면 백그라운드 학습을 예약한 뒤 None을 반환한다.
+        (wait=True이면 학습 완료까지 기다림 - 오프라인 배치용)
+        """
+        if user_id is None or not user_campaigns or len(user_campaigns) < MIN_CAMPAIGNS_FOR_FINE_TUNING:
+            return None
+
+        safe_user_id = normalize_user_id(user_id)
+        if safe_user_id is None:
+            print(f"[UserModelCache] 잘못된 user_id 무시: {user_id!r}", file=sys.stderr)
+            return None
+
+        key = (safe_user_id, compute_watermark(user_campaigns))
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                return entry[0]
+
+        booster = self._load_from_disk(key)
+        if booster is not None:
+            self._prepare(booster)
+            self._put(key, booster)
+            return booster
+
+        future = self._schedule(key, user_campaigns)
+        if wait and future is not None:
+            return future.result()
+        return None
+
+    def _schedule(self, key, user_campaigns):
+        with self._lock:
+            if key in self._training:
+                return None
+            self._training.add(key)
+        return self._executor.submit(self._train_and_store, key, list(user_campaigns))
+
+    # ------------------------------------------------------------------
+    # 학습
+    # ------------------------------------------------------------------
+    def _train_and_store(self, key, user_campaigns):
+        try:
+            booster = self._train(user_campaigns)
+            if booster is None:
+                return None
+            self._save_to_disk(key, booster)
+            self._prepare(booster)
+            self._put(key, booster)
+            return booster
+        except Exception as e:
+            print(f"[UserModelCache] user {key[0]} 모델 학습 실패: {e}", file=sys.stderr)
+            return None
+        finally:
+            with self._lock:
+                self._training.discard(key)
+
+    def _prepare(self, booster):
+        """요청 경로에서 부스터별 준비 작업이 일어나지 않도록 캐시에 넣기 전에 실행"""
+        if self.prepare_fn is None:
+            return
+        try:
+            self.prepare_fn(booster)
+        except Exception as e:
+            # 준비 실패 시 첫 요청에서 다시 시도되므로 모델 사용은 계속
+            print(f"[UserModelCache] 모델 준비 실패: {e}", file=sys.stderr)
+
+    def _train(self, user_campaigns):
+        """전역 부스터에서 이어서 사용자 캠페인 행으로 트리 추가"""
+        import xgboost as xgb
+
+        rows = [c for c in user_campaigns if c.get('platform') and c.get('roas') is not None]
+        if len(rows) < MIN_CAMPAIGNS_FOR_FINE_TUNING:
+            return None
+
+        X = np.asarray(self.feature_fn(rows), dtype=np.float32)
+        y = np.asarray([float(c['roas']) for c in rows], dtype=np.float32)
+
+        params = {k: v for k, v in self.base_model.get_xgb_params().items() if v is not None}
+        params['nthread'] = self.train_threads
+        params.pop('n_jobs', None)
+
+        return xgb.train(
+            params,
+            xgb.DMatrix(X, label=y),
+            num_boost_round=self.boost_rounds,
+            xgb_model=self.base_model.get_booster()
+        )
+
+    # ------------------------------------------------------------------
+    # 메모리 LRU
+    # ------------------------------------------------------------------
+    def _put(self, key, booster):
+        nbytes = len(booster.save_raw(raw_format='ubj'))
+        with self._lock:
+            if key in self._models:
+                self._total_bytes -= self._models.pop(key)[1]
+
+            # 같은 사용자의 이전 워터마크 모델은 더 이상 쓰이지 않으므로 제거
+            for old_key in [k for k in self._models if k[0] == key[0]]:
+                self._total_bytes -= self._models.pop(old_key)[1]
+
+            self._models[key] = (booster, nbytes)
+            self._total_bytes += nbytes
+
+            while self._total_bytes > self.max_bytes and len(self._models) > 1:
+                _, (_, evicted_bytes) = self._models.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'models': len(self._models),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'training': len(self._training),
+            }
+
+    # ------------------------------------------------------------------
+    # 디스크
+    # ------------------------------------------------------------------
+    def _path(self, key) -> Path:
+        # key[0]은 get()에서 normalize_user_id를 거친 숫자 문자열, watermark는 16자리 hex
+        user_id, watermark = key
+        return self.cache_dir / f"user_{user_id}_{watermark}.ubj"
+
+    def _load_from_disk(self, key):
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            import xgboost as xgb
+            booster = xgb.Booster()
+            booster.load_model(str(path))
+            booster.set_param({'nthread': 1})
+            return booster
+        except Exception:
+            return None
+
+    def _save_to_disk(self, key, booster):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+
+        # 같은 사용자의 이전 워터마크 파일 정리
+        for old in self.cache_dir.glob(f"user_{key[0]}_*.ubj"):
+            if old != path:
+                old.unlink(missing_ok=True)
+
+        # 임시 파일에 쓴 뒤 교체 → 다른 프로세스가 쓰다 만 파일을 읽지 않도록
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.ubj")
+        booster.save_model(str(tmp_path))
+        os.replace(tmp_path, path)
+        booster.set_param({'nthread': 1})
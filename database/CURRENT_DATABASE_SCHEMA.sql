@@ -150,6 +150,9 @@ CREATE TABLE IF NOT EXISTS `campaign_metrics` (
     `updated_at`      timestamp      NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     PRIMARY KEY (`id`),
     UNIQUE KEY `unique_metric` (`campaign_id`, `metric_date`, `hour`),
+    KEY `idx_metrics_ml_daily` (`campaign_id`, `metric_date`, `cost`, `conversions`, `impressions`, `clicks`),
+    KEY `idx_metrics_campaign_updated` (`campaign_id`, `updated_at`),
+    KEY `idx_metrics_updated` (`updated_at`, `campaign_id`),
     CONSTRAINT `campaign_metrics_ibfk_1` FOREIGN KEY (`campaign_id`) REFERENCES `campaigns` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 -- 실 데이터: 1,176건
@@ -354,6 +357,27 @@ CREATE TABLE IF NOT EXISTS `payments` (
     CONSTRAINT `fk_payments_user` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='결제 이력';
 
+-- ───────────────────────────────────────────────────────────
+-- 17. ml_batch_history (야간 일괄 학습 평가 요약)
+--    backend/python/batch_train.py 자동 생성 (database/create_ml_batch_history.sql)
+--    사용자 예산 분석 이력(ai_history)과 분리
+-- ───────────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS `ml_batch_history` (
+    `id`               int          NOT NULL AUTO_INCREMENT,
+    `user_id`          int          NOT NULL,
+    `watermark`        varchar(100) DEFAULT NULL COMMENT '학습 데이터 워터마크 (max(updated_at) + 행 수)',
+    `row_count`        int          NOT NULL     COMMENT '학습 행 수',
+    `duration`         int          NOT NULL     COMMENT '데이터 기간 일수',
+    `budget`           bigint       NOT NULL     COMMENT '기간 총 비용',
+    `best_channel`     varchar(50)  NOT NULL,
+    `expected_revenue` bigint       NOT NULL     COMMENT '기간 매출 합계',
+    `train_ms`         int          DEFAULT NULL,
+    `report`           json         DEFAULT NULL COMMENT 'XGBoost / RandomForest 평가 결과',
+    `created_at`       timestamp    DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (`id`),
+    KEY `idx_ml_batch_user` (`user_id`, `created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- ───────────────────────────────────────────────────────────
 -- VIEW 1: channel_performance_daily
 --    채널별 일간 성과 집계 뷰
@@ -417,6 +441,7 @@ SET FOREIGN_KEY_CHECKS = 1;
 -- 14  creative_generations        5건    AI 광고 소재 생성 이력
 -- 15  payment_methods             -건    결제 수단 (app.ts 자동 생성)
 -- 16  payments                    -건    결제 이력 (app.ts 자동 생성)
+-- 17  ml_batch_history            -건    야간 일괄 학습 평가 요약 (batch_train.py 자동 생성)
 --
 --  VIEW channel_performance_daily  800건  채널별 일간 성과 집계
 --  VIEW v_subscription               -건  구독 통합 뷰 (app.ts 자동 생성)
@@ -0,0 +1,17 @@
+-- ML 스크립트(backend/python/ml_predict.py)용 campaign_metrics 인덱스 추가
+-- 실행: MySQL 콘솔 또는 DBeaver 등에서 한 번만 실행
+
+-- 일별 집계 pushdown (RandomForest 학습 데이터)
+-- 캠페인 + 날짜 범위 스캔 시 집계에 필요한 컬럼을 모두 인덱스에서 읽도록 커버링 인덱스 구성
+-- (InnoDB 보조 인덱스는 PK(id)를 포함하므로 최고 효율 매체 tie-break 정렬도 인덱스로 처리)
+CREATE INDEX idx_metrics_ml_daily
+  ON campaign_metrics (campaign_id, metric_date, cost, conversions, impressions, clicks);
+
+-- 데이터 워터마크 / 증분 캐시 조회 (MAX(updated_at), updated_at >= ?)
+CREATE INDEX idx_metrics_campaign_updated
+  ON campaign_metrics (campaign_id, updated_at);
+
+-- 유사 광고주 인덱스 증분 갱신 (backend/scripts/build_similar_index.py)
+-- 캠페인 조건 없이 updated_at >= ? 범위로 바뀐 캠페인을 찾으므로 updated_at이 선두인 인덱스 필요
+CREATE INDEX idx_metrics_updated
+  ON campaign_metrics (updated_at, campaign_id);
@@ -1,13 +1,12 @@
-import pymysql
+import sys
+from pathlib import Path
 
-conn = pymysql.connect(
-    host='project-db-cgi.smhrd.com',
-    port=3307,
-    user='cgi_25K_DA1_p3_1',
-    password='smhrd1',
-    database='cgi_25K_DA1_p3_1',
-    charset='utf8mb4'
-)
+# 공용 DB 모듈 (backend/python/db.py)
+# 접속 정보는 환경변수(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD) 또는 backend/.env에서 읽음
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend' / 'python'))
+import db
+
+conn = db.connect(db.config_from_env())
 cursor = conn.cursor()
 
 # Check current columns
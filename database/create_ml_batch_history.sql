@@ -0,0 +1,20 @@
+-- ============================================
+-- ml_batch_history 테이블: 야간 일괄 학습(backend/python/batch_train.py) 평가 요약
+-- 사용자에게 보이는 예산 분석 이력(ai_history)과 분리 - 모델 평가 결과 모니터링용
+-- 실행: MySQL 콘솔 또는 DBeaver 등에서 한 번만 실행 (batch_train.py도 없으면 자동 생성)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS ml_batch_history (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    watermark VARCHAR(100) DEFAULT NULL COMMENT '학습 데이터 워터마크 (max(updated_at) + 행 수)',
+    row_count INT NOT NULL COMMENT '학습 행 수',
+    duration INT NOT NULL COMMENT '데이터 기간 일수',
+    budget BIGINT NOT NULL COMMENT '기간 총 비용',
+    best_channel VARCHAR(50) NOT NULL,
+    expected_revenue BIGINT NOT NULL COMMENT '기간 매출 합계',
+    train_ms INT DEFAULT NULL,
+    report JSON DEFAULT NULL COMMENT 'XGBoost / RandomForest 평가 결과',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_ml_batch_user (user_id, created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
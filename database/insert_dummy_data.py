@@ -6,22 +6,20 @@ MySQL DB에 삽입합니다.
 """
 
 import io
-import pymysql
+import sys
 import pandas as pd
 import msoffcrypto
+from pathlib import Path
 from datetime import datetime, timedelta
 
+# 공용 DB 모듈 (backend/python/db.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend' / 'python'))
+import db
+
 # ============================================
 # DB 연결 설정
 # ============================================
-DB_CONFIG = {
-    'host': 'project-db-cgi.smhrd.com',
-    'port': 3307,
-    'user': 'cgi_25K_DA1_p3_1',
-    'password': 'smhrd1',
-    'database': 'cgi_25K_DA1_p3_1',
-    'charset': 'utf8mb4',
-}
+# 접속 정보는 환경변수(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD) 또는 backend/.env에서 읽음
 
 EXCEL_FILE = r'C:\Users\smhrd\Desktop\channel_AI\더미데이터 예시.xlsx'
 EXCEL_PASSWORD = '25802580'
@@ -277,7 +275,7 @@ def main():
     
     # 4. DB 삽입
     print("\n[4/6] DB 연결 및 데이터 삽입 중...")
-    conn = pymysql.connect(**DB_CONFIG)
+    conn = db.connect(db.config_from_env())
     cursor = conn.cursor()
     
     try:
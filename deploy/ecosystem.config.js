@@ -31,6 +31,22 @@ module.exports = {
       // 안정성
       kill_timeout: 5000,
       listen_timeout: 10000,
+    },
+    {
+      // AI 추론 서버: 모델을 한 번만 로드하고 marketing-api의 추천 요청을 처리
+      name: 'ai-inference',
+      script: 'scripts/ai_inference_server.py',
+      interpreter: 'python3',
+      args: '--host=127.0.0.1 --port=8765 --workers=4 --queue=8',
+      cwd: '/opt/marketing-platform/backend',
+      instances: 1,
+      exec_mode: 'fork',
+      log_file: '/opt/marketing-platform/logs/ai-inference.log',
+      log_date_format: 'YYYY-MM-DD HH:mm:ss Z',
+      autorestart: true,
+      restart_delay: 3000,
+      max_restarts: 10,
+      kill_timeout: 5000,
     }
   ]
 };